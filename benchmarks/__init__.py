@@ -0,0 +1,7 @@
+"""
+Benchmarks for framework overhead (no network, no api keys, llm calls go to FakeLLM).
+
+    python -m benchmarks [--quick] [--only scenario] [--compare old.json]
+
+Every scenario module exposes run(quick) -> {metric: value}.
+"""
@@ -0,0 +1,59 @@
+"""
+Run the benchmark suite and write the results as json, eg:
+
+    python -m benchmarks                        # all scenarios -> data/benchmarks/<commit>.json
+    python -m benchmarks --quick --only memory_store
+    python -m benchmarks --compare data/benchmarks/abc1234.json
+"""
+import argparse
+import importlib
+import json
+import time
+
+from benchmarks.common import compare, environment, write_results
+
+
+SCENARIOS = [
+    "agent_overhead",
+    "hook_dispatch",
+    "logging_hook",
+    "memory_store",
+    "marketing_throughput",
+    "startup",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zap framework overhead benchmarks")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations / smaller histories")
+    parser.add_argument("--only", action="append", choices=SCENARIOS, help="run just these scenarios")
+    parser.add_argument("--out", help="result file (default data/benchmarks/<commit>.json)")
+    parser.add_argument("--compare", help="earlier result file to diff against")
+    args = parser.parse_args()
+
+    meta = environment()
+    results = {}
+
+    for name in args.only or SCENARIOS:
+        module = importlib.import_module(f"benchmarks.{name}")
+        start = time.perf_counter()
+        results[name] = module.run(quick=args.quick)
+        print(f"[bench] {name} done in {time.perf_counter() - start:.1f}s")
+        for metric, value in results[name].items():
+            print(f"    {metric:<40} {value:12.2f}")
+
+    report = {"meta": {**meta, "quick": args.quick}, "results": results}
+    out = args.out or f"data/benchmarks/{meta['commit'] or 'local'}.json"
+    write_results(out, report)
+    print(f"[bench] results written to {out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        print(f"[bench] compared to {args.compare}")
+        for line in compare(previous, report):
+            print("    " + line)
+
+
+if __name__ == "__main__":
+    main()
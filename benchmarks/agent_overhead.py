@@ -0,0 +1,60 @@
+"""
+Per call overhead of BaseAgent.run / Orchestrator per step, for agents that
+do (almost) nothing, so whatever is measured is framework cost: input
+validation, record construction, output coercion and error bookkeeping.
+"""
+from typing import Any, Dict
+
+from benchmarks.common import per_call_us, quiet
+from engine.agent_base import BaseAgent, Agentinput, Agentoutput
+from engine.orchestrator import Orchestrator, WorkflowStep
+
+
+class EchoAgent(BaseAgent):
+    """cheapest possible agent, like InputValidatorAgent minus the checks"""
+
+    def execute(self, validated_input: Agentinput, context: Dict[str, Any]) -> Agentoutput:
+        return Agentoutput(output=validated_input.payload)
+
+
+class FailingAgent(BaseAgent):
+
+    def execute(self, validated_input: Agentinput, context: Dict[str, Any]) -> Agentoutput:
+        raise ValueError("boom")
+
+
+SAMPLE_INPUT = {
+    "payload": {"product_description": "AI CRM tool", "target_audience": "SaaS founders", "goal": "Increase signups"},
+    "metadata": {"trace": "bench"},
+}
+
+
+def run(quick: bool = False) -> Dict[str, float]:
+    iterations = 2000 if quick else 20000
+    echo = EchoAgent(name="echo")
+    failing = FailingAgent(name="failing")
+
+    steps = 10
+    workflow = Orchestrator(steps=[WorkflowStep(agent=EchoAgent(name=f"echo_{i}")) for i in range(steps)])
+
+    # same chain, declared as a dag (thread pool scheduling)
+    dag = Orchestrator(steps=[
+        WorkflowStep(agent=EchoAgent(name=f"echo_{i}"), depends_on=[f"echo_{i - 1}"] if i else [])
+        for i in range(steps)
+    ])
+
+    # upstream outputs with many top level keys (eg: an outline with lots of sections)
+    wide_input = {"payload": {f"section_{i}": {"title": "t", "points": ["a", "b"]} for i in range(200)}, "metadata": {}}
+
+    def run_workflow(initial_input: Dict[str, Any], orchestrator: Orchestrator = workflow):
+        with quiet():  # orchestrator prints per step
+            orchestrator.run(initial_input)
+
+    return {
+        "run_valid_input_us": per_call_us(lambda: echo.run(SAMPLE_INPUT), iterations),
+        "run_error_us": per_call_us(lambda: failing.run(SAMPLE_INPUT), iterations),
+        "workflow_step_us": per_call_us(lambda: run_workflow(SAMPLE_INPUT), max(1, iterations // steps)) / steps,
+        "workflow_step_wide_payload_us": per_call_us(lambda: run_workflow(wide_input), max(1, iterations // steps)) / steps,
+        "dag_step_us": per_call_us(lambda: run_workflow(SAMPLE_INPUT, dag), max(1, iterations // steps // 4)) / steps,
+    }
+
@@ -0,0 +1,65 @@
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+def per_call_us(fn: Callable[[], Any], iterations: int, repeats: int = 5) -> float:
+    """best of `repeats` runs, in microseconds per call"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return best / iterations * 1e6
+
+
+@contextlib.contextmanager
+def quiet() -> Iterator[None]:
+    """swallow stdout (agent prints) while measuring"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.time(),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def write_results(path: str, results: Dict[str, Any]) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> Iterator[str]:
+    """one line per metric present in both result files, with the relative change"""
+    for scenario, metrics in new["results"].items():
+        previous = old.get("results", {}).get(scenario, {})
+        for name, value in metrics.items():
+            before = previous.get(name)
+            if not isinstance(value, (int, float)) or not isinstance(before, (int, float)):
+                continue
+            change = (value - before) / before * 100 if before else 0.0
+            yield f"{scenario + '.' + name:<60} {before:12.2f} -> {value:12.2f}  ({change:+.1f}%)"
@@ -0,0 +1,85 @@
+"""
+Cost of firing hook events through HookManager with N registered hooks,
+alone and as part of an orchestrator step, inline and with background dispatch
+(caller side only: the time the workflow waits, not the time the worker spends).
+"""
+import time
+from typing import Any, Dict
+
+from benchmarks.agent_overhead import EchoAgent, SAMPLE_INPUT
+from benchmarks.common import per_call_us, quiet
+from engine.agent_base import Agentoutput
+from engine.hooks import BaseHook, HookManager
+from engine.orchestrator import Orchestrator, WorkflowStep
+
+
+class NoopHook(BaseHook):
+    """overrides every event, so each one costs a real call"""
+
+    deferrable = True
+
+    def on_workflow_start(self, initial_input: dict) -> None:
+        pass
+
+    def on_workflow_end(self, result: dict, rec_history: list) -> None:
+        pass
+
+    def before_agent_run(self, agent: Any, agent_input: dict) -> None:
+        pass
+
+    def after_agent_run(self, agent: Any, agent_output: Any, record: Any) -> None:
+        pass
+
+
+class SlowSinkHook(BaseHook):
+    """stands in for a hook that writes to disk / network"""
+
+    deferrable = True
+
+    def after_agent_run(self, agent: Any, agent_output: Any, record: Any) -> None:
+        time.sleep(SLOW_SINK_S)
+
+
+HOOK_COUNTS = (0, 1, 5, 20)
+SLOW_SINK_S = 0.0005
+
+
+def run(quick: bool = False) -> Dict[str, float]:
+    iterations = 2000 if quick else 20000
+    agent = EchoAgent(name="echo")
+    output = Agentoutput(output={"x": 1})
+    _, record = agent.run(SAMPLE_INPUT)
+
+    results = {}
+    for n in HOOK_COUNTS:
+        manager = HookManager([NoopHook() for _ in range(n)])
+
+        results[f"after_agent_{n}_hooks_us"] = per_call_us(
+            lambda: manager.after_agent(agent, output, record), iterations)
+
+        steps = 5
+        workflow = Orchestrator(
+            steps=[WorkflowStep(agent=EchoAgent(name=f"echo_{i}")) for i in range(steps)],
+            hook_manager=manager,
+        )
+
+        def run_workflow():
+            with quiet():
+                workflow.run(SAMPLE_INPUT)
+
+        results[f"workflow_step_{n}_hooks_us"] = per_call_us(run_workflow, max(1, iterations // steps // 2)) / steps
+
+    # background dispatch pays for a queue hand-off, worth it once a hook does real i/o
+    sink_iterations = iterations // 20
+    for background in (False, True):
+        manager = HookManager([SlowSinkHook()], background=background, max_queue=sink_iterations + 1)
+        mode = "background" if background else "inline"
+        results[f"after_agent_slow_sink_{mode}_us"] = per_call_us(
+            lambda: manager.after_agent(agent, output, record), sink_iterations)
+        manager.close()
+
+    noop = HookManager([NoopHook()], background=True, max_queue=iterations + 1)
+    results["after_agent_1_hooks_background_us"] = per_call_us(lambda: noop.after_agent(agent, output, record), iterations)
+    noop.close()
+
+    return results
@@ -0,0 +1,46 @@
+"""
+LoggingHook cost per agent event, by payload size: a json line per event
+written to a buffered file (os.devnull here), and the same events with the
+level gated off, which should cost next to nothing.
+"""
+import os
+from typing import Dict
+
+from benchmarks.agent_overhead import EchoAgent
+from benchmarks.common import per_call_us
+from engine.agent_base import Agentoutput
+from engine.log_sink import LogSink
+from extensions.hooks.logging_hook import LoggingHook
+
+
+PAYLOAD_FIELDS = (1, 10, 100)
+
+
+def run(quick: bool = False) -> Dict[str, float]:
+    iterations = 200 if quick else 2000
+    agent = EchoAgent(name="echo")
+    sinks = {
+        "info": LogSink(path=os.devnull, level="info"),
+        "gated": LogSink(path=os.devnull, level="warning"),
+    }
+
+    results = {}
+    for fields in PAYLOAD_FIELDS:
+        payload = {f"field_{i}": "lorem ipsum " * 20 for i in range(fields)}
+        agent_input = {"payload": payload, "metadata": {"trace": "bench"}}
+        output = Agentoutput(output=payload)
+        _, record = agent.run(agent_input)
+
+        for mode, sink in sinks.items():
+            hook = LoggingHook(sink)
+
+            def one_step():
+                hook.before_agent_run(agent, agent_input)
+                hook.after_agent_run(agent, output, record)
+
+            results[f"step_{fields}_fields_{mode}_us"] = per_call_us(one_step, iterations)
+
+    for sink in sinks.values():
+        sink.close()
+
+    return results
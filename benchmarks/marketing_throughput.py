@@ -0,0 +1,97 @@
+"""
+End to end marketing workflow on FakeLLM: pure framework throughput
+(zero latency), batch throughput with a realistic latency spread, and the
+same batch with concurrent llm calls packed into shared requests.
+"""
+import re
+from typing import Any, Dict
+
+from benchmarks.common import quiet
+from engine.batch import BatchStats
+from engine.orchestrator import Orchestrator
+from extensions.llm.batching import MicroBatchLLM, PackedBatchLLM
+from extensions.llm.fake import FakeLLM
+
+from domains.marketing.agents.input_validator_agent import InputValidatorAgent
+from domains.marketing.agents.audience_analyzer_agent import AudienceAnalyzerAgent
+from domains.marketing.agents.value_proposition_agent import ValuePropositionAgent
+from domains.marketing.agents.content_outline_generator import ContentOutlineGeneratorAgent
+from domains.marketing.workflow.marketing_workflow import create_marketing_workflow
+
+
+BRIEF = {
+    "payload": {
+        "product_description": "AI CRM tool",
+        "target_audience": "SaaS founders",
+        "goal": "Increase signups",
+    },
+    "metadata": {"trace": "bench"},
+}
+
+
+def marketing_response(prompt: str) -> Dict[str, Any]:
+    """canned answers for the three llm agents, picked by what the prompt asks for"""
+    if "pain_points" in prompt and "motivations" in prompt and "tone" in prompt and "core_message" not in prompt:
+        return {"pain_points": ["manual follow ups", "lost leads"], "motivations": ["growth"], "tone": "friendly"}
+    if "headline" in prompt:
+        return {
+            "headline": "Grow faster with an AI CRM",
+            "introduction": "Founders lose leads every day.",
+            "benefits_section": [{"title": "Automation", "description": "No more manual follow ups"}],
+            "call_to_action": "Start your free trial",
+        }
+    return {"core_message": "Close more deals with less busywork", "key_benefits": ["automation", "insights"], "goal": "signups"}
+
+
+def packed_marketing_response(prompt: str) -> Dict[str, Any]:
+    """marketing_response, also for packed prompts (one answer per task of the pack)"""
+    tasks = re.findall(r"^### Task (\d+)$", prompt, flags=re.MULTILINE)
+    if not tasks:
+        return marketing_response(prompt)
+    answer = marketing_response(getattr(prompt, "system", prompt))
+    return {"results": [{"id": int(task), "output": answer} for task in tasks]}
+
+
+def build_orchestrator(llm: Any) -> Orchestrator:
+    steps = create_marketing_workflow(
+        input_validator=InputValidatorAgent(),
+        audience_analyzer=AudienceAnalyzerAgent(llm),
+        value_proposition_agent=ValuePropositionAgent(llm),
+        content_outline_generator=ContentOutlineGeneratorAgent(llm),
+    )
+    return Orchestrator(steps=steps)
+
+
+def throughput(llm: Any, workflows: int, concurrency: int) -> Dict[str, float]:
+    orchestrator = build_orchestrator(llm)
+    stats = BatchStats()
+
+    with quiet():
+        for _, result in orchestrator.run_many((BRIEF for _ in range(workflows)), max_concurrency=concurrency):
+            stats.add(result)
+    stats.finish()
+
+    summary = stats.summary()
+    return {"workflows_per_s": summary["throughput_per_s"], "failed": summary["failed"]}
+
+
+def run(quick: bool = False) -> Dict[str, float]:
+    workflows = 50 if quick else 500
+
+    overhead = throughput(FakeLLM(response=marketing_response), workflows, concurrency=1)
+    latency = throughput(
+        FakeLLM(response=marketing_response, latency=0.05, jitter=0.5, distribution="lognormal"),
+        workflows // 5,
+        concurrency=16,
+    )
+
+    upstream = FakeLLM(response=packed_marketing_response, latency=0.05, jitter=0.5, distribution="lognormal")
+    batched = throughput(MicroBatchLLM(PackedBatchLLM(upstream), max_wait=0.01), workflows // 5, concurrency=16)
+
+    return {
+        "zero_latency_workflows_per_s": overhead["workflows_per_s"],
+        "lognormal_50ms_c16_workflows_per_s": latency["workflows_per_s"],
+        "batched_lognormal_50ms_c16_workflows_per_s": batched["workflows_per_s"],
+        "batched_upstream_calls_per_workflow": upstream.calls / (workflows // 5),
+        "failed": overhead["failed"] + latency["failed"] + batched["failed"],
+    }
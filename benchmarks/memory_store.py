@@ -0,0 +1,52 @@
+"""
+MemoryStore save time as the stored history grows, per backend.
+The json backend rewrites the whole file on every save, the append-only
+log and sqlite should stay flat.
+"""
+import os
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.agent_overhead import EchoAgent, SAMPLE_INPUT
+from engine.agent_base import AgentrunRecord
+from engine.memory import MemoryStore
+from engine.memory_sqlite import SQLiteMemoryBackend
+
+
+BACKENDS: Dict[str, Callable[[str], MemoryStore]] = {
+    "json": lambda d: MemoryStore(file_path=os.path.join(d, "memory.json")),
+    "log": lambda d: MemoryStore(file_path=os.path.join(d, "legacy.json"), append_only=True, log_dir=os.path.join(d, "log")),
+    "sqlite": lambda d: MemoryStore(backend=SQLiteMemoryBackend(os.path.join(d, "memory.sqlite"))),
+}
+
+
+def sample_history(steps: int = 4) -> List[AgentrunRecord]:
+    # same shape as a marketing run: a handful of records with small payloads
+    return [EchoAgent(name=f"agent_{i}").run(SAMPLE_INPUT)[1] for i in range(steps)]
+
+
+def run(quick: bool = False) -> Dict[str, float]:
+    sizes = (100, 1000) if quick else (1000, 10000)
+    saves = 5
+    history = sample_history()
+
+    results = {}
+    for name, make_store in BACKENDS.items():
+        with tempfile.TemporaryDirectory() as directory:
+            store = make_store(directory)
+            stored = 0
+
+            for size in sizes:
+                store.save_workflow_runs([history] * (size - stored))  # prefill, one batch
+                stored = size
+
+                start = time.perf_counter()
+                for _ in range(saves):
+                    store.save_workflow_run(history)
+                elapsed = time.perf_counter() - start
+                stored += saves
+
+                results[f"{name}_save_at_{size}_runs_ms"] = elapsed / saves * 1000
+
+    return results
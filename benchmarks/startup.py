@@ -0,0 +1,84 @@
+"""
+Startup cost of the cli and the engine, measured in fresh interpreters:
+cumulative `python -X importtime` time of the main entry modules, wall time
+of a process that only imports run_marketing, and how many heavy modules
+(provider sdks, dotenv, profilers, http server) get imported before any work starts.
+"""
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Set, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = (
+    "engine.orchestrator",
+    "extensions.llm.providers",
+    "domains.marketing.agent_factory",
+    "run_marketing",
+)
+
+# nothing on this list should be needed just to start up
+HEAVY = ("google.genai", "dotenv", "cProfile", "pstats", "tracemalloc", "http.server", "sqlite3")
+
+
+def import_times(module: str) -> Tuple[float, Set[str]]:
+    """cumulative import time of `module` (µs) and every module imported along the way"""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=ROOT, env=_env(), timeout=60,
+    )
+    total, seen = 0.0, set()
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        seen.add(name.strip())
+        if name.strip() == module:
+            total = float(cumulative)
+    return total, seen
+
+
+def process_ms(code: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=_env(), check=True, timeout=60)
+    return (time.perf_counter() - start) * 1000
+
+
+def run(quick: bool = False) -> Dict[str, float]:
+    repeats = 3 if quick else 10
+    results: Dict[str, float] = {}
+
+    # best of n, the first run also pays for cold file caches
+    seen: Set[str] = set()
+    for module in MODULES:
+        best = float("inf")
+        for _ in range(repeats):
+            total, imported = import_times(module)
+            best = min(best, total)
+            if module == "run_marketing":
+                seen = imported
+        results[f"import_{module}_us"] = best
+
+    bare = min(process_ms("pass") for _ in range(repeats))
+    cli = min(process_ms("import run_marketing") for _ in range(repeats))
+    results["interpreter_ms"] = bare
+    results["run_marketing_process_ms"] = cli
+    results["run_marketing_over_interpreter_ms"] = cli - bare
+
+    heavy: List[str] = [name for name in HEAVY if name in seen]
+    results["heavy_modules_at_startup"] = float(len(heavy))
+    if heavy:
+        print(f"[bench] heavy modules imported at startup: {', '.join(heavy)}")
+    return results
+
+
+def _env() -> Dict[str, str]:
+    # no stale bytecode effects from the caller's environment, but the repo must be importable
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
@@ -1,25 +1,102 @@
-from extensions.llm.gemini import GeminiClient
+from extensions.llm.providers import create_provider, parse_provider_specs
+from extensions.llm.router import RouterLLM
 from extensions.llm.retry_wrapper import RetryLLM
-from engine.config import LLM_PROVIDER
+from extensions.llm.retry_policy import BackoffPolicy, CircuitBreaker, RetryBudget
+from extensions.llm.cache_wrapper import CachingLLM, SQLiteCacheStore
+from extensions.llm.singleflight import SingleFlightLLM
+from extensions.llm.rate_limit import RateLimitedLLM, RateLimiter
+from extensions.llm.tracing import TracingLLM
+from extensions.llm.hedge import HedgedLLM
+from extensions.llm.batching import MicroBatchLLM, PackedBatchLLM
+from engine.config import (
+    LLM_PROVIDER, LLM_CACHE, LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS, LLM_SINGLE_FLIGHT,
+    LLM_MAX_ATTEMPTS, LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY,
+    LLM_RPM, LLM_TPM, LLM_RATE_STATE_PATH, LLM_STREAM,
+    LLM_HEDGE, LLM_HEDGE_PERCENTILE, LLM_HEDGE_MAX_RATE,
+    LLM_ROUTER_EJECT_AFTER, LLM_ROUTER_EJECT_SECONDS,
+    LLM_BATCH, LLM_BATCH_SIZE, LLM_BATCH_WAIT_MS, LLM_STEP_TIMEOUT_S,
+)
 
 from domains.marketing.agents.input_validator_agent import InputValidatorAgent
 from domains.marketing.agents.audience_analyzer_agent import AudienceAnalyzerAgent
 from domains.marketing.agents.value_proposition_agent import ValuePropositionAgent
 from domains.marketing.agents.content_outline_generator import ContentOutlineGeneratorAgent
+from domains.marketing.workflow.marketing_workflow import create_marketing_workflow
+
+
+# one budget + breaker per process, shared by every agent (and every build)
+RETRY_BUDGET = RetryBudget()
+CIRCUIT_BREAKER = CircuitBreaker()
+RATE_LIMITER = RateLimiter(rpm=LLM_RPM, tpm=LLM_TPM, shared_state_path=LLM_RATE_STATE_PATH)
 
 
 def build_marketing_agents():
 
-    if LLM_PROVIDER == "gemini":
-        current_llm = GeminiClient()
-        llm = RetryLLM(current_llm)
+    specs = parse_provider_specs(LLM_PROVIDER)
+    if not specs:
+        raise ValueError("Unsupported LLM provider")
+
+    # timed per upstream attempt, so MetricsHook shows retries (and failovers) as separate llm spans
+    backends = [
+        (f"{name}:{model}" if model else name, TracingLLM(create_provider(name, model)))
+        for name, model in specs
+    ]
 
+    if len(backends) == 1:
+        current_llm = backends[0][1]
     else:
-        raise ValueError("Unsupported LLM provider")
+        # fastest healthy backend first, failing ones are ejected and probed later
+        current_llm = RouterLLM(backends, eject_after=LLM_ROUTER_EJECT_AFTER, eject_seconds=LLM_ROUTER_EJECT_SECONDS)
+
+    # pacing sits inside retry, so retries are paced too
+    if LLM_RPM or LLM_TPM:
+        current_llm = RateLimitedLLM(current_llm, RATE_LIMITER)
+
+    # hedges go through the pacing too, and every retry attempt can be hedged
+    if LLM_HEDGE:
+        current_llm = HedgedLLM(current_llm, percentile=LLM_HEDGE_PERCENTILE, max_hedge_rate=LLM_HEDGE_MAX_RATE)
+
+    llm = RetryLLM(
+        current_llm,
+        max_attempts=LLM_MAX_ATTEMPTS,
+        policy=BackoffPolicy(base_delay=LLM_RETRY_BASE_DELAY, max_delay=LLM_RETRY_MAX_DELAY),
+        budget=RETRY_BUDGET,
+        breaker=CIRCUIT_BREAKER,
+    )
+
+    # concurrent calls are packed into one request, which is retried as a whole
+    if LLM_BATCH:
+        llm = MicroBatchLLM(
+            PackedBatchLLM(llm, max_items=LLM_BATCH_SIZE),
+            max_batch=LLM_BATCH_SIZE,
+            max_wait=LLM_BATCH_WAIT_MS / 1000,
+        )
+
+    # duplicate briefs in a batch share one upstream call (retries included)
+    if LLM_SINGLE_FLIGHT:
+        llm = SingleFlightLLM(llm)
+
+    # cache sits outside retry, so a hit never touches the provider
+    if LLM_CACHE in ("memory", "sqlite"):
+        store = SQLiteCacheStore(LLM_CACHE_PATH) if LLM_CACHE == "sqlite" else None
+        llm = CachingLLM(llm, ttl_seconds=LLM_CACHE_TTL_SECONDS, persistent_store=store)
 
     return {
         "input_validator": InputValidatorAgent(),
-        "audience_analyzer": AudienceAnalyzerAgent(llm),
-        "value_proposition": ValuePropositionAgent(llm),
-        "content_outline": ContentOutlineGeneratorAgent(llm),
-    }
\ No newline at end of file
+        "audience_analyzer": AudienceAnalyzerAgent(llm, stream=LLM_STREAM),
+        "value_proposition": ValuePropositionAgent(llm, stream=LLM_STREAM),
+        "content_outline": ContentOutlineGeneratorAgent(llm, stream=LLM_STREAM),
+    }
+
+
+def build_marketing_workflow():
+    """the marketing steps with freshly built agents, what the domain registry hands out"""
+    agents = build_marketing_agents()
+
+    return create_marketing_workflow(
+        input_validator=agents["input_validator"],
+        audience_analyzer=agents["audience_analyzer"],
+        value_proposition_agent=agents["value_proposition"],
+        content_outline_generator=agents["content_outline"],
+        step_timeout_s=LLM_STEP_TIMEOUT_S or None,
+    )
@@ -1,46 +1,61 @@
 from typing import Dict, Any
 
-from engine.agent_base import BaseAgent, Agentinput, Agentoutput
+from engine.agent_base import Agentinput, Agentoutput
+from engine.llm_agent import LLMAgent
+from engine.prompts import Prompt, PromptTemplate, response_schema
 from extensions.llm.base import BaseLLM
 
 
-class AudienceAnalyzerAgent(BaseAgent):
+class AudienceAnalyzerAgent(LLMAgent):
     """
     Analyzes the validated marketing input and extracts
     structured audience insights using LLM.
     """
 
-    def __init__(self, llm: BaseLLM):
+    # compiled once, the instructions are the same for every brief
+    PROMPT = PromptTemplate(
+        "marketing.audience_analyzer",
+        instructions="""
+            You are a marketing strategist,
+
+            Analyze the following input and return structured JSON with this format:
+            {
+                "pain_points": [],
+                "motivations": [],
+                "tone": ""
+            }
+        """,
+        body="""
+            Product: {product}
+            Target audience: {audience}
+            Goal: {goal}
+        """,
+        # what parse_response reads back
+        response_schema=response_schema({"pain_points": [str], "motivations": [str], "tone": str}),
+    )
+
+    def __init__(self, llm: BaseLLM, stream: bool = False):
         super().__init__(
             name="marketing.audience_analyzer",   # runtime unique name
+            llm=llm,
             description="Analyzes target audience and extracts insights",
             input_schema=Agentinput,
             output_schema=Agentoutput,
             allowed_tools=[],
+            stream=stream,
         )
 
-        self.llm = llm
-
-    def execute(self, validated_input: Agentinput, context: Dict[str, Any]) -> Agentoutput:
+    def build_prompt(self, validated_input: Agentinput, context: Dict[str, Any]) -> Prompt:
 
         payload = validated_input.payload  # output from Input validator Agent.
 
-        prompt = f"""
-        You are a marketing strategist,
-
-        Analyze the following input and return structured JSON with this format:
-        {{
-            "pain_points": [],
-            "motivations": [],
-            "tone": ""
-        }}
-
-        Product: {payload.get("product_description")}
-        Target audience: {payload.get("target_audience")}
-        Goal: {payload.get("goal")}
-        """
+        return self.PROMPT.render(
+            product=payload.get("product_description"),
+            audience=payload.get("target_audience"),
+            goal=payload.get("goal"),
+        )
 
-        llm_response = self.llm.generate_json(prompt)
+    def parse_response(self, llm_response: Dict[str, Any], validated_input: Agentinput) -> Agentoutput:
 
         insights = {
             "pain_points": llm_response.get("pain_points", []),
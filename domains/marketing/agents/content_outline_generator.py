@@ -1,56 +1,75 @@
 from typing import Dict, Any
 
-from engine.agent_base import BaseAgent, Agentinput, Agentoutput
+from engine.agent_base import Agentinput, Agentoutput
+from engine.llm_agent import LLMAgent
+from engine.prompts import Prompt, PromptTemplate, response_schema
 from extensions.llm.base import BaseLLM
 
 
-class ContentOutlineGeneratorAgent(BaseAgent):
+class ContentOutlineGeneratorAgent(LLMAgent):
     """
     Generates a structured marketing content outline
     using the value proposition output.
     """
 
-    def __init__(self, llm: BaseLLM):
+    PROMPT = PromptTemplate(
+        "marketing.content_outline_generator",
+        instructions="""
+            You are a senior SaaS marketing copywriter with 10+ years of experience.
+
+            Based on the value proposition below, generate a structured
+            marketing content outline.
+
+            Return ONLY valid JSON in this format:
+            {
+                "headline": "",
+                "introduction": "",
+                "benefits_section": [
+                {"title": "", "description": ""},
+                ],
+                "call_to_action": ""
+            }
+        """,
+        body="""
+            Core Message:
+            {core_message}
+
+            Key Benefits:
+            {key_benefits}
+
+            Goal:
+            {goal}
+        """,
+        response_schema=response_schema({
+            "headline": str,
+            "introduction": str,
+            "benefits_section": [{"title": str, "description": str}],
+            "call_to_action": str,
+        }),
+    )
+
+    def __init__(self, llm: BaseLLM, stream: bool = False):
         super().__init__(
             name="marketing.content_outline_generator",
+            llm=llm,
             description="Generates structured marketing content outline",
             input_schema=Agentinput,
             output_schema=Agentoutput,
             allowed_tools=[],
+            stream=stream,
         )
 
-        self.llm = llm
-
-    def execute(self, validated_input: Agentinput, context: Dict[str, Any]) -> Agentoutput:
+    def build_prompt(self, validated_input: Agentinput, context: Dict[str, Any]) -> Prompt:
 
         payload = validated_input.payload
 
-        prompt = f"""
-        You are a senior SaaS marketing copywriter with 10+ years of experience.
-
-        Based on the value proposition below, generate a structured
-        marketing content outline.
-
-        Return ONLY valid JSON in this format:
-        {{
-            "headline": "",
-            "introduction": "",
-            "benefits_section": [
-            {{"title": "", "description": ""}},
-            ],
-            "call_to_action": ""
-        }}
-
-        Core Message:
-        {payload.get("core_message")}
-
-        Key Benefits:
-        {payload.get("key_benefits")}
+        return self.PROMPT.render(
+            core_message=payload.get("core_message"),
+            key_benefits=payload.get("key_benefits"),
+            goal=payload.get("goal"),
+        )
 
-        Goal:
-        {payload.get("goal")}
-        """
-        llm_response = self.llm.generate_json(prompt)
+    def parse_response(self, llm_response: Dict[str, Any], validated_input: Agentinput) -> Agentoutput:
 
         result = {
             "headline": llm_response.get("headline", ""),
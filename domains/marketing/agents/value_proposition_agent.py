@@ -1,57 +1,73 @@
 from typing import Dict, Any
 
-from engine.agent_base import BaseAgent, Agentinput, Agentoutput
+from engine.agent_base import Agentinput, Agentoutput
+from engine.llm_agent import LLMAgent
+from engine.prompts import Prompt, PromptTemplate, response_schema
 from extensions.llm.base import BaseLLM
 
 
-class ValuePropositionAgent(BaseAgent):
+class ValuePropositionAgent(LLMAgent):
     """
     Generates a compelling value proposition using
     audience insights and product context.
     """
 
-    def __init__(self, llm: BaseLLM):
+    PROMPT = PromptTemplate(
+        "marketing.value_proposition",
+        instructions="""
+            You are a senior marketing strategist with 15+ years experience
+
+            Based on the audience insights and product context below,
+            generate a compelling value proposition.
+
+            Return ONLY valid JSON in this format:
+            {
+                "core_message": "",
+                "key_benefits": [""],
+                "goal": ""
+            }
+        """,
+        body="""
+            Product: {product}
+            Goal: {goal}
+
+            Audience Pain Points:
+            {pain_points}
+
+            Audience Motivations:
+            {motivations}
+
+            Tone:
+            {tone}
+        """,
+        response_schema=response_schema({"core_message": str, "key_benefits": [str], "goal": str}),
+    )
+
+    def __init__(self, llm: BaseLLM, stream: bool = False):
         super().__init__(
             name="marketing.value_proposition",
+            llm=llm,
             description="Generates core message and key benefits",
             input_schema=Agentinput,
             output_schema=Agentoutput,
             allowed_tools=[],
+            stream=stream,
         )
 
-        self.llm = llm
-
-    def execute(self, validated_input: Agentinput, context: Dict[str, Any]) -> Agentoutput:
+    def build_prompt(self, validated_input: Agentinput, context: Dict[str, Any]) -> Prompt:
 
         payload = validated_input.payload
+        insights = payload.get("audience_insights", {})
+
+        return self.PROMPT.render(
+            product=payload.get("product_description"),
+            goal=payload.get("goal"),
+            pain_points=insights.get("pain_points"),
+            motivations=insights.get("motivations"),
+            tone=insights.get("tone"),
+        )
 
-        prompt = f"""
-        You are a senior marketing strategist with 15+ years experience
-
-        Based on the audience insights and product context below,
-        generate a compelling value proposition.
-
-        Return ONLY valid JSON in this format:
-        {{
-            "core_message": "",
-            "key_benefits": [""],
-            "goal": ""
-        }}
-
-        Product: {payload.get("product_description")}
-        Goal: {payload.get("goal")}
-
-        Audience Pain Points:
-        {payload.get("audience_insights", {}).get("pain_points")}
-
-        Audience Motivations:
-        {payload.get("audience_insights", {}).get("motivations")}
-
-        Tone:
-        {payload.get("audience_insights", {}).get("tone")}
-        """
-
-        llm_response = self.llm.generate_json(prompt)
+    def parse_response(self, llm_response: Dict[str, Any], validated_input: Agentinput) -> Agentoutput:
 
         result = {
             "core_message": llm_response.get("core_message", ""),
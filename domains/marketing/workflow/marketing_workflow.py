@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from engine.orchestrator import WorkflowStep
 
@@ -49,10 +49,16 @@ def create_marketing_workflow(
     audience_analyzer,
     value_proposition_agent,
     content_outline_generator,
+    step_timeout_s: Optional[float] = None,
 ):
     """
     Builds the sequence of steps for marketing content generation.
     Agents are passed in so we can swap/mock them easily.
+
+    Dependencies are declared explicitly (including the ones only read from
+    context), so the orchestrator can run independent steps in parallel.
+
+    step_timeout_s bounds each of the llm steps (validation is local).
     """
 
     steps = [
@@ -62,17 +68,23 @@ def create_marketing_workflow(
 
         WorkflowStep(
             agent=audience_analyzer,
-            input_transformer=pass_validated_input
+            input_transformer=pass_validated_input,
+            depends_on=[input_validator.name],
+            timeout_s=step_timeout_s,
         ),
 
         WorkflowStep(
             agent=value_proposition_agent,
-            input_transformer=prepare_value_prop_input
+            input_transformer=prepare_value_prop_input,
+            depends_on=[audience_analyzer.name, input_validator.name],
+            timeout_s=step_timeout_s,
         ),
 
         WorkflowStep(
             agent=content_outline_generator,
-            input_transformer=prepare_content_outline_input
+            input_transformer=prepare_content_outline_input,
+            depends_on=[value_proposition_agent.name, input_validator.name],
+            timeout_s=step_timeout_s,
         ),
     ]
 
@@ -0,0 +1,19 @@
+from typing import Callable, List, Union
+
+from engine.orchestrator import WorkflowStep
+from engine.registry import LazyRegistry
+
+# domain name -> fn() -> workflow steps, as "package.module:fn" so a domain's
+# agents (and whatever providers they pull in) are imported only when it is used
+DOMAINS = LazyRegistry("domain")
+
+DOMAINS.register("marketing", "domains.marketing.agent_factory:build_marketing_workflow")
+
+
+def register_domain(name: str, build_steps: Union[str, Callable[[], List[WorkflowStep]]]) -> None:
+    DOMAINS.register(name, build_steps)
+
+
+def load_domain(name: str) -> Callable[[], List[WorkflowStep]]:
+    """the steps builder of a domain, imported on first use"""
+    return DOMAINS.get(name)
@@ -1,9 +1,16 @@
 from __future__ import annotations
+import asyncio
 import time
 import uuid
 import traceback
-from typing import Any, Dict, Iterable, List, Optional, Protocol, Tuple
-from pydantic import BaseModel, Field, ValidationError
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Protocol, Tuple
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, model_serializer
+
+from engine.deadline import DeadlineExceeded
+from engine.log_sink import get_sink
+from engine.profiling import RunProfile, open_profile, section, use_profile
+from engine.run_scope import RunScope, open_scope
 
 # Tool interface
 
@@ -35,21 +42,53 @@ class Agentoutput(BaseModel):
 # execution log record (added for debug by reading run records)
 
 class AgentrunRecord(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     run_id: str
     agent_name: str
     start_ts: float
     end_ts: Optional[float]           
     duration_s: Optional[float]
-    status: str                       # success | error
+    status: str                       # success | error | timeout
     input: Dict[str, Any]
     output: Optional[Dict[str, Any]]  # doesnt exist on error
     error: Optional[str]              # doesnt exist on success
 
-    # TODO:populate this once llm based tools are integrated (eg: openai token accounting) 
+    # filled from llm usage reported during the run (sum over all llm calls)
     tokens_used: Optional[int] = None
 
     extra: Dict[str, Any] = Field(default_factory=dict)
 
+    # the exception behind `error` (live records only, never serialized).
+    # its traceback is only formatted when something reads it
+    exception: Optional[BaseException] = Field(default=None, exclude=True, repr=False)
+
+    @property
+    def error_traceback(self) -> Optional[str]:
+        if self.exception is None:
+            return None
+        return "".join(traceback.format_exception(self.exception)).rstrip()
+
+    @model_serializer(mode="wrap")
+    def _dump_with_traceback(self, handler: Any) -> Dict[str, Any]:
+        # stored / logged records keep the full traceback in `error`
+        data = handler(self)
+        if self.exception is not None and data.get("error"):
+            data["error"] = f"{data['error']}\n{self.error_traceback}"
+        return data
+
+
+@lru_cache(maxsize=None)
+def schema_validator(schema: type) -> Callable[[Any], BaseModel]:
+    """
+    validate function for a schema class, looked up once per class.
+    pydantic models already compile their validator at class creation,
+    model_validate goes straight to it (no **kwargs unpacking).
+    """
+    if isinstance(schema, type) and issubclass(schema, BaseModel):
+        return schema.model_validate
+    return lambda raw: schema(**raw)
+
 
 # Hooks
 
@@ -121,11 +160,18 @@ class BaseAgent:
         self.hooks[when].append(fn)
 
     def _run_hooks(self, when: str, record: AgentrunRecord):
-        for fn in self.hooks.get(when, []):
-            try:
-                fn(self, record)
-            except Exception:
-                print(f"[HOOK ERROR] agent={self.name} hook={when} error={traceback.format_exc()}")
+        fns = self.hooks.get(when)
+        if not fns:
+            return
+
+        with section("agent_hooks"):
+            for fn in fns:
+                try:
+                    fn(self, record)
+                except Exception as e:
+                    log = get_sink()
+                    if log.enabled("error"):
+                        log.error("agent_hook.error", agent=self.name, phase=when, error=repr(e), traceback=traceback.format_exc())
 
     
     # Implementing (lifecycle contract) 
@@ -157,100 +203,283 @@ class BaseAgent:
         return None
 
    
-    # run wrapper called by orchestrator
+    # async lifecycle (used by AsyncOrchestrator)
+    # defaults just fall back to the sync versions, so existing agents work unchanged.
+    # execute is pushed to a worker thread so a blocking agent doesnt stall the event loop
+
+    async def aprepare(self, validated_input: Agentinput, context: Dict[str, Any]) -> None:
+        return self.prepare(validated_input, context)
+
+    async def aexecute(self, validated_input: Agentinput, context: Dict[str, Any]) -> Agentoutput:
+        """
+        Override this for agents that can await their io (eg: llm calls)
+        """
+        return await asyncio.to_thread(self.execute, validated_input, context)
+
+    async def afinalize(self, validated_input: Agentinput, result: Agentoutput, context: Dict[str, Any]) -> None:
+        return self.finalize(validated_input, result, context)
+
+
+    # run wrappers called by orchestrator
     
     def run(
         self, 
-        raw_input: Dict[str, Any], 
+        raw_input: Dict[str, Any] | Agentinput,
         context: Optional[Dict[str, Any]] = None
     )-> Tuple[Agentoutput, AgentrunRecord]:
         """
         This wrapper is intentionally defensive, it ensures that:
 
           - Validate input against input_schema
+            (an input_schema instance is trusted as already validated)
           - call hooks 'before'
           - prepare -> execute -> finalize
           - validate output against output_schema
           - return (agentoutput, agentrunrecord)
         """
-        run_id = str(uuid.uuid4())
-        start_ts = time.time()
         context = context or {}
         # TODO: context is mutable for simplicity, this may be revisited if stronger agent isolation  or immutability guarantees are required.
 
+        start_ts = time.time()
+
+        # 1) input validation
+        validated_input = self._validate_input(raw_input)
+        if not isinstance(validated_input, Agentinput):
+            return self._input_error(raw_input, start_ts, validated_input)
+
+        # profiling is opt-in per run (metadata["profile"]), see engine.profiling
+        profile = open_profile(validated_input.metadata)
+        if profile is not None:
+            return self._run_profiled(raw_input, validated_input, context, start_ts, profile)
+
+        # 2) before hooks
+        self._before(raw_input, start_ts)
+
+        # 3) Core execution (prepare + execute + finalize)
+        # the scope collects telemetry written from deeper down (eg: llm retries)
+        with open_scope() as scope:
+            try:
+                self.prepare(validated_input, context)
+                result = self._coerce_output(self.execute(validated_input, context))
+                self.finalize(validated_input, result, context)
+
+            except Exception as exc:
+                return self._fail(raw_input, start_ts, scope, exc)
+
+        return result, self._succeed(raw_input, start_ts, scope, result)
+
+    async def arun(
+        self,
+        raw_input: Dict[str, Any] | Agentinput,
+        context: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Agentoutput, AgentrunRecord]:
+        """
+        async twin of run(), same contract and same record semantics
+        """
+        context = context or {}
+
+        start_ts = time.time()
+
+        validated_input = self._validate_input(raw_input)
+        if not isinstance(validated_input, Agentinput):
+            return self._input_error(raw_input, start_ts, validated_input)
+
+        profile = open_profile(validated_input.metadata)
+        if profile is not None:
+            return await self._arun_profiled(raw_input, validated_input, context, start_ts, profile)
+
+        self._before(raw_input, start_ts)
+
+        with open_scope() as scope:
+            try:
+                await self.aprepare(validated_input, context)
+                result = self._coerce_output(await self.aexecute(validated_input, context))
+                await self.afinalize(validated_input, result, context)
+
+            except Exception as exc:
+                return self._fail(raw_input, start_ts, scope, exc)
+
+        return result, self._succeed(raw_input, start_ts, scope, result)
+
+
+    # profiled twins of run / arun: same steps, each one timed.
+    # kept apart so the usual (unprofiled) path pays nothing for it
+
+    def _run_profiled(
+        self, raw_input: Any, validated_input: Agentinput, context: Dict[str, Any], start_ts: float, profile: RunProfile
+    ) -> Tuple[Agentoutput, AgentrunRecord]:
+        with use_profile(profile):
+            self._before(raw_input, start_ts)
+
+            with open_scope() as scope:
+                profile.start_collectors()
+                try:
+                    with profile.section("prepare"):
+                        self.prepare(validated_input, context)
+                    with profile.section("execute"):
+                        result_raw = self.execute(validated_input, context)
+                    with profile.section("validate_output"):
+                        result = self._coerce_output(result_raw)
+                    with profile.section("finalize"):
+                        self.finalize(validated_input, result, context)
+
+                except Exception as exc:
+                    profile.stop_collectors()
+                    output, record = self._fail(raw_input, start_ts, scope, exc)
+                    return output, self._attach_profile(record, profile)
+
+                profile.stop_collectors()
+
+            return result, self._attach_profile(self._succeed(raw_input, start_ts, scope, result), profile)
+
+    async def _arun_profiled(
+        self, raw_input: Any, validated_input: Agentinput, context: Dict[str, Any], start_ts: float, profile: RunProfile
+    ) -> Tuple[Agentoutput, AgentrunRecord]:
+        with use_profile(profile):
+            self._before(raw_input, start_ts)
+
+            with open_scope() as scope:
+                profile.start_collectors()
+                try:
+                    with profile.section("prepare"):
+                        await self.aprepare(validated_input, context)
+                    with profile.section("execute"):
+                        result_raw = await self.aexecute(validated_input, context)
+                    with profile.section("validate_output"):
+                        result = self._coerce_output(result_raw)
+                    with profile.section("finalize"):
+                        await self.afinalize(validated_input, result, context)
+
+                except Exception as exc:
+                    profile.stop_collectors()
+                    output, record = self._fail(raw_input, start_ts, scope, exc)
+                    return output, self._attach_profile(record, profile)
+
+                profile.stop_collectors()
+
+            return result, self._attach_profile(self._succeed(raw_input, start_ts, scope, result), profile)
+
+    def _attach_profile(self, record: AgentrunRecord, profile: RunProfile) -> AgentrunRecord:
+        # wall time runs until now, so building the record and the hooks count as framework time
+        record.extra["profile"] = profile.summary(time.time() - record.start_ts)
+        return record
+
+    # shared run helpers (both run and arun go through these)
+    # the record is built once, when the run is over, instead of being
+    # created up front and patched field by field
+
+    def _record(
+        self,
+        raw_input: Any,
+        start_ts: float,
+        status: str,
+        output: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+        scope: Optional[RunScope] = None,
+    ) -> AgentrunRecord:
+        if isinstance(raw_input, BaseModel):
+            # pre-validated input, shallow field view (dict(model) iterates it ~30x slower)
+            raw_input = {**raw_input.__dict__, **(raw_input.__pydantic_extra__ or {})}
+
+        end_ts = None if status == "running" else time.time()
         record = AgentrunRecord(
-            run_id=run_id,
+            run_id=str(uuid.uuid4()),
             agent_name=self.name,
             start_ts=start_ts,
-            end_ts=None,
-            duration_s=None,
-            status="running",
-            input=raw_input,
+            end_ts=end_ts,
+            duration_s=None if end_ts is None else end_ts - start_ts,
+            status=status,
+            input={},
             output=None,
-            error=None,
+            error=error,
         )
+        # assigned, not validated: validating would copy payloads that
+        # input_schema / output_schema already checked
+        record.input = raw_input
+        record.output = output
+
+        if scope is not None and scope.extra:
+            self._merge_scope(record, scope)
+        return record
+
+    def _validate_input(self, raw_input: Any) -> Agentinput | str:
+        """validated input, or the error message"""
+        if isinstance(raw_input, self.input_schema):
+            return raw_input  # validated upstream (trusted orchestrator step)
 
-        # 1) input validation
         try:
-            validated_input = self.input_schema(**raw_input)
+            return schema_validator(self.input_schema)(raw_input)
         except ValidationError as e:
-            record.status = "error"
-            record.error = f"InputvalidationError: {e}"
-            record.end_ts = time.time()
-            record.duration_s = record.end_ts - start_ts
+            return f"InputvalidationError: {e}"
 
-            # Run on_error hooks
-            self._run_hooks("on_error", record)
+    def _input_error(self, raw_input: Any, start_ts: float, error: str) -> Tuple[Agentoutput, AgentrunRecord]:
+        record = self._record(raw_input, start_ts, "error", error=error)
 
-            return Agentoutput(output={}, confidence=0.0, metadata={"error": "input_validation"}), record
+        # Run on_error hooks
+        self._run_hooks("on_error", record)
 
-        # 2) before hooks
-        self._run_hooks("before", record)
+        return Agentoutput(output={}, confidence=0.0, metadata={"error": "input_validation"}), record
 
-        # 3) Core execution (prepare + execute + finalize)
-        try:
-            self.prepare(validated_input, context)
-
-            result_raw = self.execute(validated_input, context)
-
-            if isinstance(result_raw, dict): # if the output is dict then convert dict to validated AgentOutput
-                result = self.output_schema(**result_raw)
-            elif isinstance(result_raw, Agentoutput): # if the output is already AgentOutput, use directly
-                result = result_raw
-            else:        
-                result = self.output_schema(
-                    **(
-                        result_raw.dict() 
-                        if hasattr(result_raw, "dict")  # if result_raw has a dict method, use same
-                        else dict(result_raw)))  # else convert to dict and use 
-
-            # finalize
-            self.finalize(validated_input, result, context)
-
-            record.status = "success"
-            record.output = result.output
-            record.end_ts = time.time()
-            record.duration_s = record.end_ts - start_ts
-            # after hooks
-            self._run_hooks("after", record)
-            return result, record
-
-        except Exception as exc:
-            record.status = "error"
-            record.error = f"{type(exc).__name__}: {str(exc)}\n{traceback.format_exc()}"
-
-            record.end_ts = time.time()
-            record.duration_s = record.end_ts - start_ts
-
-            # on_error hooks
-            self._run_hooks("on_error", record)
-
-            return (
-                Agentoutput(
-                    output={"error": str(exc)},
-                    confidence=0.0,
-                    metadata={"exception_type": type(exc).__name__},
-                ),
-                record,
-            )
-        
+    def _before(self, raw_input: Any, start_ts: float) -> None:
+        # a "running" record only exists if a before hook wants to see it
+        if self.hooks.get("before"):
+            self._run_hooks("before", self._record(raw_input, start_ts, "running"))
+
+    def _coerce_output(self, result_raw: Any) -> Agentoutput:
+        if isinstance(result_raw, Agentoutput): # if the output is already AgentOutput, use directly
+            return result_raw
+
+        validate = schema_validator(self.output_schema)
+        if isinstance(result_raw, dict): # if the output is dict then convert dict to validated AgentOutput
+            return validate(result_raw)
+        if isinstance(result_raw, BaseModel): # other pydantic models, dump and revalidate
+            return validate(result_raw.model_dump())
+        return validate(
+            result_raw.dict()
+            if hasattr(result_raw, "dict")  # if result_raw has a dict method, use same
+            else dict(result_raw))  # else convert to dict and use
+
+    def _succeed(self, raw_input: Any, start_ts: float, scope: RunScope, result: Agentoutput) -> AgentrunRecord:
+        record = self._record(raw_input, start_ts, "success", output=result.output, scope=scope)
+
+        # after hooks
+        self._run_hooks("after", record)
+        return record
+
+    def timeout_result(self, raw_input: Any, start_ts: float, reason: str) -> Tuple[Agentoutput, AgentrunRecord]:
+        """
+        result for a run the caller stopped waiting for (orchestrator step
+        timeouts). the run itself may still finish in the background,
+        its own record is not reported.
+        """
+        record = self._record(raw_input, start_ts, "timeout", error=f"DeadlineExceeded: {reason}")
+        self._run_hooks("on_error", record)
+        return Agentoutput(output={"error": reason}, confidence=0.0, metadata={"exception_type": "DeadlineExceeded"}), record
+
+    def _fail(self, raw_input: Any, start_ts: float, scope: RunScope, exc: Exception) -> Tuple[Agentoutput, AgentrunRecord]:
+        # running out of time is told apart from failing (see engine.deadline)
+        status = "timeout" if isinstance(exc, (DeadlineExceeded, TimeoutError)) else "error"
+        record = self._record(raw_input, start_ts, status, error=f"{type(exc).__name__}: {str(exc)}", scope=scope)
+
+        # formatting the traceback is the expensive part, keep the exception
+        # and format on read (error_traceback / model_dump). frame locals are
+        # dropped so a kept record doesnt pin the whole call stack in memory
+        traceback.clear_frames(exc.__traceback__)
+        record.exception = exc
+
+        # on_error hooks
+        self._run_hooks("on_error", record)
+
+        return Agentoutput(
+            output={"error": str(exc)},
+            confidence=0.0,
+            metadata={"exception_type": type(exc).__name__},
+        ), record
+
+    def _merge_scope(self, record: AgentrunRecord, scope: RunScope) -> None:
+        for section, values in scope.extra.items():
+            record.extra.setdefault(section, {}).update(values)
+
+        usage = record.extra.get("usage")
+        if usage:
+            record.tokens_used = int(usage.get("total_tokens", 0))
@@ -0,0 +1,155 @@
+import json
+import math
+import random
+import time
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+
+# jsonl io helpers, kept streaming so a nightly batch never sits in memory
+
+def read_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield one workflow input per non empty line.
+    Lines without a "payload" key are treated as a bare payload.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+
+            item = json.loads(line)
+            if "payload" not in item:
+                item = {"payload": item, "metadata": {}}
+            yield item
+
+
+class JsonlWriter:
+    """
+    Appends one compact json line per workflow result and flushes as it goes
+    """
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+
+    def write(self, index: int, result: Dict[str, Any]) -> None:
+        self.stream.write(json.dumps(result_to_dict(index, result), default=str) + "\n")
+        self.stream.flush()
+
+
+def result_to_dict(index: int, result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Slim, json friendly view of an Orchestrator.run result.
+    Full records are left out (MemoryHook already persists them).
+    """
+    final_output = result.get("final_output")
+
+    return {
+        "index": index,
+        "status": result["status"],
+        "final_output": final_output.model_dump() if final_output is not None else None,
+        "error": result.get("error"),
+        "agents": [
+            {"agent_name": rec.agent_name, "status": rec.status, "duration_s": rec.duration_s}
+            for rec in result.get("rec_history", [])
+        ],
+    }
+
+
+# stats
+
+class LatencySample:
+    """
+    Count, mean and max of every latency seen, plus a fixed size uniform
+    sample of them (reservoir sampling) for the percentiles, so a batch of
+    any size is summarized in constant memory. Percentiles are exact until
+    more than `size` latencies were added.
+    """
+
+    def __init__(self, size: int = 2048, seed: Optional[int] = None):
+        self.size = size
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.sample: List[float] = []
+        self._random = random.Random(seed)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+        if len(self.sample) < self.size:
+            self.sample.append(value)
+            return
+
+        # keep each of the `count` values seen with probability size / count
+        slot = self._random.randrange(self.count)
+        if slot < self.size:
+            self.sample[slot] = value
+
+
+class BatchStats:
+    """
+    Collects throughput, failure counts and per agent latency
+    while results stream past. Memory stays flat however many
+    results are added (see LatencySample).
+    """
+
+    def __init__(self, sample_size: int = 2048):
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+        self.total = 0
+        self.failed = 0
+        self.sample_size = sample_size
+        self.agent_latency: Dict[str, LatencySample] = {}
+        self.agent_failures: Dict[str, int] = {}
+
+    def add(self, result: Dict[str, Any]) -> None:
+        self.total += 1
+        if result["status"] != "success":
+            self.failed += 1
+
+        for rec in result.get("rec_history", []):
+            if rec.duration_s is not None:
+                latency = self.agent_latency.get(rec.agent_name)
+                if latency is None:
+                    latency = self.agent_latency[rec.agent_name] = LatencySample(self.sample_size)
+                latency.add(rec.duration_s)
+            if rec.status != "success":
+                self.agent_failures[rec.agent_name] = self.agent_failures.get(rec.agent_name, 0) + 1
+
+    def finish(self) -> None:
+        self.finished_at = time.perf_counter()
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+
+        agents = {}
+        for name, latency in self.agent_latency.items():
+            ordered = sorted(latency.sample)
+            agents[name] = {
+                "count": latency.count,
+                "failures": self.agent_failures.get(name, 0),
+                "mean_s": latency.total / latency.count,
+                "p50_s": percentile(ordered, 50),
+                "p95_s": percentile(ordered, 95),
+                "max_s": latency.max,
+            }
+
+        return {
+            "total": self.total,
+            "succeeded": self.total - self.failed,
+            "failed": self.failed,
+            "elapsed_s": elapsed,
+            "throughput_per_s": self.total / elapsed if elapsed > 0 else 0.0,
+            "agents": agents,
+        }
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """nearest rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
@@ -0,0 +1,121 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+class BudgetExceeded(Exception):
+    """
+    Raised when a workflow has used up its token or cost budget.
+    Like GuardrailViolation it is a control flow exception.
+    """
+    pass
+
+
+class WorkflowBudget:
+    """
+    Running token / cost totals for one workflow run, with optional limits.
+
+    LLM providers report usage through engine.run_scope / record_usage,
+    which also lands here via the current budget contextvar.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, max_cost_usd: Optional[float] = None):
+        self.max_tokens = max_tokens
+        self.max_cost_usd = max_cost_usd
+
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.total_tokens = 0
+        self.cost_usd = 0.0
+        self.llm_calls = 0
+        self._lock = threading.Lock()   # dag steps report from several threads
+
+    def add(self, input_tokens: int = 0, output_tokens: int = 0, total_tokens: int = 0, cost_usd: float = 0.0, calls: int = 1) -> None:
+        with self._lock:
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+            self.total_tokens += total_tokens or (input_tokens + output_tokens)
+            self.cost_usd += cost_usd
+            self.llm_calls += calls
+
+    def add_records(self, records: Iterable[Any]) -> None:
+        """seed totals from records of an earlier attempt (resume)"""
+        for rec in records:
+            usage = rec.extra.get("usage", {})
+            self.add(
+                input_tokens=usage.get("input_tokens", 0),
+                output_tokens=usage.get("output_tokens", 0),
+                total_tokens=usage.get("total_tokens", 0),
+                cost_usd=usage.get("cost_usd", 0.0),
+                calls=usage.get("llm_calls", 0),
+            )
+
+    def exceeded(self) -> Optional[str]:
+        if self.max_tokens is not None and self.total_tokens >= self.max_tokens:
+            return f"token budget exceeded ({self.total_tokens}/{self.max_tokens})"
+        if self.max_cost_usd is not None and self.cost_usd >= self.max_cost_usd:
+            return f"cost budget exceeded (${self.cost_usd:.4f}/${self.max_cost_usd:.4f})"
+        return None
+
+    def check(self) -> None:
+        reason = self.exceeded()
+        if reason:
+            raise BudgetExceeded(reason)
+
+    def totals(self) -> Dict[str, Any]:
+        return {
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "total_tokens": self.total_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "llm_calls": self.llm_calls,
+        }
+
+
+_current_budget: ContextVar[Optional[WorkflowBudget]] = ContextVar("zap_workflow_budget", default=None)
+
+
+def current_budget() -> Optional[WorkflowBudget]:
+    return _current_budget.get()
+
+
+@contextmanager
+def use_budget(budget: Optional[WorkflowBudget]) -> Iterator[Optional[WorkflowBudget]]:
+    """None runs the block without a budget (usage is charged by hand, see split_usage)"""
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
+
+
+def check_budget() -> None:
+    """call before spending (eg: an llm call), no-op outside a budgeted workflow"""
+    budget = _current_budget.get()
+    if budget is not None:
+        budget.check()
+
+
+def split_usage(usage: Dict[str, Any], n: int) -> List[Dict[str, Any]]:
+    """
+    Usage (or other telemetry, eg: retry counts) of one llm call shared by
+    `n` runs (a batched call), as n parts that add up to the whole: counts
+    are split as integers (the first parts get the remainder), costs
+    evenly. Anything else (eg: per call details, "calls") goes with the
+    first part, so it is not repeated.
+    """
+    parts: List[Dict[str, Any]] = [{} for _ in range(n)]
+    for key, value in usage.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            if n:
+                parts[0][key] = value
+            continue
+        for i, part in enumerate(parts):
+            if isinstance(value, int):
+                share = value // n + (1 if i < value % n else 0)
+            else:
+                share = value / n
+            if share:
+                part[key] = share
+    return parts
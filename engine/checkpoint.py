@@ -0,0 +1,111 @@
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from engine.agent_base import Agentoutput, AgentrunRecord
+
+
+class WorkflowState:
+    """
+    Everything the orchestrator needs to continue a workflow run:
+    the shared context, the input for the next linear step,
+    outputs of completed steps and the records so far.
+    """
+
+    def __init__(
+        self,
+        initial_input: Dict[str, Any],
+        context: Optional[Dict[str, Any]] = None,
+        run_id: Optional[str] = None,
+        current_input: Optional[Dict[str, Any]] = None,
+        outputs: Optional[Dict[str, Agentoutput]] = None,
+        rec_history: Optional[List[AgentrunRecord]] = None,
+        status: str = "running",
+    ):
+        self.run_id = run_id or str(uuid.uuid4())
+        self.initial_input = initial_input
+        self.context = context if context is not None else {}
+        self.current_input = current_input if current_input is not None else initial_input
+        self.outputs = outputs or {}           # agent name -> output of completed steps
+        self.rec_history = rec_history or []
+        self.status = status
+
+        # per attempt, not persisted (budget totals are rebuilt from rec_history)
+        self.budget = None
+        self.profiler = None
+        self.deadline = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "status": self.status,
+            "updated_at": time.time(),
+            "initial_input": self.initial_input,
+            "context": self.context,
+            "current_input": self.current_input,
+            "outputs": {name: out.model_dump() for name, out in self.outputs.items()},
+            "rec_history": [rec.model_dump() for rec in self.rec_history],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "WorkflowState":
+        return cls(
+            initial_input=data["initial_input"],
+            context=data.get("context") or {},
+            run_id=data["run_id"],
+            current_input=data.get("current_input"),
+            outputs={name: Agentoutput(**out) for name, out in data.get("outputs", {}).items()},
+            rec_history=[AgentrunRecord(**rec) for rec in data.get("rec_history", [])],
+            status=data.get("status", "running"),
+        )
+
+
+class CheckpointStore:
+    """
+    One json file per workflow run id.
+    Writes go to a temp file first and are swapped in with os.replace,
+    so a crash mid write never leaves a half written checkpoint.
+
+    Everything in the state (context included) must be json serializable:
+    a value that isnt fails the save with a TypeError, instead of being
+    stringified into something resume cant use.
+    """
+
+    def __init__(self, directory: str = "data/checkpoints"):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    def save(self, state: WorkflowState) -> None:
+        path = self._path(state.run_id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+
+        # serialize before opening the file, a bad value leaves nothing behind
+        try:
+            data = json.dumps(state.to_dict())
+        except (TypeError, ValueError) as exc:
+            raise TypeError(f"checkpoint for run '{state.run_id}' is not json serializable: {exc}") from exc
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+
+        os.replace(tmp_path, path)
+
+    def load(self, run_id: str) -> Optional[WorkflowState]:
+        path = self._path(run_id)
+        if not os.path.exists(path):
+            return None
+
+        with open(path, "r", encoding="utf-8") as f:
+            return WorkflowState.from_dict(json.load(f))
+
+    def delete(self, run_id: str) -> None:
+        path = self._path(run_id)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _path(self, run_id: str) -> str:
+        safe = "".join(ch for ch in run_id if ch.isalnum() or ch in "-_")
+        return os.path.join(self.directory, f"{safe}.json")
@@ -1,9 +1,94 @@
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+
+def _find_env_file():
+    # same lookup as load_dotenv(): from this folder up to the filesystem root
+    folder = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        path = os.path.join(folder, ".env")
+        if os.path.isfile(path):
+            return path
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            return None
+        folder = parent
+
+
+# read once per process, on first import. dotenv itself is only imported
+# when there is a .env to load (containers usually get a plain environment)
+_ENV_FILE = _find_env_file()
+if _ENV_FILE:
+    from dotenv import load_dotenv
+    load_dotenv(_ENV_FILE)
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# one provider, or a comma separated list of provider[:model] backends for RouterLLM,
+# eg: "gemini,gemini:gemini-2.5-flash,http"
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
-GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-3-flash-preview")
\ No newline at end of file
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-3-flash-preview")
+# upload static prompt prefixes once as gemini cached content (prefixes below the
+# model's minimum cacheable size are sent inline as system instruction instead)
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "off") == "on"
+GEMINI_CACHE_TTL_SECONDS = float(os.getenv("GEMINI_CACHE_TTL_SECONDS", "3600"))
+GEMINI_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CACHE_MIN_TOKENS", "1024"))
+LLM_HTTP_URL = os.getenv("LLM_HTTP_URL", "")
+
+# router health: eject a backend after this many consecutive failures, for this long (doubling)
+LLM_ROUTER_EJECT_AFTER = int(os.getenv("LLM_ROUTER_EJECT_AFTER", "3"))
+LLM_ROUTER_EJECT_SECONDS = float(os.getenv("LLM_ROUTER_EJECT_SECONDS", "30"))
+
+# llm response cache: off | memory | sqlite
+LLM_CACHE = os.getenv("LLM_CACHE", "off")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/llm_cache.sqlite")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+
+# coalesce identical concurrent llm requests into one upstream call
+LLM_SINGLE_FLIGHT = os.getenv("LLM_SINGLE_FLIGHT", "on") == "on"
+
+# retry / circuit breaker settings for RetryLLM
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "20"))
+
+# client side pacing (0 = unlimited). set LLM_RATE_STATE_PATH to share quota across processes
+LLM_RPM = float(os.getenv("LLM_RPM", "0"))
+LLM_TPM = float(os.getenv("LLM_TPM", "0"))
+LLM_RATE_STATE_PATH = os.getenv("LLM_RATE_STATE_PATH") or None
+
+# hedge slow llm calls: a second identical request once a call is slower than the
+# given latency percentile, for at most LLM_HEDGE_MAX_RATE of calls
+LLM_HEDGE = os.getenv("LLM_HEDGE", "off") == "on"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+LLM_HEDGE_MAX_RATE = float(os.getenv("LLM_HEDGE_MAX_RATE", "0.1"))
+
+# bulk runs: concurrent llm calls (eg: the same step of many briefs) are collected for up to
+# LLM_BATCH_WAIT_MS and packed, LLM_BATCH_SIZE prompts per upstream request
+LLM_BATCH = os.getenv("LLM_BATCH", "off") == "on"
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "8"))
+LLM_BATCH_WAIT_MS = float(os.getenv("LLM_BATCH_WAIT_MS", "10"))
+
+# upper bounds in seconds (0 = none): a whole workflow run, and each llm step in it.
+# llm calls and retries under them use the remaining time as their timeout
+WORKFLOW_TIMEOUT_S = float(os.getenv("WORKFLOW_TIMEOUT_S", "0"))
+LLM_STEP_TIMEOUT_S = float(os.getenv("LLM_STEP_TIMEOUT_S", "0"))
+
+# pricing used for cost accounting (usd per 1M tokens, 0 = unknown)
+LLM_INPUT_PRICE_PER_1M = float(os.getenv("LLM_INPUT_PRICE_PER_1M", "0"))
+LLM_OUTPUT_PRICE_PER_1M = float(os.getenv("LLM_OUTPUT_PRICE_PER_1M", "0"))
+
+# stream llm responses, agents then report each json field as soon as it is complete
+LLM_STREAM = os.getenv("LLM_STREAM", "off") == "on"
+
+# structured logs (engine.log_sink): one json line per event, stderr unless LOG_FILE is set
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
+LOG_FILE = os.getenv("LOG_FILE") or None
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", "0"))          # rotate LOG_FILE at this size, 0 = never
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", "3"))
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "2000"))
+LOG_REDACT_KEYS = [key.strip() for key in os.getenv("LOG_REDACT_KEYS", "api_key,authorization,password").split(",") if key.strip()]
+# keep one in N of an event, e.g. "agent.partial=10,agent.start=5"
+LOG_SAMPLE = {
+    event.strip(): int(every)
+    for event, _, every in (item.partition("=") for item in os.getenv("LOG_SAMPLE", "").split(",") if "=" in item)
+}
@@ -0,0 +1,106 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when a workflow run (or one of its steps) is out of time.
+    Like BudgetExceeded it is a control flow exception, never retried,
+    and the agent run that raises it is recorded with status "timeout".
+    """
+    pass
+
+
+class Deadline:
+    """
+    A point in time (monotonic clock) by which a run has to be done.
+
+    Orchestrator sets one per workflow run (timeout_s) and a tighter one
+    around every step with WorkflowStep.timeout_s. Code further down
+    reads the remaining time instead of using fixed timeouts: llm calls
+    use it as their request timeout, RetryLLM stops retrying once a retry
+    can no longer finish in time.
+    """
+
+    def __init__(self, seconds: float, what: str = "deadline"):
+        self.seconds = seconds
+        self.what = what
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def check(self) -> None:
+        if self.expired():
+            raise DeadlineExceeded(self.reason())
+
+    def reason(self) -> str:
+        return f"{self.what} of {self.seconds:g}s exceeded"
+
+    def within(self, seconds: Optional[float], what: str) -> "Deadline":
+        """the tighter of this deadline and one `seconds` from now"""
+        if seconds is None or seconds >= self.remaining():
+            return self
+        return Deadline(seconds, what)
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("zap_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def step_deadline(seconds: Optional[float], what: str) -> Optional[Deadline]:
+    """the deadline for something that may take `seconds`, never later than the current one"""
+    current = _current_deadline.get()
+    if current is not None:
+        return current.within(seconds, what)
+    return Deadline(seconds, what) if seconds is not None else None
+
+
+@contextmanager
+def use_deadline(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+# no-ops (or the given default) when nothing set a deadline
+
+def remaining_time() -> Optional[float]:
+    deadline = _current_deadline.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+def check_deadline() -> None:
+    """call before starting something slow (eg: an llm call)"""
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.check()
+
+
+def call_timeout(default: Optional[float] = None) -> Optional[float]:
+    """
+    timeout for one blocking call: the remaining time, capped by the
+    caller's own `default`. Raises DeadlineExceeded when nothing is left.
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return default
+    deadline.check()
+    remaining = deadline.remaining()
+    return remaining if default is None else min(default, remaining)
+
+
+def deadline_hit() -> bool:
+    """True when a deadline is set and has passed (eg: to tell a deadline timeout from a provider one)"""
+    deadline = _current_deadline.get()
+    return deadline is not None and deadline.expired()
@@ -0,0 +1,153 @@
+import asyncio
+import atexit
+import inspect
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from engine.log_sink import get_sink
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "sample")
+
+
+class BackgroundDispatcher:
+    """
+    Runs hook callbacks on one background thread, off the workflow's
+    critical path. Events are handled in the order they were submitted.
+
+    The queue is bounded, what happens when it is full depends on `overflow`:
+        block       -> the submitting thread waits for room (nothing is lost)
+        drop_oldest -> the oldest queued event makes room for the new one
+        sample      -> once the queue is half full only every `sample_every`th
+                       event is queued, the rest (and anything that still
+                       doesnt fit) is dropped
+
+    flush() waits until everything queued so far was handled, close() flushes
+    and stops the worker. close() also runs at interpreter exit.
+    """
+
+    def __init__(self, max_queue: int = 1000, overflow: str = "block", sample_every: int = 10):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got '{overflow}'")
+        if max_queue < 1:
+            raise ValueError("max_queue must be at least 1")
+
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.sample_every = max(1, sample_every)
+
+        self._queue: Deque[Tuple[str, Callable[..., Any], tuple]] = deque()
+        self._cond = threading.Condition()
+        self._busy = False             # worker is running a callback right now
+        self._closed = False
+        self._worker: Optional[threading.Thread] = None
+        self._seen_under_pressure = 0
+        self._counts = {"submitted": 0, "processed": 0, "dropped": 0, "errors": 0}
+
+        atexit.register(self.close)
+
+    def submit(self, name: str, callback: Callable[..., Any], args: tuple) -> bool:
+        """queue one callback, returns False if the event was dropped"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("dispatcher is closed")
+
+            self._ensure_worker()
+            self._counts["submitted"] += 1
+
+            if not self._make_room():
+                self._counts["dropped"] += 1
+                return False
+
+            self._queue.append((name, callback, args))
+            if len(self._queue) == 1:
+                self._cond.notify_all()  # the worker only sleeps on an empty queue
+            return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """wait until the queue is drained, False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        drained = self.flush(timeout)
+
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            worker = self._worker
+
+        if worker is not None and worker is not threading.current_thread():
+            worker.join(timeout)
+
+        atexit.unregister(self.close)
+        return drained
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {**self._counts, "queued": len(self._queue)}
+
+    # internal helpers (called with the condition held)
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="zap-hook-dispatch", daemon=True)
+            self._worker.start()
+
+    def _make_room(self) -> bool:
+        if self.overflow == "sample" and len(self._queue) >= self.max_queue // 2:
+            self._seen_under_pressure += 1
+            if self._seen_under_pressure % self.sample_every:
+                return False
+
+        if len(self._queue) < self.max_queue:
+            return True
+
+        if self.overflow == "drop_oldest":
+            self._queue.popleft()
+            self._counts["dropped"] += 1
+            return True
+
+        if self.overflow == "block":
+            while len(self._queue) >= self.max_queue and not self._closed:
+                self._cond.wait()
+            return not self._closed
+
+        return False  # sample, and even the sampled event doesnt fit
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return  # closed and drained
+
+                name, callback, args = self._queue.popleft()
+                self._busy = True
+                self._cond.notify_all()  # room for blocked producers
+
+            try:
+                result = callback(*args)
+                if inspect.isawaitable(result):
+                    asyncio.run(_await(result))  # async hooks get a loop of their own here
+            except Exception as e:
+                with self._cond:
+                    self._counts["errors"] += 1
+                get_sink().error("hook.error", method=name, error=repr(e), deferred=True)
+
+            with self._cond:
+                self._busy = False
+                self._counts["processed"] += 1
+                self._cond.notify_all()
+
+
+async def _await(awaitable: Any) -> Any:
+    return await awaitable
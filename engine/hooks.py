@@ -1,6 +1,11 @@
-from typing import Any, List
+import inspect
+import time
+from typing import Any, Dict, List, Optional
 
 from engine.guardrails import GuardrailViolation
+from engine.hook_dispatch import BackgroundDispatcher
+from engine.log_sink import get_sink
+from engine.profiling import current_profiler, hook_agent_name
 
 
 class BaseHook:
@@ -14,8 +19,14 @@ class BaseHook:
 
     We can pick and choose which methods to override.
     Missing methods are automatically ignored, so no worries.
+
+    deferrable = True lets a HookManager in background mode run the hook
+    off the critical path. Only for pure observers: a deferred hook sees
+    events late and cant stop the run (guardrails must stay False).
     """
 
+    deferrable: bool = False
+
     # workflow lvl stuff
     def on_workflow_start(self, initial_input: dict) -> None:
         pass
@@ -34,6 +45,11 @@ class BaseHook:
     def on_agent_error(self, agent: Any, error: Exception, record: Any) -> None:
         pass
 
+    # streaming agents only: one call per completed top level field.
+    # in dag mode this fires on the worker thread running the agent
+    def on_agent_partial(self, agent: Any, field: str, value: Any, partial: dict) -> None:
+        pass
+
 
 class HookManager:
     """
@@ -41,16 +57,64 @@ class HookManager:
 
     orchestrator will use this to fire hook events
     without knowing what hooks actually do.
+
+    background=True (opt-in) hands deferrable hooks to a BackgroundDispatcher:
+    events go on a bounded queue (`max_queue`, `overflow` = block | drop_oldest
+    | sample) and a worker thread runs them. Other hooks still run inline,
+    in order, so GuardrailViolation still stops the run.
+    Hooks get the same objects as inline, not copies.
+    Call flush() / close() before reading what deferred hooks produced.
     """
 
-    def __init__(self, hooks: List[BaseHook] | None = None):
+    def __init__(
+        self,
+        hooks: List[BaseHook] | None = None,
+        background: bool = False,
+        max_queue: int = 1000,
+        overflow: str = "block",
+        sample_every: int = 10,
+    ):
         self.hooks = hooks or []
+        self.dispatcher: Optional[BackgroundDispatcher] = None
+        if background:
+            self.dispatcher = BackgroundDispatcher(max_queue, overflow, sample_every)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """wait for queued events, True when everything was handled"""
+        return self.dispatcher.flush(timeout) if self.dispatcher else True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        return self.dispatcher.close(timeout) if self.dispatcher else True
+
+    def dispatch_stats(self) -> Dict[str, int]:
+        return self.dispatcher.stats() if self.dispatcher else {}
+
+    def _deferred(self, hook: BaseHook, method_name: str, callback: Any, args: tuple) -> bool:
+        if self.dispatcher is None or not getattr(hook, "deferrable", False):
+            return False
+        if getattr(type(hook), method_name, None) is not getattr(BaseHook, method_name, None):
+            self.dispatcher.submit(method_name, callback, args)  # no need to queue BaseHook's no-ops
+        return True
 
     #internal method
     def _call(self, method_name: str, *args) -> None:
+        # partials fire inside the agent run, its own timers already cover them
+        profiler = current_profiler()
+        if profiler is None or method_name == "on_agent_partial":
+            return self._dispatch(method_name, args)
+
+        started = time.perf_counter()
+        try:
+            self._dispatch(method_name, args)
+        finally:
+            profiler.add_hook_time(hook_agent_name(method_name, args), time.perf_counter() - started)
+
+    def _dispatch(self, method_name: str, args: tuple) -> None:
         for hook in self.hooks:
             callback = getattr(hook, method_name, None)
-            if callable(callback):               
+            if callable(callback):
+                if self._deferred(hook, method_name, callback, args):
+                    continue
                 try:
                     callback(*args)
 
@@ -59,7 +123,36 @@ class HookManager:
 
                 except Exception as e:
                     # very important: hooks must not crash everything
-                    print(f"[HookManager] Hook error in {method_name}: {e}")
+                    get_sink().error("hook.error", hook=type(hook).__name__, method=method_name, error=repr(e))
+
+    async def _acall(self, method_name: str, *args) -> None:
+        profiler = current_profiler()
+        if profiler is None or method_name == "on_agent_partial":
+            return await self._adispatch(method_name, args)
+
+        started = time.perf_counter()
+        try:
+            await self._adispatch(method_name, args)
+        finally:
+            profiler.add_hook_time(hook_agent_name(method_name, args), time.perf_counter() - started)
+
+    async def _adispatch(self, method_name: str, args: tuple) -> None:
+        # same as _dispatch, but hooks are allowed to be `async def`
+        for hook in self.hooks:
+            callback = getattr(hook, method_name, None)
+            if callable(callback):
+                if self._deferred(hook, method_name, callback, args):
+                    continue
+                try:
+                    result = callback(*args)
+                    if inspect.isawaitable(result):
+                        await result
+
+                except GuardrailViolation:
+                    raise
+
+                except Exception as e:
+                    get_sink().error("hook.error", hook=type(hook).__name__, method=method_name, error=repr(e))
 
 
     # Public methods — these are the ones the orchestrator calls
@@ -77,3 +170,26 @@ class HookManager:
 
     def agent_error(self, agent: Any, error: Exception, record: Any) -> None:
         self._call("on_agent_error", agent, error, record)
+
+    def agent_partial(self, agent: Any, field: str, value: Any, partial: dict) -> None:
+        self._call("on_agent_partial", agent, field, value, partial)
+
+
+    # async twins, used by AsyncOrchestrator
+    async def aworkflow_start(self, initial_input: dict) -> None:
+        await self._acall("on_workflow_start", initial_input)
+
+    async def aworkflow_end(self, result: dict, rec_history: list) -> None:
+        await self._acall("on_workflow_end", result, rec_history)
+
+    async def abefore_agent(self, agent: Any, agent_input: dict) -> None:
+        await self._acall("before_agent_run", agent, agent_input)
+
+    async def aafter_agent(self, agent: Any, agent_output: Any, record: Any) -> None:
+        await self._acall("after_agent_run", agent, agent_output, record)
+
+    async def aagent_error(self, agent: Any, error: Exception, record: Any) -> None:
+        await self._acall("on_agent_error", agent, error, record)
+
+    async def aagent_partial(self, agent: Any, field: str, value: Any, partial: dict) -> None:
+        await self._acall("on_agent_partial", agent, field, value, partial)
@@ -0,0 +1,229 @@
+import copy
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from engine.agent_base import BaseAgent, Agentinput, Agentoutput, AgentrunRecord
+from engine.budget import check_budget, split_usage
+from engine.profiling import section
+from engine.prompts import record_prompt
+from engine.run_scope import open_scope, scope_append, scope_incr, scope_set
+from engine.streaming import aemit_partial, emit_partial
+
+
+class LLMAgent(BaseAgent):
+    """
+    Base for agents whose work is (build prompt -> call llm -> parse json)
+
+    Splitting the agent into build_prompt / parse_response lets the same
+    agent run through the sync and async paths without duplicating logic.
+    The llm is duck typed (anything with generate_json / agenerate_json),
+    so the engine doesnt depend on extensions.
+
+    build_prompt may return a plain str or a Prompt rendered from a
+    PromptTemplate (engine.prompts), which keeps the static instructions
+    apart so providers can send / cache them separately. Either way the
+    estimated size goes into AgentrunRecord.extra["prompt"].
+
+    With stream=True the llm is read through stream_json / astream_json and
+    every completed top level field is emitted as partial output
+    (engine.streaming, HookManager on_agent_partial) before parsing.
+
+    run_batch / arun_batch run many inputs with one llm.generate_json_batch
+    call (see extensions.llm.batching), each input still gets its own
+    output and record.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        llm: Any,
+        description: str = "",
+        input_schema: type = Agentinput,
+        output_schema: type = Agentoutput,
+        allowed_tools: Optional[Iterable[str]] = None,
+        stream: bool = False,
+    ):
+        super().__init__(
+            name=name,
+            description=description,
+            input_schema=input_schema,
+            output_schema=output_schema,
+            allowed_tools=allowed_tools,
+        )
+
+        self.llm = llm
+        self.stream = stream
+
+    # subclasses implement these two
+
+    def build_prompt(self, validated_input: Agentinput, context: Dict[str, Any]) -> str:
+        raise NotImplementedError("LLM agents must implement build_prompt(...)")
+
+    def parse_response(self, llm_response: Dict[str, Any], validated_input: Agentinput) -> Agentoutput:
+        raise NotImplementedError("LLM agents must implement parse_response(...)")
+
+    # batch runs
+
+    def run_batch(
+        self,
+        raw_inputs: Sequence[Dict[str, Any] | Agentinput],
+        context: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[Agentoutput, AgentrunRecord]]:
+        """
+        run() for many inputs, with the llm asked once for all of them.
+
+        Prompts are built up front and sent as one generate_json_batch
+        (a plain loop for llms without it), then every input goes through
+        run() as usual, served from those answers. So hooks, records and
+        failures stay per input, an input whose item failed gets an error
+        record of its own. The batch call's usage is split across the records.
+        """
+        context = context or {}
+        check_budget()
+        prompts, usage_parts = self._batch_prompts(raw_inputs, context)
+
+        with open_scope() as shared:
+            llm = self.llm
+            if hasattr(llm, "generate_json_batch"):
+                results = llm.generate_json_batch(prompts)
+            else:
+                results = [_call_or_error(llm.generate_json, prompt) for prompt in prompts]
+
+        with _serving(prompts, results, shared.extra.get("usage", {}), usage_parts):
+            return [self.run(raw_input, context) for raw_input in raw_inputs]
+
+    async def arun_batch(
+        self,
+        raw_inputs: Sequence[Dict[str, Any] | Agentinput],
+        context: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[Agentoutput, AgentrunRecord]]:
+        """async twin of run_batch"""
+        context = context or {}
+        check_budget()
+        prompts, usage_parts = self._batch_prompts(raw_inputs, context)
+
+        with open_scope() as shared:
+            llm = self.llm
+            if hasattr(llm, "agenerate_json_batch"):
+                results = await llm.agenerate_json_batch(prompts)
+            else:
+                results = [await _acall_or_error(llm.agenerate_json, prompt) for prompt in prompts]
+
+        with _serving(prompts, results, shared.extra.get("usage", {}), usage_parts):
+            return [await self.arun(raw_input, context) for raw_input in raw_inputs]
+
+    def _batch_prompts(self, raw_inputs: Sequence[Any], context: Dict[str, Any]) -> Tuple[List[str], int]:
+        # distinct prompts of the valid inputs, and how many runs share the call.
+        # prompts are built again inside run (cheap), one that comes out
+        # different there (eg: prepare changed the context) just calls the llm
+        prompts: Dict[str, None] = {}
+        runs = 0
+        for raw_input in raw_inputs:
+            validated_input = self._validate_input(raw_input)
+            if isinstance(validated_input, Agentinput):
+                prompts[self.build_prompt(validated_input, context)] = None
+                runs += 1
+        return list(prompts), runs
+
+    # lifecycle
+
+    # section(...) only times anything on profiled runs (engine.profiling)
+
+    def execute(self, validated_input: Agentinput, context: Dict[str, Any]) -> Agentoutput:
+        with section("build_prompt"):
+            prompt = self.build_prompt(validated_input, context)
+        record_prompt(prompt)
+        check_budget()  # dont start a call the workflow cant afford
+
+        with section("llm"):
+            if _take_served(prompt):
+                llm_response = _served_response(prompt)
+            elif not self.stream:
+                llm_response = self.llm.generate_json(prompt)
+            else:
+                llm_response = {}
+                for field, value in self.llm.stream_json(prompt):
+                    llm_response[field] = value
+                    emit_partial(self, field, value, dict(llm_response))
+
+        with section("parse_response"):
+            return self.parse_response(llm_response, validated_input)
+
+    async def aexecute(self, validated_input: Agentinput, context: Dict[str, Any]) -> Agentoutput:
+        with section("build_prompt"):
+            prompt = self.build_prompt(validated_input, context)
+        record_prompt(prompt)
+        check_budget()
+
+        with section("llm"):
+            if _take_served(prompt):
+                llm_response = _served_response(prompt)
+            elif not self.stream:
+                llm_response = await self.llm.agenerate_json(prompt)
+            else:
+                llm_response = {}
+                async for field, value in self.llm.astream_json(prompt):
+                    llm_response[field] = value
+                    await aemit_partial(self, field, value, dict(llm_response))
+
+        with section("parse_response"):
+            return self.parse_response(llm_response, validated_input)
+
+
+# answers of a run_batch llm call, served to the runs that follow it
+
+class _Served:
+    def __init__(self, responses: Dict[str, Any], parts: List[Dict[str, Any]]):
+        self.responses = responses
+        self.parts = parts       # one usage share per run, taken in order
+        self.size = len(parts)
+
+
+_served: ContextVar[Optional[_Served]] = ContextVar("zap_batch_served", default=None)
+
+
+@contextmanager
+def _serving(prompts: List[str], results: List[Any], usage: Dict[str, Any], runs: int) -> Iterator[None]:
+    token = _served.set(_Served(dict(zip(prompts, results)), split_usage(usage, runs)))
+    try:
+        yield
+    finally:
+        _served.reset(token)
+
+
+def _take_served(prompt: str) -> bool:
+    served = _served.get()
+    return served is not None and prompt in served.responses
+
+
+def _served_response(prompt: str) -> Dict[str, Any]:
+    """the batched answer for this run, its usage share goes into the run's record"""
+    served = _served.get()
+    scope_set("batch", "size", served.size)
+    part = served.parts.pop(0) if served.parts else {}
+    for key, value in part.items():
+        if key == "calls":
+            for call in value:
+                scope_append("usage", "calls", call)
+        else:
+            scope_incr("usage", key, value)
+
+    result = served.responses[prompt]
+    if isinstance(result, Exception):
+        raise result
+    return copy.deepcopy(result)  # identical inputs share an answer, parse_response may mutate it
+
+
+def _call_or_error(fn: Any, prompt: str) -> Any:
+    try:
+        return fn(prompt)
+    except Exception as e:
+        return e
+
+
+async def _acall_or_error(fn: Any, prompt: str) -> Any:
+    try:
+        return await fn(prompt)
+    except Exception as e:
+        return e
@@ -0,0 +1,261 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, IO, Iterable, Optional
+
+from pydantic import BaseModel
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+
+class LogSink:
+    """
+    Structured log output: one compact json line per event.
+
+        {"ts": 1712345678.12, "level": "info", "event": "agent.end", "agent": "a", ...}
+
+    Cheap when nothing is written:
+    - events below `level` return before touching the fields
+    - `sample={"agent.partial": 10}` keeps one in 10 of those events
+      (warnings and errors are never sampled)
+    Fields are serialized only for lines that get written, then clipped:
+    strings to `max_field_chars`, lists / dicts to `max_items`, nesting to
+    `max_depth`, and values under `redact_keys` are replaced.
+
+    Writes go to `path` (buffered, `buffer_size` bytes, rotated to path.1 ..
+    path.<backups> once `max_bytes` is reached) or to `stream`
+    (stderr when neither is given). Error lines are flushed right away.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        stream: Optional[IO[str]] = None,
+        level: str = "info",
+        max_field_chars: int = 2000,
+        max_items: int = 100,
+        max_depth: int = 6,
+        redact_keys: Iterable[str] = (),
+        sample: Optional[Dict[str, int]] = None,
+        max_bytes: int = 0,
+        backups: int = 3,
+        buffer_size: int = 64 * 1024,
+    ):
+        if level not in LEVELS:
+            raise ValueError(f"unknown log level '{level}', expected one of {list(LEVELS)}")
+
+        self.path = path
+        self.level = level
+        self.threshold = LEVELS[level]
+        self.max_field_chars = max_field_chars
+        self.max_items = max_items
+        self.max_depth = max_depth
+        self.redact_keys = {key.lower() for key in redact_keys}
+        self.sample = dict(sample or {})
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.buffer_size = buffer_size
+
+        self._stream = stream
+        self._file: Optional[IO[str]] = None
+        self._size = 0
+        self._lock = threading.Lock()
+        self._seen: Dict[str, int] = {}
+        self._redact_memo: Dict[Any, bool] = {}
+        self._counts = {"written": 0, "sampled_out": 0, "rotations": 0}
+
+        if path:
+            self._open()
+            atexit.register(self.close)
+
+    def enabled(self, level: str) -> bool:
+        """guard for callers that need work to build their fields"""
+        return LEVELS[level] >= self.threshold
+
+    def log(self, level: str, event: str, **fields: Any) -> None:
+        severity = LEVELS[level]
+        if severity < self.threshold:
+            return
+
+        every = self.sample.get(event)
+        if every and severity < LEVELS["warning"] and not self._keep(event, every):
+            return
+
+        entry = {"ts": round(time.time(), 6), "level": level, "event": event}
+        for key, value in fields.items():
+            entry[key] = self._compact(key, value, 0)
+        line = json.dumps(entry, separators=(",", ":"), ensure_ascii=False, default=str) + "\n"
+
+        with self._lock:
+            out = self._output()
+            out.write(line)
+            self._counts["written"] += 1
+            if self._file is not None:
+                self._size += len(line.encode("utf-8"))
+                if self.max_bytes and self._size >= self.max_bytes:
+                    self._rotate()
+            if severity >= LEVELS["error"]:
+                out.flush()
+
+    def debug(self, event: str, **fields: Any) -> None:
+        self.log("debug", event, **fields)
+
+    def info(self, event: str, **fields: Any) -> None:
+        self.log("info", event, **fields)
+
+    def warning(self, event: str, **fields: Any) -> None:
+        self.log("warning", event, **fields)
+
+    def error(self, event: str, **fields: Any) -> None:
+        self.log("error", event, **fields)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._output().flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        if self.path:
+            atexit.unregister(self.close)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    # internal helpers
+
+    def _keep(self, event: str, every: int) -> bool:
+        with self._lock:
+            seen = self._seen.get(event, 0)
+            self._seen[event] = seen + 1
+            if seen % every == 0:
+                return True
+            self._counts["sampled_out"] += 1
+            return False
+
+    def _output(self) -> IO[str]:
+        if self.path:
+            if self._file is None:
+                self._open()  # written to after close(), e.g. from atexit order
+            return self._file
+        # looked up per write, so redirected / replaced stderr is honoured
+        return self._stream or sys.stderr
+
+    def _open(self) -> None:
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8", buffering=self.buffer_size)
+        self._size = self._file.tell()
+
+    def _rotate(self) -> None:
+        self._file.close()
+        if self.backups > 0:
+            for i in range(self.backups - 1, 0, -1):
+                older = f"{self.path}.{i}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._counts["rotations"] += 1
+        self._open()
+
+    def _compact(self, key: Any, value: Any, depth: int) -> Any:
+        if key is not None and self._redacted(key):
+            return "[redacted]"
+
+        kind = type(value)
+        if kind is str:
+            if len(value) > self.max_field_chars:
+                return f"{value[:self.max_field_chars]}…[+{len(value) - self.max_field_chars} chars]"
+            return value
+
+        if kind in _SCALARS:
+            return value
+
+        if isinstance(value, BaseModel):
+            value = value.model_dump(mode="json")
+
+        if isinstance(value, dict):
+            if depth >= self.max_depth:
+                return f"[dict with {len(value)} keys]"
+            compacted = {}
+            limit = self.max_field_chars
+            for i, (k, v) in enumerate(value.items()):
+                if i == self.max_items:
+                    compacted["…"] = f"+{len(value) - self.max_items} keys"
+                    break
+                # short strings / scalars under a harmless key are copied as is (most fields)
+                if (type(v) is str and len(v) <= limit or type(v) in _SCALARS) and not self._redacted(k):
+                    compacted[k if type(k) is str else str(k)] = v
+                else:
+                    compacted[str(k)] = self._compact(k, v, depth + 1)
+            return compacted
+
+        if isinstance(value, (list, tuple)):
+            if depth >= self.max_depth:
+                return f"[list with {len(value)} items]"
+            compacted = [self._compact(None, v, depth + 1) for v in value[:self.max_items]]
+            if len(value) > self.max_items:
+                compacted.append(f"…+{len(value) - self.max_items} items")
+            return compacted
+
+        if isinstance(value, str):
+            return self._compact(key, str(value), depth)
+
+        return value
+
+    def _redacted(self, key: Any) -> bool:
+        # memoized per key name, the same few keys come back on every event
+        hit = self._redact_memo.get(key)
+        if hit is None:
+            hit = isinstance(key, str) and key.lower() in self.redact_keys
+            if len(self._redact_memo) < 4096:
+                self._redact_memo[key] = hit
+        return hit
+
+
+_SCALARS = (int, float, bool, type(None))
+
+
+_default_sink: Optional[LogSink] = None
+_default_lock = threading.Lock()
+
+
+def get_sink() -> LogSink:
+    """process wide sink used by the engine, built from config on first use"""
+    global _default_sink
+    if _default_sink is None:
+        with _default_lock:
+            if _default_sink is None:
+                _default_sink = _sink_from_config()
+    return _default_sink
+
+
+def set_sink(sink: LogSink) -> Optional[LogSink]:
+    """swap the process wide sink, returns the previous one"""
+    global _default_sink
+    with _default_lock:
+        previous, _default_sink = _default_sink, sink
+    return previous
+
+
+def _sink_from_config() -> LogSink:
+    from engine import config
+
+    return LogSink(
+        path=config.LOG_FILE,
+        level=config.LOG_LEVEL,
+        max_field_chars=config.LOG_MAX_FIELD_CHARS,
+        redact_keys=config.LOG_REDACT_KEYS,
+        sample=config.LOG_SAMPLE,
+        max_bytes=config.LOG_MAX_BYTES,
+        backups=config.LOG_BACKUPS,
+    )
@@ -1,64 +1,261 @@
 import json
 import os
+import threading
 import time
-from typing import List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 from engine.agent_base import AgentrunRecord
 
+try:
+    import fcntl  # posix only, used for cross process locking
+except ImportError:  # pragma: no cover - windows
+    fcntl = None
+
 
 class MemoryStore:
     """
     Simple file based storage for keeping workflow run history.
-    Saves everything in one json file, not pretty but works for now.
+
+    By default it saves everything in one json file (not pretty but works).
+    With append_only=True every run becomes one compact json line in
+    segment files, so a save costs O(1) instead of O(history) and several
+    processes can save at the same time without losing runs.
     """
 
-    def __init__(self, file_path: str = "data/memory_store.json"):
+    def __init__(
+        self,
+        file_path: str = "data/memory_store.json",
+        append_only: bool = False,
+        log_dir: Optional[str] = None,
+        fsync: str = "never",
+        max_segment_bytes: int = 64 * 1024 * 1024,
+        backend: Optional["MemoryBackend"] = None,
+    ):
         self.file_path = file_path
 
-        # Ensure memory file exists
-        if not os.path.exists(self.file_path):
-            self._write_json([])
+        if backend is not None:
+            self.backend = backend
+        elif append_only:
+            self.backend = AppendOnlyLogBackend(
+                log_dir or os.path.splitext(file_path)[0] + "_log",
+                fsync=fsync,
+                max_segment_bytes=max_segment_bytes,
+                legacy_json_path=file_path,   # old runs stay readable
+            )
+        else:
+            self.backend = JsonFileBackend(file_path)
 
     # Public methods
 
-    def save_workflow_run(self, rec_history: List[AgentrunRecord]) -> None:
+    def save_workflow_run(self, rec_history: List[AgentrunRecord], run_id: Optional[str] = None) -> None:
         """
         Persist a completed workflow run to memory.
+        run_id is the workflow run id (result["run_id"]), get_run(run_id) finds it again.
         """
         if not rec_history:
             return
 
-        data = self._read_json()
+        self.backend.append(self._entry(rec_history, run_id))
 
-        entry = {
-            "run_id": rec_history[0].run_id,
-            "timestamp": time.time(),
-            "records": [rec.model_dump() for rec in rec_history],
-        }
+    def save_workflow_runs(self, histories: Iterable[List[AgentrunRecord]], run_ids: Optional[Iterable[str]] = None) -> None:
+        """
+        Persist several runs in one go (one transaction on sqlite).
+        run_ids, if given, are the workflow run ids in the same order.
+        """
+        ids = iter(run_ids) if run_ids is not None else None
+        entries = []
+        for rec_history in histories:
+            run_id = next(ids) if ids is not None else None
+            if rec_history:
+                entries.append(self._entry(rec_history, run_id))
+        if entries:
+            self.backend.append_many(entries)
+
+    def get_run(self, run_id: str) -> Optional[dict]:
+        """
+        Fetch one workflow run by its run_id.
+        """
+        return self.backend.get_run(run_id)
 
-        data.append(entry)
-        self._write_json(data)
+    def query(
+        self,
+        agent_name: Optional[str] = None,
+        status: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        run_id: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[dict]:
+        """
+        Find agent records, newest first.
+        eg: query(agent_name="marketing.value_proposition", status="error", since=time.time() - 3600)
+
+        Each record dict also carries `workflow_run_id`.
+        """
+        return self.backend.query_records(
+            agent_name=agent_name,
+            status=status,
+            since=since,
+            until=until,
+            run_id=run_id,
+            limit=limit,
+            offset=offset,
+        )
 
     def get_all_runs(self) -> List[dict]:
         """
         Return all stored workflow runs.
+        Prefer iter_runs() for big histories.
+        """
+        return list(self.iter_runs())
+
+    def iter_runs(self) -> Iterator[dict]:
+        """
+        Stream stored workflow runs, oldest first.
         """
-        return self._read_json()
+        return self.backend.iter_runs()
 
     def get_latest(self) -> Optional[dict]:
         """
         Return the most recent workflow run.
         """
+        return self.backend.latest()
+
+    def clear(self) -> None:
+        """
+        Wipeout all stored memory, which is useful for testing / debugging
+        """
+        self.backend.clear()
+
+    # internal helpers
+
+    def _entry(self, rec_history: List[AgentrunRecord], run_id: Optional[str] = None) -> dict:
+        # without a workflow run id (direct callers), the first record's id keeps runs apart
+        return {
+            "run_id": run_id or rec_history[0].run_id,
+            "timestamp": time.time(),
+            "records": [rec.model_dump() for rec in rec_history],
+        }
+
+
+# storage backends
+
+class MemoryBackend:
+    """
+    What MemoryStore needs from a storage format.
+
+    append / iter_runs / latest / clear are required. The query methods
+    have scan based defaults, indexed backends (sqlite) override them.
+    """
+
+    def append(self, entry: dict) -> None:
+        raise NotImplementedError
+
+    def iter_runs(self) -> Iterator[dict]:
+        raise NotImplementedError
+
+    def latest(self) -> Optional[dict]:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def append_many(self, entries: List[dict]) -> None:
+        for entry in entries:
+            self.append(entry)
+
+    def get_run(self, run_id: str) -> Optional[dict]:
+        for entry in self.iter_runs():
+            if entry.get("run_id") == run_id:
+                return entry
+        return None
+
+    def query_records(
+        self,
+        agent_name: Optional[str] = None,
+        status: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        run_id: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[dict]:
+        matches: List[Dict[str, Any]] = []
+        for entry in self.iter_runs():
+            for rec in entry.get("records", []):
+                if record_matches(rec, agent_name, status, since, until, run_id, entry.get("run_id")):
+                    matches.append({**rec, "workflow_run_id": entry.get("run_id")})
+
+        matches.sort(key=lambda rec: rec.get("start_ts") or 0.0, reverse=True)
+        return matches[offset:offset + limit]
+
+
+def record_matches(
+    rec: dict,
+    agent_name: Optional[str],
+    status: Optional[str],
+    since: Optional[float],
+    until: Optional[float],
+    run_id: Optional[str],
+    workflow_run_id: Optional[str],
+) -> bool:
+    """
+    run_id matches either the workflow run or the single agent record
+    """
+    if agent_name is not None and rec.get("agent_name") != agent_name:
+        return False
+    if status is not None and rec.get("status") != status:
+        return False
+    start_ts = rec.get("start_ts") or 0.0
+    if since is not None and start_ts < since:
+        return False
+    if until is not None and start_ts >= until:
+        return False
+    if run_id is not None and run_id not in (rec.get("run_id"), workflow_run_id):
+        return False
+    return True
+
+
+class JsonFileBackend(MemoryBackend):
+    """
+    The original format: one json array, rewritten on every save.
+    Only safe within a single process.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+
+        # Ensure memory file exists
+        if not os.path.exists(self.file_path):
+            self._write_json([])
+
+    def append(self, entry: dict) -> None:
+        with self._lock:
+            data = self._read_json()
+            data.append(entry)
+            self._write_json(data)
+
+    def append_many(self, entries: List[dict]) -> None:
+        # one rewrite for the whole batch instead of one per entry
+        with self._lock:
+            data = self._read_json()
+            data.extend(entries)
+            self._write_json(data)
+
+    def iter_runs(self) -> Iterator[dict]:
+        return iter(self._read_json())
+
+    def latest(self) -> Optional[dict]:
         data = self._read_json()
         if not data:
             return None
         return data[-1]
 
     def clear(self) -> None:
-        """
-        Wipeout all stored memory, which is useful for testing / debugging
-        """
-        self._write_json([])
+        with self._lock:
+            self._write_json([])
 
     # internal helpers
 
@@ -68,10 +265,219 @@ class MemoryStore:
 
         if os.path.getsize(self.file_path) == 0:
             return []
-    
+
         with open(self.file_path, "r", encoding="utf-8") as f:
             return json.load(f)
 
     def _write_json(self, data: List[dict]) -> None:
+        directory = os.path.dirname(self.file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
         with open(self.file_path, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2)
+
+
+class AppendOnlyLogBackend(MemoryBackend):
+    """
+    One compact json line per run, split into segment files:
+
+        <dir>/segment-000001.jsonl
+        <dir>/segment-000002.jsonl  (new segment once max_segment_bytes is hit)
+
+    Appends take an flock on <dir>/.lock, so concurrent processes never
+    interleave lines or race on rotation.
+
+    fsync policy:
+      - never    -> leave it to the os (fastest)
+      - interval -> fsync at most once per fsync_interval_s
+      - always   -> fsync every append (safest)
+    """
+
+    SEGMENT_PREFIX = "segment-"
+    SEGMENT_SUFFIX = ".jsonl"
+
+    def __init__(
+        self,
+        directory: str,
+        fsync: str = "never",
+        fsync_interval_s: float = 1.0,
+        max_segment_bytes: int = 64 * 1024 * 1024,
+        legacy_json_path: Optional[str] = None,
+    ):
+        if fsync not in ("never", "interval", "always"):
+            raise ValueError(f"Unknown fsync policy '{fsync}'")
+
+        self.directory = directory
+        self.fsync = fsync
+        self.fsync_interval_s = fsync_interval_s
+        self.max_segment_bytes = max_segment_bytes
+        self.legacy_json_path = legacy_json_path
+
+        self._thread_lock = threading.Lock()
+        self._last_fsync = 0.0
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def append(self, entry: dict) -> None:
+        line = (json.dumps(entry, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+
+        with self._locked():
+            path = self._writable_segment(len(line))
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+                if self._should_fsync():
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def iter_runs(self) -> Iterator[dict]:
+        yield from self._iter_legacy()
+
+        for path in self._segments():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    entry = self._parse_line(line)
+                    if entry is not None:
+                        yield entry
+
+    def latest(self) -> Optional[dict]:
+        # walk segments newest first and only read their tails
+        for path in reversed(self._segments()):
+            entry = self._last_entry(path)
+            if entry is not None:
+                return entry
+
+        legacy = None
+        for legacy in self._iter_legacy():
+            pass
+        return legacy
+
+    def clear(self) -> None:
+        with self._locked():
+            for path in self._segments():
+                os.remove(path)
+
+            if self.legacy_json_path and os.path.exists(self.legacy_json_path):
+                with open(self.legacy_json_path, "w", encoding="utf-8") as f:
+                    json.dump([], f)
+
+    def migrate_legacy(self) -> int:
+        """
+        Copy runs from the old json array file into the log, then
+        rename it to <file>.migrated so they are not read twice.
+        """
+        if not self.legacy_json_path or not os.path.exists(self.legacy_json_path):
+            return 0
+
+        entries = list(self._iter_legacy())
+        for entry in entries:
+            self.append(entry)
+
+        os.replace(self.legacy_json_path, self.legacy_json_path + ".migrated")
+        return len(entries)
+
+    # internal helpers
+
+    def _segments(self) -> List[str]:
+        names = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith(self.SEGMENT_PREFIX) and name.endswith(self.SEGMENT_SUFFIX)
+        )
+        return [os.path.join(self.directory, name) for name in names]
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.directory, f"{self.SEGMENT_PREFIX}{number:06d}{self.SEGMENT_SUFFIX}")
+
+    def _writable_segment(self, incoming: int) -> str:
+        # called with the lock held
+        segments = self._segments()
+        if not segments:
+            return self._segment_path(1)
+
+        current = segments[-1]
+        if os.path.getsize(current) + incoming <= self.max_segment_bytes:
+            return current
+
+        number = int(os.path.basename(current)[len(self.SEGMENT_PREFIX):-len(self.SEGMENT_SUFFIX)])
+        return self._segment_path(number + 1)
+
+    def _should_fsync(self) -> bool:
+        if self.fsync == "always":
+            return True
+        if self.fsync == "interval":
+            now = time.monotonic()
+            if now - self._last_fsync >= self.fsync_interval_s:
+                self._last_fsync = now
+                return True
+        return False
+
+    def _last_entry(self, path: str, block_size: int = 64 * 1024) -> Optional[dict]:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            end = f.tell()
+            buffer = b""
+
+            while end > 0:
+                start = max(0, end - block_size)
+                f.seek(start)
+                buffer = f.read(end - start) + buffer
+                end = start
+
+                lines = buffer.split(b"\n")
+                # lines[0] may be cut in half unless we reached the file start
+                candidates = lines if start == 0 else lines[1:]
+                for raw in reversed(candidates):
+                    entry = self._parse_line(raw.decode("utf-8", errors="replace"))
+                    if entry is not None:
+                        return entry
+                buffer = lines[0] if start > 0 else b""
+
+        return None
+
+    def _parse_line(self, line: str) -> Optional[dict]:
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError:
+            return None  # torn write from a crashed process, skip it
+
+    def _iter_legacy(self) -> Iterator[dict]:
+        if not self.legacy_json_path or not os.path.exists(self.legacy_json_path):
+            return
+        if os.path.getsize(self.legacy_json_path) == 0:
+            return
+        with open(self.legacy_json_path, "r", encoding="utf-8") as f:
+            yield from json.load(f)
+
+    def _locked(self):
+        return _DirLock(os.path.join(self.directory, ".lock"), self._thread_lock)
+
+
+class _DirLock:
+    """
+    thread lock + flock on a lock file (flock is skipped where fcntl doesnt exist)
+    """
+
+    def __init__(self, path: str, thread_lock: threading.Lock):
+        self.path = path
+        self.thread_lock = thread_lock
+        self._fd: Optional[int] = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if fcntl is not None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self.thread_lock.release()
+        return False
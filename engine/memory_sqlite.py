@@ -0,0 +1,202 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Iterator, List, Optional
+
+from engine.memory import MemoryBackend
+
+
+class SQLiteMemoryBackend(MemoryBackend):
+    """
+    Indexed MemoryStore backend.
+
+    Runs and agent records are stored as rows, so lookups by run_id,
+    agent_name, status and time dont need to scan the whole history.
+
+        store = MemoryStore(backend=SQLiteMemoryBackend("data/memory.sqlite"))
+        MemoryHook(store)   # nothing else changes
+    """
+
+    def __init__(self, path: str = "data/memory.sqlite"):
+        self.path = path
+        self._local = threading.local()  # one connection per thread
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id     TEXT NOT NULL,
+                timestamp  REAL NOT NULL,
+                status     TEXT
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_runs_run_id ON runs (run_id);
+            CREATE INDEX IF NOT EXISTS idx_runs_timestamp ON runs (timestamp);
+
+            CREATE TABLE IF NOT EXISTS records (
+                id               INTEGER PRIMARY KEY AUTOINCREMENT,
+                workflow_run_id  TEXT NOT NULL,
+                position         INTEGER NOT NULL,
+                run_id           TEXT NOT NULL,
+                agent_name       TEXT NOT NULL,
+                status           TEXT NOT NULL,
+                start_ts         REAL,
+                duration_s       REAL,
+                data             TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_records_workflow ON records (workflow_run_id, position);
+            CREATE INDEX IF NOT EXISTS idx_records_run_id ON records (run_id);
+            CREATE INDEX IF NOT EXISTS idx_records_agent ON records (agent_name, status, start_ts);
+            CREATE INDEX IF NOT EXISTS idx_records_status ON records (status, start_ts);
+            CREATE INDEX IF NOT EXISTS idx_records_start ON records (start_ts);
+            """
+        )
+        conn.commit()
+
+    # MemoryBackend contract
+
+    def append(self, entry: dict) -> None:
+        self.append_many([entry])
+
+    def append_many(self, entries: List[dict]) -> None:
+        conn = self._conn()
+        with conn:  # single transaction for the whole batch
+            for entry in entries:
+                records = entry.get("records", [])
+                status = "success" if all(r.get("status") == "success" for r in records) else "error"
+
+                conn.execute(
+                    "INSERT OR REPLACE INTO runs (run_id, timestamp, status) VALUES (?, ?, ?)",
+                    (entry["run_id"], entry["timestamp"], status),
+                )
+                conn.execute("DELETE FROM records WHERE workflow_run_id = ?", (entry["run_id"],))
+                conn.executemany(
+                    "INSERT INTO records (workflow_run_id, position, run_id, agent_name, status, start_ts, duration_s, data)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            entry["run_id"], position, rec["run_id"], rec["agent_name"], rec["status"],
+                            rec.get("start_ts"), rec.get("duration_s"), json.dumps(rec, default=str),
+                        )
+                        for position, rec in enumerate(records)
+                    ],
+                )
+
+    def iter_runs(self) -> Iterator[dict]:
+        cursor = self._conn().execute("SELECT run_id, timestamp FROM runs ORDER BY seq")
+        for run_id, timestamp in cursor:
+            yield self._load_run(run_id, timestamp)
+
+    def latest(self) -> Optional[dict]:
+        row = self._conn().execute("SELECT run_id, timestamp FROM runs ORDER BY seq DESC LIMIT 1").fetchone()
+        if row is None:
+            return None
+        return self._load_run(*row)
+
+    def clear(self) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM records")
+            conn.execute("DELETE FROM runs")
+
+    # indexed queries
+
+    def get_run(self, run_id: str) -> Optional[dict]:
+        row = self._conn().execute("SELECT run_id, timestamp FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        return self._load_run(*row)
+
+    def query_records(
+        self,
+        agent_name: Optional[str] = None,
+        status: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        run_id: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[dict]:
+        clauses: List[str] = []
+        params: List[Any] = []
+
+        if agent_name is not None:
+            clauses.append("agent_name = ?")
+            params.append(agent_name)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if since is not None:
+            clauses.append("start_ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("start_ts < ?")
+            params.append(until)
+        if run_id is not None:
+            clauses.append("(run_id = ? OR workflow_run_id = ?)")
+            params.extend([run_id, run_id])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn().execute(
+            f"SELECT workflow_run_id, data FROM records {where} ORDER BY start_ts DESC, id DESC LIMIT ? OFFSET ?",
+            (*params, limit, offset),
+        ).fetchall()
+
+        return [{**json.loads(data), "workflow_run_id": workflow_run_id} for workflow_run_id, data in rows]
+
+    def query_runs(
+        self,
+        status: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[dict]:
+        """
+        Whole workflow runs, newest first. status is success when every record succeeded.
+        """
+        clauses: List[str] = []
+        params: List[Any] = []
+
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn().execute(
+            f"SELECT run_id, timestamp FROM runs {where} ORDER BY timestamp DESC, seq DESC LIMIT ? OFFSET ?",
+            (*params, limit, offset),
+        ).fetchall()
+
+        return [self._load_run(run_id, timestamp) for run_id, timestamp in rows]
+
+    # internal helpers
+
+    def _load_run(self, run_id: str, timestamp: float) -> dict:
+        rows = self._conn().execute(
+            "SELECT data FROM records WHERE workflow_run_id = ? ORDER BY position", (run_id,)
+        ).fetchall()
+        return {
+            "run_id": run_id,
+            "timestamp": timestamp,
+            "records": [json.loads(data) for (data,) in rows],
+        }
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
@@ -1,7 +1,24 @@
-from typing import Any, Dict, List, Optional, Callable
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Callable, Set, Tuple
 
-from engine.agent_base import BaseAgent, Agentoutput, AgentrunRecord
+from engine.agent_base import BaseAgent, Agentinput, Agentoutput, AgentrunRecord
+from engine.budget import WorkflowBudget, use_budget
+from engine.checkpoint import CheckpointStore, WorkflowState
+from engine.deadline import Deadline, step_deadline, use_deadline
+from engine.streaming import on_partial
 from engine.hooks import HookManager
+from engine.log_sink import get_sink
+from engine.profiling import ProfileOptions, WorkflowProfiler, use_profiler
+
+
+# how long past a step deadline the orchestrator still waits for the agent
+# to fail on its own (llm calls honour the deadline, so it usually does, and
+# its record keeps the retry / usage telemetry) before it stops waiting
+DEADLINE_GRACE_S = 0.1
 
 
 class WorkflowStep:
@@ -12,37 +29,84 @@ class WorkflowStep:
     - agent: the agent to run
     - input_transformer: optional fn to convert previous output
                     into this agents input 
+    - depends_on: optional list of upstream agent names.
+                    None  -> depends on the step declared right before it
+                    []    -> root step, gets the initial input
+                    [a,b] -> waits for a and b, prev output is a's output
+                    (other upstream outputs are read from context)
+    - timeout_s: optional upper bound for this step in seconds, never
+                    later than the workflow deadline. the step is
+                    recorded with status timeout when it runs out
     """
 
     def __init__(
         self,
         agent: BaseAgent,
         input_transformer: Optional[Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]] = None,
+        depends_on: Optional[List[str]] = None,
+        timeout_s: Optional[float] = None,
     ):
         self.agent = agent
         self.input_transformer = input_transformer
+        self.depends_on = list(depends_on) if depends_on is not None else None
+        self.timeout_s = timeout_s
 
 
 class Orchestrator:
     """
     Coordinates execution of multiple agents in sequence
 
-    kept intentionally simple for now — retries, branching,
-    and parallelism can be layered on later.
+    If any step declares `depends_on`, the steps are treated as a DAG and
+    steps whose dependencies are done run at the same time on a bounded
+    thread pool (max_workers). Hooks, context updates and fail fast
+    handling always happen on the calling thread, and rec_history is kept
+    in step declaration order, so observers see the same thing either way.
+
+    With a checkpoint_store, state is saved after every successful step
+    and resume(run_id) continues from the first incomplete step. The
+    checkpoint of a run that succeeded is deleted, there is nothing to resume.
+
+    token_budget / cost_budget cap what one workflow run may spend on llm
+    calls, the run stops (status error) before a step it can no longer afford.
+
+    timeout_s is a deadline for the whole run. It is carried in the context
+    (engine.deadline) to everything under the run: llm calls use what is left
+    of it as their timeout and retries stop once they cant make it. A step
+    still running at its deadline (+ DEADLINE_GRACE_S) is recorded as
+    timeout and the run stops (status error) without waiting for it.
     """
 
     def __init__(
         self, 
         steps: List[WorkflowStep], 
         hook_manager: Optional[HookManager] = None,
+        max_workers: int = 4,
+        checkpoint_store: Optional[CheckpointStore] = None,
+        token_budget: Optional[int] = None,
+        cost_budget: Optional[float] = None,
+        timeout_s: Optional[float] = None,
     ):
         if not steps:
             raise ValueError("workflow needs atleast one step...")
 
         self.steps = steps
         self.hooks = hook_manager
+        self.max_workers = max_workers
+        self.checkpoints = checkpoint_store
+        self.token_budget = token_budget
+        self.cost_budget = cost_budget
+        self.timeout_s = timeout_s
+
+        # dag mode only kicks in when someone asks for it
+        self.is_dag = any(step.depends_on is not None for step in steps)
+        self._deps = self._build_graph(steps) if self.is_dag else []
 
-    def run(self, initial_input: Dict[str, Any], context: Optional[Dict[str, Any]] = None,) -> Dict[str, Any]:
+    def run(
+        self,
+        initial_input: Dict[str, Any],
+        context: Optional[Dict[str, Any]] = None,
+        run_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
         """
         Execute the workflow
 
@@ -50,44 +114,72 @@ class Orchestrator:
         {
             status: success | error,
             final output: Agentoutput | none,
-            rec history: List[Agentrunrecord]
+            rec history: List[Agentrunrecord],
+            run id: workflow run id (pass it to resume),
+            usage: token / cost totals of the run,
+            error: only set when the workflow itself stopped it (eg: budget, deadline)
         }
         """
         # shared mutable state across agents
-        context = context or {}
-        rec_history: List[AgentrunRecord] = []
+        state = WorkflowState(initial_input, context=context or {}, run_id=run_id)
+        return self._execute(state)
+
+    def resume(self, run_id: str) -> Dict[str, Any]:
+        """
+        Continue a checkpointed run from its first incomplete step.
+        Completed steps are not rerun, their outputs come from the checkpoint.
+        """
+        state = self._load_checkpoint(run_id)
+
+        if state.status == "success":
+            # checkpoints written before finished runs were deleted, hand back what we have
+            return self._result("success", state.outputs.get(self.steps[-1].agent.name), state)
 
-        current_input = initial_input
+        return self._execute(state)
+
+    def _execute(self, state: WorkflowState) -> Dict[str, Any]:
+        # budget is visible to everything under this run (llm usage reports into it)
+        # streaming agents report partial output to the hooks
+        # metadata["profile"] on the workflow input profiles every agent and hook call
+        # the deadline (if any) bounds every step and llm call under this run
+        partial_listener = self.hooks.agent_partial if self.hooks else None
+        with use_budget(self._new_budget(state)), on_partial(partial_listener), use_profiler(self._new_profiler(state)), \
+                use_deadline(self._new_deadline(state)):
+            if self.is_dag:
+                return self._run_dag(state)
+            return self._run_linear(state)
+
+    def _run_linear(self, state: WorkflowState) -> Dict[str, Any]:
+        context = state.context
+        rec_history = state.rec_history
+        current_input = state.current_input
+        output = None
 
         #workflow start 
         if self.hooks:
-            self.hooks.workflow_start(initial_input)
+            self.hooks.workflow_start(state.initial_input)
 
         for step in self.steps:
             agent = step.agent
-            print(f"\n[Orch] running agent: {agent.name}")
-
-            if step.input_transformer:
-                next_payload = step.input_transformer(
-                    current_input["payload"],
-                    context,
-                )
-                step_input = {
-                    "payload": next_payload,
-                    "metadata": current_input.get("metadata", {}),
-                }
-            else:
-                step_input = current_input
+
+            if agent.name in state.outputs:
+                continue  # done in an earlier attempt (resume)
+
+            if self._over_budget(state) or self._out_of_time(state):
+                return self._finish("error", None, state)
+
+            get_sink().debug("orchestrator.step", agent=agent.name)
+
+            step_input = self._step_input(step, current_input, context)
 
              #before agent
             if self.hooks:
                 self.hooks.before_agent(agent, step_input)
             
             #agent starts running
-            output, record = agent.run(
-                raw_input=step_input,
-                context=context,
-            )
+            agent_input = self._agent_input(step, step_input, trusted=bool(state.outputs))
+            with use_deadline(self._step_deadline(step)) as deadline:
+                output, record = self._run_step(agent, agent_input, context, deadline)
 
             rec_history.append(record)
 
@@ -97,40 +189,556 @@ class Orchestrator:
                 if self.hooks:
                     self.hooks.agent_error(agent, record.error, record) #agent failur hook
 
-                result = {
-                    "status": "error",
-                    "final_output": output,
-                    "rec_history": rec_history,
-                }
-            
-                if self.hooks:
-                    self.hooks.workflow_end(result, rec_history)
-
-                return result
+                return self._finish("error", output, state)
             
             #after agent
             if self.hooks:
                 self.hooks.after_agent(agent, output, record)
 
-            # on success update context
-            context[agent.name] = output.output
+            current_input = self._advance(agent, output, context)
+            self._step_done(state, agent, output, current_input)
+
+        return self._finish("success", state.outputs[self.steps[-1].agent.name], state)
+
+    def run_many(
+        self,
+        inputs: Iterable[Dict[str, Any]],
+        max_concurrency: int = 8,
+    ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Run the workflow once per input, at most `max_concurrency` at a time.
+
+        Inputs are pulled lazily and results are yielded as (index, result)
+        in completion order, so neither side has to fit in memory.
+        A workflow that raises (eg: GuardrailViolation) becomes an error
+        result instead of killing the whole batch.
+        """
+        source = iter(enumerate(inputs))
+
+        with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+            running = {}
+
+            def submit_next() -> bool:
+                try:
+                    index, initial_input = next(source)
+                except StopIteration:
+                    return False
+                running[pool.submit(self._run_safely, initial_input)] = index
+                return True
+
+            # fill the window, then keep it topped up as results come back
+            while len(running) < max_concurrency and submit_next():
+                pass
+
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = running.pop(future)
+                    yield index, future.result()
+                    submit_next()
+
+    def _run_safely(self, initial_input: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return self.run(initial_input)
+        except Exception as exc:
+            result = self._result("error", None, WorkflowState(initial_input))
+            result["error"] = f"{type(exc).__name__}: {exc}"
+            return result
+
+    def _run_dag(self, state: WorkflowState) -> Dict[str, Any]:
+        context = state.context
+        records: Dict[int, AgentrunRecord] = {}
+        prior = list(state.rec_history)  # from an earlier attempt (resume)
+        done = self._completed(state)
+        pending: Set[int] = set(range(len(self.steps))) - done
+        failed: Optional[Agentoutput] = None
+
+        if self.hooks:
+            self.hooks.workflow_start(state.initial_input)
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        running = {}
+        deadlines: Dict[int, Tuple[Optional[Deadline], float, Any]] = {}  # idx -> (deadline, start_ts, input)
+        abandoned = False
+
+        try:
+            while pending or running:
+                # schedule everything that is ready (unless something already failed)
+                if failed is None and not self._over_budget(state) and not self._out_of_time(state):
+                    for idx in self._ready(pending, done):
+                        step = self.steps[idx]
+                        get_sink().debug("orchestrator.step", agent=step.agent.name)
+
+                        step_input = self._step_input(step, self._dag_input(idx, state), context)
+
+                        if self.hooks:
+                            self.hooks.before_agent(step.agent, step_input)
+
+                        pending.discard(idx)
+                        # copy_context: the worker thread must see this run's budget, deadline and partial listeners
+                        agent_input = self._agent_input(step, step_input, trusted=bool(self._deps[idx]))
+                        with use_deadline(self._step_deadline(step)) as deadline:
+                            running[pool.submit(contextvars.copy_context().run, step.agent.run, agent_input, context)] = idx
+                        deadlines[idx] = (deadline, time.time(), agent_input)
+
+                if not running:
+                    break  # failed, nothing left in flight
+
+                finished, _ = wait(running, timeout=self._wait_timeout(deadlines[idx][0] for idx in running.values()), return_when=FIRST_COMPLETED)
+                results = {future: future.result() for future in finished}
 
-            # preparing input for next step          
-            current_input = {
-                "payload": output.output,
-                "metadata": {
-                    "previous_agent": agent.name
-                }
+                # steps past their deadline are given up on, their thread is left to finish alone
+                for future, idx in running.items():
+                    deadline, start_ts, agent_input = deadlines[idx]
+                    if future not in results and self._abandon(deadline):
+                        results[future] = self.steps[idx].agent.timeout_result(agent_input, start_ts, deadline.reason())
+                        abandoned = True
+
+                # handle in declaration order so hook order stays deterministic
+                for future in sorted(results, key=running.get):
+                    idx = running.pop(future)
+                    agent = self.steps[idx].agent
+                    output, record = results[future]
+                    records[idx] = record
+
+                    if record.status != "success":
+                        if self.hooks:
+                            self.hooks.agent_error(agent, record.error, record)
+                        if failed is None:
+                            failed = output  # keep the first failure output
+                        continue
+
+                    if self.hooks:
+                        self.hooks.after_agent(agent, output, record)
+
+                    context[agent.name] = output.output
+                    done.add(idx)
+                    state.rec_history = prior + [records[i] for i in sorted(records) if i in done]
+                    self._step_done(state, agent, output, state.current_input)
+        finally:
+            # dont block on a hung step, its thread is no use to anyone anymore
+            pool.shutdown(wait=not abandoned, cancel_futures=abandoned)
+
+        state.rec_history = prior + [records[idx] for idx in sorted(records)]
+
+        if failed is not None or state.error:
+            return self._finish("error", failed, state)
+        return self._finish("success", state.outputs[self.steps[-1].agent.name], state)
+
+    # dag helpers
+
+    def _build_graph(self, steps: List[WorkflowStep]) -> List[List[int]]:
+        """
+        resolve depends_on names into step indexes, and reject
+        unknown names or cycles up front
+        """
+        index = {}
+        for idx, step in enumerate(steps):
+            if step.agent.name in index:
+                raise ValueError(f"duplicate agent name in dag workflow: '{step.agent.name}'")
+            index[step.agent.name] = idx
+
+        deps: List[List[int]] = []
+        for idx, step in enumerate(steps):
+            if step.depends_on is None:
+                deps.append([idx - 1] if idx > 0 else [])
+                continue
+
+            for name in step.depends_on:
+                if name not in index:
+                    raise ValueError(f"step '{step.agent.name}' depends on unknown agent '{name}'")
+            deps.append([index[name] for name in step.depends_on])
+
+        # cycle check (kahn)
+        remaining = {idx: set(d) for idx, d in enumerate(deps)}
+        while remaining:
+            free = [idx for idx, d in remaining.items() if not d]
+            if not free:
+                names = [steps[idx].agent.name for idx in remaining]
+                raise ValueError(f"workflow dependencies contain a cycle: {names}")
+            for idx in free:
+                del remaining[idx]
+            for d in remaining.values():
+                d.difference_update(free)
+
+        return deps
+
+    def _ready(self, pending: Set[int], done: Set[int]) -> List[int]:
+        return [idx for idx in sorted(pending) if all(dep in done for dep in self._deps[idx])]
+
+    def _completed(self, state: WorkflowState) -> Set[int]:
+        return {idx for idx, step in enumerate(self.steps) if step.agent.name in state.outputs}
+
+    def _dag_input(self, idx: int, state: WorkflowState) -> Dict[str, Any]:
+        """
+        input a dag step would have gotten in a linear run:
+        the first dependency's output, or the initial input for roots
+        """
+        if not self._deps[idx]:
+            return state.initial_input
+
+        upstream = self.steps[self._deps[idx][0]].agent.name
+        return {
+            "payload": state.outputs[upstream].output,
+            "metadata": {
+                "previous_agent": upstream
             }
+        }
+
+    # budget helpers
+
+    def _new_profiler(self, state: WorkflowState) -> Optional[WorkflowProfiler]:
+        metadata = state.initial_input.get("metadata") if isinstance(state.initial_input, dict) else None
+        options = ProfileOptions.parse((metadata or {}).get("profile"))
+        state.profiler = WorkflowProfiler(options) if options else None
+        return state.profiler
+
+    def _new_budget(self, state: WorkflowState) -> WorkflowBudget:
+        state.budget = WorkflowBudget(max_tokens=self.token_budget, max_cost_usd=self.cost_budget)
+        state.budget.add_records(state.rec_history)  # resumed runs already spent something
+        return state.budget
+
+    def _over_budget(self, state: WorkflowState) -> bool:
+        reason = state.budget.exceeded() if state.budget else None
+        if reason:
+            state.error = f"BudgetExceeded: {reason}"
+        return bool(reason)
+
+    # deadline helpers
+
+    def _new_deadline(self, state: WorkflowState) -> Optional[Deadline]:
+        # a deadline the caller already runs under is kept if it is tighter
+        state.deadline = step_deadline(self.timeout_s, "workflow deadline")
+        return state.deadline
+
+    def _out_of_time(self, state: WorkflowState) -> bool:
+        if state.deadline is None or not state.deadline.expired():
+            return False
+        state.error = f"DeadlineExceeded: {state.deadline.reason()}"
+        return True
+
+    def _step_deadline(self, step: WorkflowStep) -> Optional[Deadline]:
+        return step_deadline(step.timeout_s, f"step '{step.agent.name}' timeout")
+
+    def _run_step(
+        self, agent: BaseAgent, agent_input: Any, context: Dict[str, Any], deadline: Optional[Deadline]
+    ) -> Tuple[Agentoutput, AgentrunRecord]:
+        """
+        agent.run, but never waiting past the deadline (+ grace). without a
+        deadline it runs right here, with one on a daemon thread the caller
+        can walk away from (python cant interrupt a blocked call).
+        """
+        if deadline is None:
+            return agent.run(raw_input=agent_input, context=context)
+
+        start_ts = time.time()
+        outcome: Dict[str, Any] = {}
+        run = contextvars.copy_context().run
+
+        def target() -> None:
+            try:
+                outcome["result"] = run(agent.run, agent_input, context)
+            except BaseException as exc:   # eg: GuardrailViolation, re-raised on the caller's thread
+                outcome["error"] = exc
+
+        worker = threading.Thread(target=target, name=f"zap-step-{agent.name}", daemon=True)
+        worker.start()
+        worker.join(deadline.remaining() + DEADLINE_GRACE_S)
+
+        if worker.is_alive():
+            return agent.timeout_result(agent_input, start_ts, deadline.reason())
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+
+    def _wait_timeout(self, deadlines: Iterable[Optional[Deadline]]) -> Optional[float]:
+        # until the first running step is due, None (no limit) if none has a deadline
+        remaining = [deadline.remaining() for deadline in deadlines if deadline is not None]
+        return min(remaining) + DEADLINE_GRACE_S if remaining else None
+
+    def _abandon(self, deadline: Optional[Deadline]) -> bool:
+        return deadline is not None and time.monotonic() >= deadline.expires_at + DEADLINE_GRACE_S
+
+    # checkpoint helpers
+
+    def _step_done(self, state: WorkflowState, agent: BaseAgent, output: Agentoutput, current_input: Dict[str, Any]) -> None:
+        state.outputs[agent.name] = output
+        state.current_input = current_input
+
+        if self.checkpoints:
+            self.checkpoints.save(state)
+
+    def _load_checkpoint(self, run_id: str) -> WorkflowState:
+        if not self.checkpoints:
+            raise ValueError("resume needs an orchestrator with a checkpoint_store")
 
+        state = self.checkpoints.load(run_id)
+        if state is None:
+            raise KeyError(f"No checkpoint found for run '{run_id}'")
+
+        known = {step.agent.name for step in self.steps}
+        unknown = [name for name in state.outputs if name not in known]
+        if unknown:
+            raise ValueError(f"checkpoint '{run_id}' has steps this workflow doesnt know: {unknown}")
+
+        # the failed attempt is not part of the history we continue from
+        state.rec_history = [rec for rec in state.rec_history if rec.status == "success"]
+        return state
+
+    # step helpers, shared with AsyncOrchestrator
+
+    def _step_input(self, step: WorkflowStep, current_input: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+        if not step.input_transformer:
+            return current_input
+
+        next_payload = step.input_transformer(
+            current_input["payload"],
+            context,
+        )
+        return {
+            "payload": next_payload,
+            "metadata": current_input.get("metadata", {}),
+        }
+
+    def _agent_input(self, step: WorkflowStep, step_input: Dict[str, Any], trusted: bool) -> Any:
+        """
+        trusted = the step runs on validated upstream Agentoutputs (never on
+        user input). for agents taking plain Agentinput such an input is valid
+        by construction, so hand it over pre-validated and BaseAgent.run skips
+        re-validation. an input_transformer result only qualifies when it is
+        a plain dict with str keys, the one thing validating it would check.
+        """
+        if not trusted or step.agent.input_schema is not Agentinput:
+            return step_input
+
+        payload, metadata = step_input["payload"], step_input["metadata"]
+        if step.input_transformer and not (_plain_dict(payload) and _plain_dict(metadata)):
+            return step_input  # let validation report what is wrong with it
+
+        # shallow copies, same isolation a validated copy would give
+        return Agentinput.model_construct(payload=dict(payload), metadata=dict(metadata))
+
+    def _advance(self, agent: BaseAgent, output: Agentoutput, context: Dict[str, Any]) -> Dict[str, Any]:
+        # on success update context
+        context[agent.name] = output.output
+
+        # preparing input for next step          
+        return {
+            "payload": output.output,
+            "metadata": {
+                "previous_agent": agent.name
+            }
+        }
+
+    def _finish(self, status: str, output: Optional[Agentoutput], state: WorkflowState) -> Dict[str, Any]:
+        result = self._close(status, output, state)
+
+        #workflow end
+        if self.hooks:
+            self.hooks.workflow_end(result, state.rec_history)
+
+        return result
+
+    def _close(self, status: str, output: Optional[Agentoutput], state: WorkflowState) -> Dict[str, Any]:
+        state.status = status
+        if self.checkpoints:
+            if status == "success":
+                self.checkpoints.delete(state.run_id)
+            else:
+                self.checkpoints.save(state)
+
+        return self._result(status, output, state)
+
+    def _result(self, status: str, output: Optional[Agentoutput], state: WorkflowState) -> Dict[str, Any]:
         result = {
-            "status": "success",
+            "status": status,
             "final_output": output,
-            "rec_history": rec_history,
+            "rec_history": state.rec_history,
+            "run_id": state.run_id,
+            "usage": state.budget.totals() if state.budget else None,
         }
-        
-        #workflow end
+        if state.error:
+            result["error"] = state.error
+        if state.profiler:
+            result["profile"] = state.profiler.finish(state.rec_history)
+        return result
+
+
+def _plain_dict(value: Any) -> bool:
+    return type(value) is dict and all(type(key) is str for key in value)
+
+
+class AsyncOrchestrator(Orchestrator):
+    """
+    asyncio version of Orchestrator
+
+    Same steps, same hooks, same result shape. The only difference is
+    agents run through `arun`, so while one workflow waits on the llm
+    the event loop is free to drive other workflows.
+
+    eg: await asyncio.gather(*(orch.arun(inp) for inp in inputs))
+    """
+
+    async def arun(
+        self,
+        initial_input: Dict[str, Any],
+        context: Optional[Dict[str, Any]] = None,
+        run_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        state = WorkflowState(initial_input, context=context or {}, run_id=run_id)
+        return await self._aexecute(state)
+
+    async def aresume(self, run_id: str) -> Dict[str, Any]:
+        state = self._load_checkpoint(run_id)
+
+        if state.status == "success":
+            return self._result("success", state.outputs.get(self.steps[-1].agent.name), state)
+
+        return await self._aexecute(state)
+
+    async def _aexecute(self, state: WorkflowState) -> Dict[str, Any]:
+        partial_listener = self.hooks.aagent_partial if self.hooks else None
+        with use_budget(self._new_budget(state)), on_partial(partial_listener), use_profiler(self._new_profiler(state)), \
+                use_deadline(self._new_deadline(state)):
+            if self.is_dag:
+                return await self._arun_dag(state)
+            return await self._arun_linear(state)
+
+    async def _arun_linear(self, state: WorkflowState) -> Dict[str, Any]:
+        context = state.context
+        current_input = state.current_input
+
+        if self.hooks:
+            await self.hooks.aworkflow_start(state.initial_input)
+
+        for step in self.steps:
+            agent = step.agent
+
+            if agent.name in state.outputs:
+                continue
+
+            if self._over_budget(state) or self._out_of_time(state):
+                return await self._afinish("error", None, state)
+
+            get_sink().debug("orchestrator.step", agent=agent.name)
+
+            step_input = self._step_input(step, current_input, context)
+
+            if self.hooks:
+                await self.hooks.abefore_agent(agent, step_input)
+
+            agent_input = self._agent_input(step, step_input, trusted=bool(state.outputs))
+            with use_deadline(self._step_deadline(step)) as deadline:
+                output, record = await self._arun_step(agent, agent_input, context, deadline)
+
+            state.rec_history.append(record)
+
+            if record.status != "success":
+                if self.hooks:
+                    await self.hooks.aagent_error(agent, record.error, record)
+
+                return await self._afinish("error", output, state)
+
+            if self.hooks:
+                await self.hooks.aafter_agent(agent, output, record)
+
+            current_input = self._advance(agent, output, context)
+            self._step_done(state, agent, output, current_input)
+
+        return await self._afinish("success", state.outputs[self.steps[-1].agent.name], state)
+
+    async def _arun_dag(self, state: WorkflowState) -> Dict[str, Any]:
+        # same scheduling as Orchestrator._run_dag, bounded by a semaphore instead of a pool
+        context = state.context
+        records: Dict[int, AgentrunRecord] = {}
+        prior = list(state.rec_history)
+        done = self._completed(state)
+        pending: Set[int] = set(range(len(self.steps))) - done
+        failed: Optional[Agentoutput] = None
+        limit = asyncio.Semaphore(self.max_workers)
+
+        async def bounded(agent: BaseAgent, step_input: Any, deadline: Optional[Deadline]):
+            async with limit:
+                return await self._arun_step(agent, step_input, context, deadline)
+
+        if self.hooks:
+            await self.hooks.aworkflow_start(state.initial_input)
+
+        running: Dict[asyncio.Task, int] = {}
+        try:
+            while pending or running:
+                if failed is None and not self._over_budget(state) and not self._out_of_time(state):
+                    for idx in self._ready(pending, done):
+                        step = self.steps[idx]
+                        get_sink().debug("orchestrator.step", agent=step.agent.name)
+
+                        step_input = self._step_input(step, self._dag_input(idx, state), context)
+
+                        if self.hooks:
+                            await self.hooks.abefore_agent(step.agent, step_input)
+
+                        pending.discard(idx)
+                        agent_input = self._agent_input(step, step_input, trusted=bool(self._deps[idx]))
+                        # the task copies the context here, deadline included
+                        with use_deadline(self._step_deadline(step)) as deadline:
+                            running[asyncio.ensure_future(bounded(step.agent, agent_input, deadline))] = idx
+
+                if not running:
+                    break
+
+                finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in sorted(finished, key=running.get):
+                    idx = running.pop(task)
+                    agent = self.steps[idx].agent
+                    output, record = task.result()
+                    records[idx] = record
+
+                    if record.status != "success":
+                        if self.hooks:
+                            await self.hooks.aagent_error(agent, record.error, record)
+                        if failed is None:
+                            failed = output
+                        continue
+
+                    if self.hooks:
+                        await self.hooks.aafter_agent(agent, output, record)
+
+                    context[agent.name] = output.output
+                    done.add(idx)
+                    state.rec_history = prior + [records[i] for i in sorted(records) if i in done]
+                    self._step_done(state, agent, output, state.current_input)
+        finally:
+            # a guardrail can raise mid schedule, dont leave tasks dangling
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        state.rec_history = prior + [records[idx] for idx in sorted(records)]
+
+        if failed is not None or state.error:
+            return await self._afinish("error", failed, state)
+        return await self._afinish("success", state.outputs[self.steps[-1].agent.name], state)
+
+    async def _arun_step(
+        self, agent: BaseAgent, agent_input: Any, context: Dict[str, Any], deadline: Optional[Deadline]
+    ) -> Tuple[Agentoutput, AgentrunRecord]:
+        # async twin of _run_step, here the late agent can actually be cancelled.
+        # llm calls honour the deadline themselves, cancelling only hits code that
+        # doesnt, and the llm wrappers hand back what a cancelled call held
+        # (breaker probe slot, single flight lead)
+        if deadline is None:
+            return await agent.arun(raw_input=agent_input, context=context)
+
+        start_ts = time.time()
+        try:
+            return await asyncio.wait_for(agent.arun(raw_input=agent_input, context=context), deadline.remaining() + DEADLINE_GRACE_S)
+        except asyncio.TimeoutError:
+            return agent.timeout_result(agent_input, start_ts, deadline.reason())
+
+    async def _afinish(self, status: str, output: Optional[Agentoutput], state: WorkflowState) -> Dict[str, Any]:
+        result = self._close(status, output, state)
+
         if self.hooks:
-            self.hooks.workflow_end(result, rec_history)
+            await self.hooks.aworkflow_end(result, state.rec_history)
 
         return result
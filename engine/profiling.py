@@ -0,0 +1,320 @@
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import cProfile
+    import tracemalloc
+
+# cProfile / pstats / tracemalloc are imported by the collectors, most runs never need them
+
+# sections whose time counts as llm wait / as the agent's own work,
+# everything else inside a run (validation, records, hooks) is framework overhead
+LLM_SECTIONS = ("llm",)
+COMPUTE_SECTIONS = ("prepare", "execute", "finalize")
+
+
+class ProfileOptions:
+    """
+    What to collect for a profiled run, parsed from metadata["profile"]:
+
+        True / "timers"  -> section timers only
+        "cpu"            -> + cProfile (top functions)
+        "memory"         -> + tracemalloc (allocated / peak, top lines)
+        "full"           -> everything
+        {"cpu": True, "memory": True, "top": 20}
+    """
+
+    def __init__(self, cpu: bool = False, memory: bool = False, top: int = 15):
+        self.cpu = cpu
+        self.memory = memory
+        self.top = top
+
+    @classmethod
+    def parse(cls, flag: Any) -> Optional["ProfileOptions"]:
+        if not flag:
+            return None
+        if isinstance(flag, dict):
+            return cls(cpu=bool(flag.get("cpu")), memory=bool(flag.get("memory")), top=int(flag.get("top", 15)))
+        if flag == "cpu":
+            return cls(cpu=True)
+        if flag == "memory":
+            return cls(memory=True)
+        if flag == "full":
+            return cls(cpu=True, memory=True)
+        return cls()
+
+
+class RunProfile:
+    """
+    Timers for one agent run. Sections nest (execute > llm), each path
+    keeps its self time, so the paths add up to the time spent in sections.
+    """
+
+    def __init__(self, options: ProfileOptions):
+        self.options = options
+        self.self_s: Dict[str, float] = {}    # "execute;llm" -> self time
+        self.total_s: Dict[str, float] = {}   # "llm" -> inclusive time, summed over calls
+        self._stack: List[List[Any]] = []     # [name, started, child time]
+
+        self._cpu: Optional["cProfile.Profile"] = None
+        self._memory_started = False
+        self._memory_base = 0
+        self._snapshot: Optional["tracemalloc.Snapshot"] = None
+        self.cpu_top: Optional[List[Dict[str, Any]]] = None
+        self.memory: Optional[Dict[str, Any]] = None
+
+    @contextmanager
+    def section(self, name: str) -> Iterator[None]:
+        frame = [name, time.perf_counter(), 0.0]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - frame[1]
+            path = ";".join(f[0] for f in self._stack)
+            self._stack.pop()
+
+            self.self_s[path] = self.self_s.get(path, 0.0) + elapsed - frame[2]
+            self.total_s[name] = self.total_s.get(name, 0.0) + elapsed
+            if self._stack:
+                self._stack[-1][2] += elapsed
+
+    # optional collectors, around prepare / execute / finalize
+
+    def start_collectors(self) -> None:
+        # memory first, so cProfile doesnt see the snapshot (and stops before the last one)
+        with self.section("profiler"):
+            if self.options.memory:
+                import tracemalloc
+                self._memory_started = not tracemalloc.is_tracing()
+                if self._memory_started:
+                    tracemalloc.start()
+                tracemalloc.reset_peak()
+                self._memory_base = tracemalloc.get_traced_memory()[0]
+                self._snapshot = _snapshot()
+
+            if self.options.cpu:
+                import cProfile
+                try:
+                    self._cpu = cProfile.Profile()
+                    self._cpu.enable()
+                except ValueError:
+                    self._cpu = None  # another profiler is active (eg: a parallel dag step on 3.12+)
+
+    def stop_collectors(self) -> None:
+        with self.section("profiler"):
+            if self._cpu is not None:
+                self._cpu.disable()
+                self.cpu_top = _top_functions(self._cpu, self.options.top)
+                self._cpu = None
+
+            if self.options.memory:
+                import tracemalloc
+                if tracemalloc.is_tracing():
+                    current, peak = tracemalloc.get_traced_memory()
+                    top = _snapshot().compare_to(self._snapshot, "lineno")[:self.options.top]
+                    self.memory = {
+                        "allocated_kb": round((current - self._memory_base) / 1024, 1),
+                        "peak_kb": round((peak - self._memory_base) / 1024, 1),
+                        "top": [
+                            {"where": str(stat.traceback[0]), "size_kb": round(stat.size_diff / 1024, 1), "count": stat.count_diff}
+                            for stat in top if stat.size_diff > 0
+                        ],
+                    }
+                    self._snapshot = None
+                    if self._memory_started:
+                        tracemalloc.stop()
+
+    def summary(self, wall_s: float) -> Dict[str, Any]:
+        """what goes into AgentrunRecord.extra["profile"]"""
+        llm = sum(self.total_s.get(name, 0.0) for name in LLM_SECTIONS)
+        compute = max(0.0, sum(self.total_s.get(name, 0.0) for name in COMPUTE_SECTIONS) - llm)
+        profiler = self.total_s.get("profiler", 0.0)  # cProfile / tracemalloc bookkeeping
+        data: Dict[str, Any] = {
+            "wall_s": wall_s,
+            "split": {
+                "llm_wait_s": llm,
+                "compute_s": compute,
+                "framework_s": max(0.0, wall_s - llm - compute - profiler),
+                "profiler_s": profiler,
+            },
+            "sections_s": dict(self.total_s),
+            "stacks": dict(self.self_s),
+        }
+        if self.cpu_top is not None:
+            data["cpu_top"] = self.cpu_top
+        if self.memory is not None:
+            data["memory"] = self.memory
+        return data
+
+
+class WorkflowProfiler:
+    """
+    Profiling switched on for a whole workflow (metadata["profile"] on the
+    workflow input). Every agent run under it is profiled, and hook
+    dispatch time is added to the agent it was fired for.
+    """
+
+    def __init__(self, options: ProfileOptions):
+        self.options = options
+        self.hooks_s: Dict[str, float] = {}    # agent name ("" = workflow events) -> seconds
+        self._lock = threading.Lock()
+
+    def add_hook_time(self, agent_name: str, seconds: float) -> None:
+        with self._lock:
+            self.hooks_s[agent_name] = self.hooks_s.get(agent_name, 0.0) + seconds
+
+    def finish(self, rec_history: List[Any]) -> Dict[str, Any]:
+        """folds hook time into the records, returns the workflow summary"""
+        with self._lock:
+            all_hooks_s = dict(self.hooks_s)
+        hooks_s = dict(all_hooks_s)
+
+        split = {"llm_wait_s": 0.0, "compute_s": 0.0, "framework_s": 0.0, "profiler_s": 0.0}
+        for record in rec_history:
+            profile = record.extra.get("profile")
+            if not profile:
+                continue
+
+            hook_time = hooks_s.pop(record.agent_name, 0.0)
+            if hook_time and "orchestrator_hooks" not in profile["sections_s"]:
+                profile["sections_s"]["orchestrator_hooks"] = hook_time
+                profile["stacks"]["orchestrator_hooks"] = hook_time
+                profile["split"]["framework_s"] += hook_time
+                profile["wall_s"] += hook_time
+
+            for key in split:
+                split[key] += profile["split"][key]
+
+        split["framework_s"] += sum(hooks_s.values())  # workflow level events
+        return {"split": split, "hooks_s": all_hooks_s}
+
+
+_current_profile: ContextVar[Optional[RunProfile]] = ContextVar("zap_run_profile", default=None)
+_current_profiler: ContextVar[Optional[WorkflowProfiler]] = ContextVar("zap_workflow_profiler", default=None)
+
+_NO_SECTION = nullcontext()
+
+
+def current_profiler() -> Optional[WorkflowProfiler]:
+    return _current_profiler.get()
+
+
+@contextmanager
+def use_profiler(profiler: Optional[WorkflowProfiler]) -> Iterator[Optional[WorkflowProfiler]]:
+    token = _current_profiler.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _current_profiler.reset(token)
+
+
+def open_profile(metadata: Dict[str, Any]) -> Optional[RunProfile]:
+    """a RunProfile if this run should be profiled, else None (the usual case)"""
+    profiler = _current_profiler.get()
+    if profiler is not None:
+        return RunProfile(profiler.options)
+
+    options = ProfileOptions.parse(metadata.get("profile"))
+    return RunProfile(options) if options else None
+
+
+@contextmanager
+def use_profile(profile: RunProfile) -> Iterator[RunProfile]:
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+def section(name: str) -> ContextManager[None]:
+    """timer for a piece of the current profiled run, no-op otherwise"""
+    profile = _current_profile.get()
+    if profile is None:
+        return _NO_SECTION
+    return profile.section(name)
+
+
+def hook_agent_name(method_name: str, args: Tuple[Any, ...]) -> str:
+    if method_name in ("on_workflow_start", "on_workflow_end") or not args:
+        return ""
+    return getattr(args[0], "name", "")
+
+
+class ProfileReport:
+    """
+    Aggregates profiled runs into collapsed stacks for flamegraphs
+    (flamegraph.pl, speedscope, inferno):
+
+        audience_analyzer;execute;llm 1523000
+        audience_analyzer;framework 41000
+
+    Values are microseconds of self time, summed over every added run.
+    """
+
+    def __init__(self):
+        self.stacks: Dict[str, float] = {}
+        self.runs = 0
+
+    def add(self, record: Any) -> bool:
+        profile = record.extra.get("profile")
+        if not profile:
+            return False
+
+        self.runs += 1
+        in_sections = 0.0
+        for path, seconds in profile["stacks"].items():
+            self._add(f"{record.agent_name};{path}", seconds)
+            in_sections += seconds
+        # time between sections (validation, record building) has no section of its own
+        self._add(f"{record.agent_name};framework", max(0.0, profile["wall_s"] - in_sections))
+        return True
+
+    def add_records(self, records: Iterable[Any]) -> int:
+        return sum(1 for record in records if self.add(record))
+
+    def collapsed(self) -> str:
+        lines = [f"{path} {int(seconds * 1_000_000)}" for path, seconds in sorted(self.stacks.items())]
+        return "\n".join(line for line in lines if not line.endswith(" 0")) + "\n"
+
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+
+    def _add(self, path: str, seconds: float) -> None:
+        self.stacks[path] = self.stacks.get(path, 0.0) + seconds
+
+
+def _snapshot() -> "tracemalloc.Snapshot":
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    # allocations made by the profilers themselves are not the run's
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, cProfile.__file__),
+        tracemalloc.Filter(False, pstats.__file__),
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ])
+
+
+def _top_functions(profiler: "cProfile.Profile", top: int) -> List[Dict[str, Any]]:
+    import io
+    import pstats
+
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+    return [
+        {
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "tottime_s": round(tottime, 6),
+            "cumtime_s": round(cumtime, 6),
+        }
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in rows
+    ]
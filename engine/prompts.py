@@ -0,0 +1,144 @@
+import string
+import textwrap
+from typing import Any, Dict, List, Optional, Tuple
+
+from engine.run_scope import current_scope
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 chars per token for english text).
+    Good enough for pacing and budgeting, not for billing.
+    """
+    return max(1, len(str(text)) // 4)
+
+
+def clean_prompt_text(text: str) -> str:
+    """dedent, strip trailing spaces and collapse runs of blank lines (indentation is billed too)"""
+    lines = [line.rstrip() for line in textwrap.dedent(text).strip().splitlines()]
+    cleaned: List[str] = []
+    for line in lines:
+        if line or (cleaned and cleaned[-1]):
+            cleaned.append(line)
+    return "\n".join(cleaned)
+
+
+class Prompt(str):
+    """
+    A rendered prompt. It is a plain str (static prefix + request part), so
+    every llm wrapper (cache keys, single flight, rate limits) treats it as
+    before, while providers that can keep the prefix apart (system
+    instruction, provider side context cache) read `system` and `user`,
+    and providers with a structured output mode read `schema`.
+    """
+
+    system: str
+    user: str
+    template: str
+    schema: Optional[Dict[str, Any]]
+
+    def __new__(cls, system: str, user: str, template: str = "", schema: Optional[Dict[str, Any]] = None) -> "Prompt":
+        prompt = super().__new__(cls, f"{system}\n\n{user}" if system else user)
+        prompt.system = system
+        prompt.user = user
+        prompt.template = template
+        prompt.schema = schema
+        return prompt
+
+    def __getnewargs__(self) -> Tuple[str, str, str, Optional[Dict[str, Any]]]:
+        return self.system, self.user, self.template, self.schema  # copy / pickle keep the parts
+
+    def estimated_tokens(self) -> int:
+        return estimate_tokens(self)
+
+    def static_tokens(self) -> int:
+        return estimate_tokens(self.system) if self.system else 0
+
+
+class PromptTemplate:
+    """
+    A prompt compiled once (typically a class attribute of the agent):
+
+        PROMPT = PromptTemplate(
+            "audience_analyzer",
+            instructions='''
+                You are a marketing strategist ...
+            ''',
+            body='''
+                Product: {product}
+            ''',
+        )
+        PROMPT.render(product="AI CRM tool")
+
+    `instructions` is the static prefix, identical for every request, so it
+    can be sent as a system instruction and cached provider side.
+    `body` holds the per request `{fields}` (str.format syntax, no format
+    specs), parsed once here so rendering is a single join.
+    `response_schema` (see response_schema()) is the json the agent reads
+    back, providers pass it to their structured output mode.
+    """
+
+    def __init__(self, name: str, instructions: str, body: str, response_schema: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.instructions = clean_prompt_text(instructions)
+        self.body = clean_prompt_text(body)
+        self.response_schema = response_schema
+        self.static_tokens = estimate_tokens(self.instructions)
+
+        self._parts: List[Tuple[str, Optional[str]]] = []
+        for literal, field, spec, conversion in string.Formatter().parse(self.body):
+            if field == "":
+                raise ValueError(f"prompt template '{name}': positional {{}} fields are not supported")
+            if spec or conversion:
+                raise ValueError(f"prompt template '{name}': format specs are not supported ({{{field}}})")
+            self._parts.append((literal, field))
+        self.fields = tuple(field for _, field in self._parts if field)
+
+    def render(self, **values: Any) -> Prompt:
+        missing = [field for field in self.fields if field not in values]
+        if missing:
+            raise ValueError(f"prompt template '{self.name}' is missing {', '.join(missing)}")
+
+        user = "".join(literal + (str(values[field]) if field else "") for literal, field in self._parts)
+        return Prompt(self.instructions, user, self.name, self.response_schema)
+
+
+_SCHEMA_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean"}
+
+
+def response_schema(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    json schema of an object, from a python shorthand of its fields:
+
+        response_schema({"tone": str, "pain_points": [str], "benefits": [{"title": str}]})
+
+    str / int / float / bool, [item] for arrays, {name: ...} for nested
+    objects. Every field is required, the subset of json schema that
+    structured output modes (eg: Gemini response_schema) all understand.
+    """
+    return _schema(fields)
+
+
+def _schema(spec: Any) -> Dict[str, Any]:
+    if isinstance(spec, dict):
+        return {
+            "type": "object",
+            "properties": {name: _schema(value) for name, value in spec.items()},
+            "required": list(spec),
+        }
+    if isinstance(spec, list) and len(spec) == 1:
+        return {"type": "array", "items": _schema(spec[0])}
+    if spec in _SCHEMA_TYPES:
+        return {"type": _SCHEMA_TYPES[spec]}
+    raise ValueError(f"unsupported response schema field {spec!r}")
+
+
+def record_prompt(prompt: str) -> None:
+    """size of the prompt about to be sent, into AgentrunRecord.extra["prompt"]"""
+    scope = current_scope()
+    if scope is None:
+        return
+    scope.set("prompt", "estimated_tokens", estimate_tokens(prompt))
+    if isinstance(prompt, Prompt):
+        scope.set("prompt", "static_tokens", prompt.static_tokens())
+        scope.set("prompt", "template", prompt.template)
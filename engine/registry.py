@@ -0,0 +1,55 @@
+import importlib
+import threading
+from typing import Any, Callable, Dict, List, Union
+
+# a registered target: the object itself, or "package.module:attribute" to import on first use
+Target = Union[str, Callable[..., Any]]
+
+
+class LazyRegistry:
+    """
+    Name -> object lookup where entries can be given as import strings:
+
+        DOMAINS.register("marketing", "domains.marketing.agent_factory:build_marketing_workflow")
+        DOMAINS.get("marketing")   # imports the module now, cached afterwards
+
+    Registering costs nothing, so heavy modules (provider sdks, domain
+    agents) are only imported by the processes that actually use them.
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._targets: Dict[str, Target] = {}
+        self._loaded: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, target: Target) -> None:
+        with self._lock:
+            self._targets[name] = target
+            self._loaded.pop(name, None)
+
+    def names(self) -> List[str]:
+        return sorted(self._targets)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._loaded
+
+    def get(self, name: str) -> Any:
+        loaded = self._loaded.get(name)
+        if loaded is not None:
+            return loaded
+
+        target = self._targets.get(name)
+        if target is None:
+            raise ValueError(f"Unsupported {self.kind} '{name}' (known: {', '.join(self.names())})")
+
+        resolved = _resolve(target) if isinstance(target, str) else target
+        with self._lock:
+            self._loaded[name] = resolved
+        return resolved
+
+
+def _resolve(target: str) -> Any:
+    module_name, _, attribute = target.partition(":")
+    module = importlib.import_module(module_name)
+    return getattr(module, attribute) if attribute else module
@@ -0,0 +1,69 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+
+class RunScope:
+    """
+    Per agent-run bag of telemetry.
+
+    BaseAgent.run opens one around prepare/execute/finalize, code deep in
+    the call stack (llm wrappers etc) writes into it without having to be
+    handed the record, and the agent merges it into AgentrunRecord.extra.
+    Sections keep different writers apart, eg: extra["retry"], extra["usage"].
+    """
+
+    def __init__(self):
+        self.extra: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()   # llm wrappers may write from helper threads
+
+    def incr(self, section: str, key: str, n: float = 1) -> None:
+        with self._lock:
+            bucket = self.extra.setdefault(section, {})
+            bucket[key] = bucket.get(key, 0) + n
+
+    def append(self, section: str, key: str, value: Any) -> None:
+        with self._lock:
+            self.extra.setdefault(section, {}).setdefault(key, []).append(value)
+
+    def set(self, section: str, key: str, value: Any) -> None:
+        with self._lock:
+            self.extra.setdefault(section, {})[key] = value
+
+
+_current_scope: ContextVar[Optional[RunScope]] = ContextVar("zap_run_scope", default=None)
+
+
+def current_scope() -> Optional[RunScope]:
+    return _current_scope.get()
+
+
+@contextmanager
+def open_scope() -> Iterator[RunScope]:
+    scope = RunScope()
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+
+
+# no-op when nothing opened a scope (eg: llm used outside an agent)
+
+def scope_incr(section: str, key: str, n: float = 1) -> None:
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.incr(section, key, n)
+
+
+def scope_append(section: str, key: str, value: Any) -> None:
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.append(section, key, value)
+
+
+def scope_set(section: str, key: str, value: Any) -> None:
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.set(section, key, value)
@@ -0,0 +1,83 @@
+import asyncio
+import inspect
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, Set, Tuple
+
+# listener(agent, field, value, partial) -> None (or an awaitable in async code)
+PartialListener = Callable[[Any, str, Any, Dict[str, Any]], Any]
+
+# each listener with the event loop it was registered on (None outside async code)
+_listeners: ContextVar[Tuple[Tuple[PartialListener, Optional[asyncio.AbstractEventLoop]], ...]] = ContextVar(
+    "zap_partial_listeners", default=()
+)
+
+# tasks of async listeners scheduled from sync code on their own loop's thread, kept alive until done
+_scheduled: Set["asyncio.Task[Any]"] = set()
+
+
+@contextmanager
+def on_partial(listener: Optional[PartialListener]) -> Iterator[None]:
+    """
+    Receive partial agent output (one call per completed top level field)
+    for everything that runs inside the block. Listeners nest, so a caller
+    and the orchestrator hooks can both listen to the same run.
+
+        with on_partial(lambda agent, field, value, partial: print(field)):
+            agent.run(raw_input)
+
+    An async listener must be registered inside a running event loop.
+    Sync code under it (eg: an agent's execute run with asyncio.to_thread)
+    hands each call over to that loop, see emit_partial.
+    """
+    if listener is None:
+        yield
+        return
+
+    loop = _running_loop()
+    if loop is None and inspect.iscoroutinefunction(listener):
+        raise TypeError("an async partial listener needs a running event loop, register it from async code")
+
+    token = _listeners.set(_listeners.get() + ((listener, loop),))
+    try:
+        yield
+    finally:
+        _listeners.reset(token)
+
+
+def emit_partial(agent: Any, field: str, value: Any, partial: Dict[str, Any]) -> None:
+    """
+    Sync side. An async listener's coroutine runs on the loop it was
+    registered on: from a worker thread the call waits for it (same order
+    and back pressure as a sync listener), on the loop's own thread it
+    can only be scheduled as a task.
+    """
+    for listener, loop in _listeners.get():
+        result = listener(agent, field, value, partial)
+        if not inspect.iscoroutine(result):
+            continue
+
+        if loop is None or loop.is_closed():
+            result.close()
+            raise TypeError("async partial listener called outside the event loop it was registered on")
+
+        if loop is _running_loop():
+            task = loop.create_task(result)
+            _scheduled.add(task)
+            task.add_done_callback(_scheduled.discard)
+        else:
+            asyncio.run_coroutine_threadsafe(result, loop).result()
+
+
+async def aemit_partial(agent: Any, field: str, value: Any, partial: Dict[str, Any]) -> None:
+    for listener, _ in _listeners.get():
+        result = listener(agent, field, value, partial)
+        if inspect.isawaitable(result):
+            await result
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
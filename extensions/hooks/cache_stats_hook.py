@@ -0,0 +1,48 @@
+from typing import Any, Dict, List
+
+from engine.hooks import BaseHook
+from engine.log_sink import get_sink
+
+
+class CacheStatsHook(BaseHook):
+    """
+    Observer that exposes CachingLLM hit/miss/eviction stats
+    through the normal hook lifecycle.
+
+    After every workflow, `last_delta` holds what changed during that
+    run and `totals` holds the cumulative stats per cache.
+    (with concurrent workflows the delta is shared between them)
+    """
+
+    def __init__(self, caches: Dict[str, Any], verbose: bool = False):
+        self.caches = caches          # name -> CachingLLM
+        self.verbose = verbose
+
+        self._before: Dict[str, Dict[str, Any]] = {}
+        self.last_delta: Dict[str, Dict[str, Any]] = {}
+        self.totals: Dict[str, Dict[str, Any]] = {}
+
+    def on_workflow_start(self, initial_input: dict) -> None:
+        self._before = {name: cache.stats() for name, cache in self.caches.items()}
+
+    def on_workflow_end(self, result: dict, rec_history: List[Any]) -> None:
+        for name, cache in self.caches.items():
+            now = cache.stats()
+            before = self._before.get(name, {})
+
+            self.totals[name] = now
+            self.last_delta[name] = {
+                key: now[key] - before.get(key, 0)
+                for key in ("memory_hits", "disk_hits", "misses", "evictions", "expirations")
+            }
+
+            if self.verbose:
+                delta = self.last_delta[name]
+                get_sink().info(
+                    "cache.stats",
+                    cache=name,
+                    hits=delta["memory_hits"] + delta["disk_hits"],
+                    misses=delta["misses"],
+                    evictions=delta["evictions"],
+                    hit_rate_total=round(now["hit_rate"], 4),
+                )
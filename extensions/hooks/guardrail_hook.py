@@ -1,3 +1,4 @@
+from contextvars import ContextVar
 from typing import Any, List, Optional
 
 from engine.hooks import BaseHook
@@ -24,12 +25,14 @@ class GuardrailHook(BaseHook):
         self.required_input_keys = required_input_keys or []
         self.blocked_agents = blocked_agents or []
 
-        self._step_count = 0
+        # step count lives in a contextvar so one hook instance can be shared
+        # by workflows running concurrently (threads or asyncio tasks)
+        self._step_count: ContextVar[int] = ContextVar(f"guardrail_steps_{id(self)}", default=0)
 
     # workflow lvl 
 
     def on_workflow_start(self, initial_input: dict) -> None:
-        self._step_count = 0
+        self._step_count.set(0)
 
         if self.required_input_keys:
             payload = initial_input.get("payload", {})
@@ -42,9 +45,10 @@ class GuardrailHook(BaseHook):
     # agent lvl
 
     def before_agent_run(self, agent: Any, agent_input: dict) -> None:
-        self._step_count += 1
+        step_count = self._step_count.get() + 1
+        self._step_count.set(step_count)
 
-        if self.max_steps is not None and self._step_count > self.max_steps:
+        if self.max_steps is not None and step_count > self.max_steps:
             raise GuardrailViolation(
                 f"Workflow exceeded max steps ({self.max_steps})"
             )
@@ -1,41 +1,64 @@
-import json
 from typing import Any
 
 from engine.hooks import BaseHook
 from engine.agent_base import AgentrunRecord
+from engine.log_sink import LogSink, get_sink
 
 
 class LoggingHook(BaseHook):
     """
     LoggingHook is an observer.
-    It logs workflow and agent lifecycle events.
+    It logs workflow and agent lifecycle events, one json line each,
+    through a LogSink (the engine's default sink if none is given).
     It does NOT affect execution.
+
+    Levels: workflow / agent start and end -> info, streamed fields -> debug,
+    agent failures -> error. payloads=False leaves inputs, outputs and
+    streamed values out of every event, error records included.
     """
 
+    deferrable = True
+
+    def __init__(self, sink: LogSink | None = None, payloads: bool = True):
+        self._sink = sink
+        self.payloads = payloads
+
+    @property
+    def sink(self) -> LogSink:
+        return self._sink or get_sink()
+
     #workflow lvl
     def on_workflow_start(self, initial_input: dict) -> None:
-        print("\n[LOG] Workflow started")
-        print("[LOG] Initial input:")
-        print(json.dumps(initial_input, indent=2))
+        fields = {"input": initial_input} if self.payloads else {}
+        self.sink.info("workflow.start", **fields)
 
     def on_workflow_end(self, result: dict, rec_history: list) -> None:
-        print("\n[LOG] Workflow ended")
-        print("[LOG] Status:", result["status"])
-        print("[LOG] Total agents run:", len(rec_history))
+        self.sink.info(
+            "workflow.end",
+            status=result["status"],
+            agents_run=len(rec_history),
+            usage=result.get("usage"),
+        )
 
 
     # agent lvl
     def before_agent_run(self, agent: Any, agent_input: dict) -> None:
-        print(f"\n[LOG] → Running agent: {agent.name}")
-        print("[LOG] Agent input:")
-        print(json.dumps(agent_input, indent=2))
+        fields = {"input": agent_input} if self.payloads else {}
+        self.sink.info("agent.start", agent=agent.name, **fields)
 
     def after_agent_run(self, agent: Any, agent_output: Any, record: AgentrunRecord) -> None:
-        print(f"[LOG] ← Agent finished: {agent.name}")
-        print("[LOG] Status:", record.status)
-        print("[LOG] Duration:", f"{record.duration_s:.4f}s")
-        print("[LOG] Output:")
-        print(json.dumps(agent_output.model_dump(), indent=2))
+        fields = {"output": agent_output} if self.payloads else {}
+        self.sink.info(
+            "agent.end",
+            agent=agent.name,
+            status=record.status,
+            duration_s=round(record.duration_s, 4),
+            **fields,
+        )
+
+    def on_agent_partial(self, agent: Any, field: str, value: Any, partial: dict) -> None:
+        fields = {"value": value} if self.payloads else {}
+        self.sink.debug("agent.partial", agent=agent.name, field=field, **fields)
 
     def on_agent_error(
         self,
@@ -43,7 +66,6 @@ class LoggingHook(BaseHook):
         error: Exception,
         record: AgentrunRecord,
     ) -> None:
-        print(f"\n[LOG][ERROR] Agent failed: {agent.name}")
-        print("[LOG][ERROR] Error:", str(error))
-        print("[LOG][ERROR] Record:")
-        print(json.dumps(record.model_dump(), indent=2))
+        # the record carries the run's input (and any output), same rule as agent.end
+        logged = record if self.payloads else record.model_dump(mode="json", exclude={"input", "output"})
+        self.sink.error("agent.error", agent=agent.name, error=str(error), record=logged)
@@ -10,6 +10,8 @@ class MemoryHook(BaseHook):
     Saves both successful and failed runs.
     """
 
+    deferrable = True   # a slow disk write shouldnt hold up the workflow
+
     def __init__(self, memory_store: MemoryStore | None = None):
         # allow dependency injection for testing
         self.memory_store = memory_store or MemoryStore()
@@ -19,5 +21,6 @@ class MemoryHook(BaseHook):
         if not rec_history:
             return
 
-        self.memory_store.save_workflow_run(rec_history)
+        # keyed by the workflow run id, so get_run(result["run_id"]) finds it
+        self.memory_store.save_workflow_run(rec_history, run_id=result.get("run_id"))
         # TODO: later we can add success/failure filter or separate failed runs folder
\ No newline at end of file
@@ -0,0 +1,373 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from engine.hooks import BaseHook
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# name -> (type, help)
+METRICS = {
+    "zap_workflow_runs_total": ("counter", "Workflow runs by final status."),
+    "zap_workflow_duration_seconds": ("histogram", "Workflow latency (first agent start to last agent end)."),
+    "zap_agent_runs_total": ("counter", "Agent runs by agent and status."),
+    "zap_agent_duration_seconds": ("histogram", "Agent run latency."),
+    "zap_agent_tokens_total": ("counter", "LLM tokens used by agent."),
+    "zap_llm_calls_total": ("counter", "LLM calls seen by TracingLLM, by model and status."),
+    "zap_llm_call_duration_seconds": ("histogram", "LLM call latency seen by TracingLLM."),
+    "zap_llm_json_parses_total": ("counter", "LLM answers by json parse outcome (clean, extracted, repaired, failed)."),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def hex_id(value: str, length: int) -> str:
+    """
+    run_id -> trace / span id. uuids keep their own hex digits, so a
+    run_id from AgentrunRecord (or the workflow result) can be looked up
+    in a tracing backend directly. Anything else is hashed.
+    """
+    try:
+        digits = uuid.UUID(str(value)).hex
+    except ValueError:
+        digits = hashlib.sha256(str(value).encode("utf-8")).hexdigest()
+    return digits[:length]
+
+
+def trace_id_for(workflow_run_id: str) -> str:
+    return hex_id(workflow_run_id, 32)
+
+
+def span_id_for(agent_run_id: str) -> str:
+    return hex_id(agent_run_id, 16)
+
+
+class _Histogram:
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)   # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsHook(BaseHook):
+    """
+    Observer that keeps latency histograms / counters and builds spans.
+
+    Metrics (per agent and per workflow) are updated as agents finish.
+    Spans are built at workflow end from rec_history:
+
+        workflow (trace_id = workflow run_id)
+          └── agent <name> (span_id = agent run_id)
+                └── llm <model> (one per call, needs TracingLLM in the llm chain)
+
+    Exports:
+        prometheus_text() / write_prometheus(path) / serve_prometheus(port)
+        export_traces(path)   -> OTLP/JSON traces, drains the span buffer
+        export_metrics(path)  -> OTLP/JSON metrics
+
+    Everything it reads is on the records, so it is safe to defer.
+    """
+
+    deferrable = True
+
+    def __init__(
+        self,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        max_spans: int = 10000,
+        service_name: str = "zap",
+    ):
+        self.buckets = tuple(sorted(buckets))
+        self.service_name = service_name
+        self.started_ts = time.time()
+
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+        self._spans: Deque[Dict[str, Any]] = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    # hook events
+
+    def after_agent_run(self, agent: Any, agent_output: Any, record: Any) -> None:
+        self._agent_metrics(record)
+
+    def on_agent_error(self, agent: Any, error: Exception, record: Any) -> None:
+        self._agent_metrics(record)
+
+    def on_workflow_end(self, result: dict, rec_history: list) -> None:
+        status = result.get("status", "unknown")
+        start = min((r.start_ts for r in rec_history), default=time.time())
+        end = max((r.end_ts or r.start_ts for r in rec_history), default=start)
+
+        with self._lock:
+            self._incr("zap_workflow_runs_total", {"status": status})
+            self._observe("zap_workflow_duration_seconds", {"status": status}, end - start)
+
+        self._workflow_spans(result, rec_history, status, start, end)
+
+    # metrics
+
+    def _agent_metrics(self, record: Any) -> None:
+        agent = {"agent": record.agent_name}
+        calls = record.extra.get("trace", {}).get("llm_calls", [])
+
+        with self._lock:
+            self._incr("zap_agent_runs_total", {**agent, "status": record.status})
+            if record.duration_s is not None:
+                self._observe("zap_agent_duration_seconds", agent, record.duration_s)
+            if record.tokens_used:
+                self._incr("zap_agent_tokens_total", agent, record.tokens_used)
+
+            for outcome, n in record.extra.get("json", {}).items():
+                self._incr("zap_llm_json_parses_total", {**agent, "outcome": outcome}, n)
+
+            for call in calls:
+                model = {"model": call["model"]}
+                self._incr("zap_llm_calls_total", {**model, "status": call["status"]})
+                self._observe("zap_llm_call_duration_seconds", model, call["end_ts"] - call["start_ts"])
+
+    def _incr(self, name: str, labels: Dict[str, str], n: float = 1) -> None:
+        series = self._counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + n
+
+    def _observe(self, name: str, labels: Dict[str, str], value: float) -> None:
+        series = self._histograms.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        if key not in series:
+            series[key] = _Histogram(self.buckets)
+        series[key].observe(value)
+
+    # spans
+
+    def _workflow_spans(self, result: dict, rec_history: list, status: str, start: float, end: float) -> None:
+        run_id = result.get("run_id") or str(uuid.uuid4())
+        trace_id = trace_id_for(run_id)
+        root_id = trace_id[16:]
+
+        spans = [_span(
+            trace_id, root_id, None, "workflow", start, end,
+            status == "success", result.get("error"),
+            {"zap.run_id": run_id, "zap.status": status, "zap.agents_run": len(rec_history)},
+        )]
+
+        for record in rec_history:
+            agent_span = span_id_for(record.run_id)
+            attributes = {"zap.agent": record.agent_name, "zap.run_id": record.run_id, "zap.status": record.status}
+            if record.tokens_used:
+                attributes["zap.tokens_used"] = record.tokens_used
+            spans.append(_span(
+                trace_id, agent_span, root_id, f"agent {record.agent_name}",
+                record.start_ts, record.end_ts or record.start_ts,
+                record.status == "success", record.error, attributes,
+            ))
+
+            for call in record.extra.get("trace", {}).get("llm_calls", []):
+                spans.append(_span(
+                    trace_id, os.urandom(8).hex(), agent_span, f"llm {call['model']}",
+                    call["start_ts"], call["end_ts"],
+                    call["status"] == "ok", call.get("error"),
+                    {"llm.model": call["model"], "zap.agent_run_id": record.run_id},
+                ))
+
+        with self._lock:
+            self._spans.extend(spans)
+
+    def spans(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._spans)
+
+    # prometheus
+
+    def prometheus_text(self) -> str:
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in METRICS.items():
+                if kind == "counter" and name in self._counters:
+                    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                    for labels, value in sorted(self._counters[name].items()):
+                        lines.append(f"{name}{_prom_labels(labels)} {_prom_number(value)}")
+
+                if kind == "histogram" and name in self._histograms:
+                    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                    for labels, hist in sorted(self._histograms[name].items()):
+                        cumulative = 0
+                        for bound, count in zip(list(hist.bounds) + ["+Inf"], hist.counts):
+                            cumulative += count
+                            le = bound if bound == "+Inf" else _prom_number(bound)
+                            lines.append(f"{name}_bucket{_prom_labels(labels + (('le', le),))} {cumulative}")
+                        lines.append(f"{name}_sum{_prom_labels(labels)} {_prom_number(hist.sum)}")
+                        lines.append(f"{name}_count{_prom_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """textfile collector style: written to a temp file, then swapped in"""
+        _write_atomic(path, self.prometheus_text())
+
+    def serve_prometheus(self, port: int = 9464, host: str = "127.0.0.1") -> "ThreadingHTTPServer":
+        """
+        tiny /metrics endpoint on a daemon thread (port=0 picks a free one).
+        call .shutdown() on the returned server to stop it.
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # only when serving
+
+        hook = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = hook.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass  # no access log on stderr
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="zap-metrics-http", daemon=True).start()
+        return server
+
+    # otlp json
+
+    def export_traces(self, path: str) -> int:
+        """write buffered spans as an OTLP/JSON traces file and drop them, returns the span count"""
+        with self._lock:
+            spans = list(self._spans)
+            self._spans.clear()
+
+        document = {"resourceSpans": [{
+            "resource": self._resource(),
+            "scopeSpans": [{"scope": {"name": "zap.metrics_hook"}, "spans": [_otlp_span(s) for s in spans]}],
+        }]}
+        _write_atomic(path, json.dumps(document))
+        return len(spans)
+
+    def export_metrics(self, path: str) -> None:
+        """write current values as an OTLP/JSON metrics file (cumulative)"""
+        start, now = _nanos(self.started_ts), _nanos(time.time())
+        metrics = []
+
+        with self._lock:
+            for name, (kind, help_text) in METRICS.items():
+                if kind == "counter" and name in self._counters:
+                    points = [
+                        {"attributes": _otlp_attributes(dict(labels)), "startTimeUnixNano": start,
+                         "timeUnixNano": now, "asDouble": float(value)}
+                        for labels, value in sorted(self._counters[name].items())
+                    ]
+                    metrics.append({"name": name, "description": help_text, "sum": {
+                        "dataPoints": points, "aggregationTemporality": 2, "isMonotonic": True}})
+
+                if kind == "histogram" and name in self._histograms:
+                    points = [
+                        {"attributes": _otlp_attributes(dict(labels)), "startTimeUnixNano": start,
+                         "timeUnixNano": now, "count": str(hist.count), "sum": hist.sum,
+                         "bucketCounts": [str(c) for c in hist.counts], "explicitBounds": list(hist.bounds)}
+                        for labels, hist in sorted(self._histograms[name].items())
+                    ]
+                    metrics.append({"name": name, "description": help_text, "unit": "s", "histogram": {
+                        "dataPoints": points, "aggregationTemporality": 2}})
+
+        document = {"resourceMetrics": [{
+            "resource": self._resource(),
+            "scopeMetrics": [{"scope": {"name": "zap.metrics_hook"}, "metrics": metrics}],
+        }]}
+        _write_atomic(path, json.dumps(document))
+
+    def _resource(self) -> Dict[str, Any]:
+        return {"attributes": _otlp_attributes({"service.name": self.service_name})}
+
+
+# helpers
+
+def _span(
+    trace_id: str, span_id: str, parent_id: Optional[str], name: str,
+    start: float, end: float, ok: bool, error: Optional[str], attributes: Dict[str, Any],
+) -> Dict[str, Any]:
+    return {
+        "trace_id": trace_id, "span_id": span_id, "parent_span_id": parent_id, "name": name,
+        "start_ts": start, "end_ts": end, "ok": ok, "error": None if ok else error,
+        "attributes": attributes,
+    }
+
+
+def _otlp_span(span: Dict[str, Any]) -> Dict[str, Any]:
+    out = {
+        "traceId": span["trace_id"],
+        "spanId": span["span_id"],
+        "name": span["name"],
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": _nanos(span["start_ts"]),
+        "endTimeUnixNano": _nanos(span["end_ts"]),
+        "attributes": _otlp_attributes(span["attributes"]),
+        "status": {"code": 1} if span["ok"] else {"code": 2, "message": (span["error"] or "")[:1000]},
+    }
+    if span["parent_span_id"]:
+        out["parentSpanId"] = span["parent_span_id"]
+    return out
+
+
+def _otlp_attributes(values: Dict[str, Any]) -> List[Dict[str, Any]]:
+    attributes = []
+    for key, value in values.items():
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        attributes.append({"key": key, "value": typed})
+    return attributes
+
+
+def _nanos(ts: float) -> str:
+    return str(int(ts * 1_000_000_000))
+
+
+def _prom_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_prom_escape(value)}"' for key, value in labels) + "}"
+
+
+def _prom_escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _prom_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _write_atomic(path: str, text: str) -> None:
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
@@ -0,0 +1,196 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from pydantic import BaseModel
+
+from engine.budget import current_budget
+from engine.prompts import estimate_tokens  # re-exported, providers import it from here
+from engine.run_scope import scope_append, scope_incr
+
+# llm errors
+# RuntimeError subclasses, so code catching the old RuntimeError keeps working
+
+class LLMError(RuntimeError):
+    """
+    Base llm failure. `retryable` tells retry wrappers whether another
+    attempt can help, `retry_after` carries a provider hint (seconds).
+    """
+    retryable = True
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMRateLimitError(LLMError):
+    retryable = True
+
+
+class LLMServerError(LLMError):
+    retryable = True
+
+
+class LLMAuthError(LLMError):
+    retryable = False
+
+
+class LLMBadRequestError(LLMError):
+    retryable = False
+
+
+class LLMResponseParseError(LLMError):
+    # only raised once extraction / repair (json_repair) gave up, a fresh sample usually parses
+    retryable = True
+
+
+class LLMUsage(BaseModel):
+    """
+    Token usage (and cost if the price is known) of one provider call
+    """
+    model: str = ""
+    input_tokens: int = 0
+    output_tokens: int = 0
+    total_tokens: int = 0
+    cached_tokens: int = 0
+    cost_usd: float = 0.0
+
+
+class BaseLLM(ABC):
+
+    @abstractmethod
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        """
+        it must return structured JSON output.
+        """
+        pass
+
+    def generate_json_with_usage(self, prompt: str) -> Tuple[Dict[str, Any], Optional[LLMUsage]]:
+        """
+        parsed json + usage of the call.
+        providers that get usage back from their api should override this,
+        the default has no usage to give.
+        """
+        return self.generate_json(prompt), None
+
+    async def agenerate_json(self, prompt: str) -> Dict[str, Any]:
+        """
+        async version of generate_json.
+
+        default just runs the blocking call in a worker thread,
+        providers with a native async client should override this.
+        """
+        return await asyncio.to_thread(self.generate_json, prompt)
+
+    def stream_json(self, prompt: str) -> Iterator[Tuple[str, Any]]:
+        """
+        yields top level (field, value) pairs of the json response,
+        each one as soon as it is complete.
+
+        default is for providers without streaming: everything is
+        yielded at once after the full response arrived.
+        """
+        yield from self.generate_json(prompt).items()
+
+    async def astream_json(self, prompt: str) -> AsyncIterator[Tuple[str, Any]]:
+        """async version of stream_json"""
+        for item in (await self.agenerate_json(prompt)).items():
+            yield item
+
+    def generate_json_batch(self, prompts: Sequence[str]) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        one result per prompt, in order. A failed item is its exception
+        (returned, not raised), so one bad prompt doesnt sink the batch.
+
+        default issues the calls concurrently, wrappers / providers that can
+        answer several prompts per request (PackedBatchLLM) override this.
+        """
+        if len(prompts) <= 1:
+            return [_call_or_error(self.generate_json, prompt) for prompt in prompts]
+
+        # each call runs in a copy of the caller's context (run scope, budget)
+        with ThreadPoolExecutor(max_workers=min(len(prompts), BATCH_FALLBACK_WORKERS)) as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, _call_or_error, self.generate_json, prompt)
+                for prompt in prompts
+            ]
+            return [future.result() for future in futures]
+
+    async def agenerate_json_batch(self, prompts: Sequence[str]) -> List[Union[Dict[str, Any], Exception]]:
+        """async version of generate_json_batch"""
+        results = await asyncio.gather(*(self.agenerate_json(prompt) for prompt in prompts), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException) and not isinstance(result, Exception):
+                raise result  # cancellation etc is not a per item failure
+        return list(results)
+
+
+# concurrency of the default generate_json_batch
+BATCH_FALLBACK_WORKERS = 8
+
+
+def _call_or_error(fn: Any, prompt: str) -> Union[Dict[str, Any], Exception]:
+    try:
+        return fn(prompt)
+    except Exception as e:
+        return e
+
+
+# helpers shared by wrappers that need to recognise "the same request"
+
+def llm_model_name(llm: BaseLLM) -> str:
+    """
+    Walk down a wrapper chain (RetryLLM(CachingLLM(GeminiClient)) etc)
+    until something exposes a `model` attribute.
+    """
+    current = llm
+    while current is not None:
+        model = getattr(current, "model", None)
+        if isinstance(model, str):
+            return model
+        current = getattr(current, "llm", None)
+    return type(llm).__name__
+
+
+def prompt_key(prompt: str, model: str = "", settings: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Stable hash of (normalized prompt, model, generation settings).
+    Whitespace is collapsed, so indentation changes in an f-string
+    dont create a different key.
+    """
+    normalized = " ".join(str(prompt).split())
+    material = json.dumps(
+        {"prompt": normalized, "model": model, "settings": settings or {}},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def record_usage(usage: LLMUsage) -> None:
+    """
+    Providers call this once per upstream call. Usage goes into the
+    current agent run (AgentrunRecord.extra["usage"] / tokens_used)
+    and into the current workflow budget, if any.
+    """
+    scope_incr("usage", "llm_calls")
+    scope_incr("usage", "input_tokens", usage.input_tokens)
+    scope_incr("usage", "output_tokens", usage.output_tokens)
+    scope_incr("usage", "total_tokens", usage.total_tokens)
+    scope_incr("usage", "cost_usd", usage.cost_usd)
+    if usage.cached_tokens:
+        scope_incr("usage", "cached_tokens", usage.cached_tokens)
+    scope_append("usage", "calls", usage.model_dump())
+
+    budget = current_budget()
+    if budget is not None:
+        budget.add(
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            total_tokens=usage.total_tokens,
+            cost_usd=usage.cost_usd,
+        )
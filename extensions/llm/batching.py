@@ -0,0 +1,367 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from engine.budget import WorkflowBudget, current_budget, split_usage, use_budget
+from engine.deadline import Deadline, DeadlineExceeded, call_timeout, current_deadline, use_deadline
+from engine.prompts import Prompt, clean_prompt_text
+from engine.run_scope import RunScope, current_scope, open_scope
+from extensions.llm.base import BaseLLM
+
+BATCH_INSTRUCTION = clean_prompt_text("""
+    You will get several independent tasks, each under a "### Task <id>" header.
+    Answer every task on its own, as if it were the only one, following the instructions that apply to it.
+    Return ONLY valid JSON of the form
+    {"results": [{"id": <task id>, "output": <the JSON object answering that task>}]}
+    with exactly one entry per task.
+""")
+
+
+class PackedBatchLLM(BaseLLM):
+    """
+    wrapper that answers a batch of prompts with one upstream request.
+
+    Up to `max_items` prompts (and `max_chars` of text) are packed into a
+    single prompt that asks for {"results": [{"id", "output"}]}, the answer
+    is split back per prompt by id. When the prompts share a static prefix
+    (Prompt.system, same template) it is sent once for the whole pack.
+
+    Partial failures stay partial: items the packed answer is missing (or
+    a pack that failed outright) are re-asked one by one, so a batch only
+    costs more than its single calls when the model drops items.
+
+    Single prompts and streams are passed through.
+    """
+
+    def __init__(self, llm: BaseLLM, max_items: int = 8, max_chars: int = 24000):
+        if max_items < 1:
+            raise ValueError("max_items must be at least 1")
+
+        self.llm = llm
+        self.max_items = max_items
+        self.max_chars = max_chars
+
+        self._lock = threading.Lock()
+        self._counts = {"packs": 0, "packed_items": 0, "unpacked": 0, "fallbacks": 0}
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        return self.llm.generate_json(prompt)
+
+    async def agenerate_json(self, prompt: str) -> Dict[str, Any]:
+        return await self.llm.agenerate_json(prompt)
+
+    def stream_json(self, prompt: str) -> Iterator[Tuple[str, Any]]:
+        yield from self.llm.stream_json(prompt)
+
+    async def astream_json(self, prompt: str) -> AsyncIterator[Tuple[str, Any]]:
+        async for item in self.llm.astream_json(prompt):
+            yield item
+
+    def generate_json_batch(self, prompts: Sequence[str]) -> List[Union[Dict[str, Any], Exception]]:
+        chunks = self._chunks(prompts)
+        # the packs themselves go out concurrently (inner default batch)
+        responses = self.llm.generate_json_batch([self._pack(prompts, chunk) for chunk in chunks])
+        results, missing = self._unpack_all(prompts, chunks, responses)
+
+        if missing:
+            for i, result in zip(missing, self.llm.generate_json_batch([prompts[i] for i in missing])):
+                results[i] = result
+        return results
+
+    async def agenerate_json_batch(self, prompts: Sequence[str]) -> List[Union[Dict[str, Any], Exception]]:
+        chunks = self._chunks(prompts)
+        responses = await self.llm.agenerate_json_batch([self._pack(prompts, chunk) for chunk in chunks])
+        results, missing = self._unpack_all(prompts, chunks, responses)
+
+        if missing:
+            for i, result in zip(missing, await self.llm.agenerate_json_batch([prompts[i] for i in missing])):
+                results[i] = result
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    # internal helpers
+
+    def _chunks(self, prompts: Sequence[str]) -> List[List[int]]:
+        # greedy, in order: a chunk closes at max_items or max_chars
+        chunks: List[List[int]] = []
+        size = 0
+        for i, prompt in enumerate(prompts):
+            if not chunks or len(chunks[-1]) >= self.max_items or (size + len(prompt) > self.max_chars and chunks[-1]):
+                chunks.append([])
+                size = 0
+            chunks[-1].append(i)
+            size += len(prompt)
+        return chunks
+
+    def _pack(self, prompts: Sequence[str], chunk: List[int]) -> str:
+        if len(chunk) == 1:
+            return prompts[chunk[0]]
+
+        members = [prompts[i] for i in chunk]
+        first = members[0]
+        shared = (
+            isinstance(first, Prompt) and first.system
+            and all(isinstance(p, Prompt) and p.system == first.system for p in members)
+        )
+
+        tasks = "\n\n".join(
+            f"### Task {n}\n{p.user if shared else p}" for n, p in enumerate(members)
+        )
+        if shared:
+            schema = first.schema if all(p.schema == first.schema for p in members) else None
+            return Prompt(f"{first.system}\n\n{BATCH_INSTRUCTION}", tasks, first.template, _batch_schema(schema))
+        return Prompt(BATCH_INSTRUCTION, tasks, "batch")
+
+    def _unpack_all(self, prompts: Sequence[str], chunks: List[List[int]], responses: List[Any]) -> Tuple[List[Any], List[int]]:
+        results: List[Any] = [None] * len(prompts)
+        missing: List[int] = []
+        packs = packed = unpacked = 0
+
+        for chunk, response in zip(chunks, responses):
+            if len(chunk) == 1:
+                results[chunk[0]] = response
+                continue
+
+            packs += 1
+            packed += len(chunk)
+            outputs = {} if isinstance(response, Exception) else _unpack(response, len(chunk))
+            for n, i in enumerate(chunk):
+                if n in outputs:
+                    results[i] = outputs[n]
+                    unpacked += 1
+                else:
+                    missing.append(i)
+
+        with self._lock:
+            self._counts["packs"] += packs
+            self._counts["packed_items"] += packed
+            self._counts["unpacked"] += unpacked
+            self._counts["fallbacks"] += len(missing)
+        return results, missing
+
+
+def _batch_schema(schema: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """the members' response schema, wrapped in the {"results": [{"id", "output"}]} envelope"""
+    if not schema:
+        return None
+    entry = {
+        "type": "object",
+        "properties": {"id": {"type": "integer"}, "output": schema},
+        "required": ["id", "output"],
+    }
+    return {"type": "object", "properties": {"results": {"type": "array", "items": entry}}, "required": ["results"]}
+
+
+def _unpack(response: Any, size: int) -> Dict[int, Dict[str, Any]]:
+    """task id -> output, entries that arent a usable answer are left out"""
+    entries = response.get("results") if isinstance(response, dict) else None
+    if not isinstance(entries, list):
+        return {}
+
+    outputs: Dict[int, Dict[str, Any]] = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or not isinstance(entry.get("output"), dict):
+            continue
+        try:
+            n = int(entry.get("id"))
+        except (TypeError, ValueError):
+            continue
+        if 0 <= n < size and n not in outputs:
+            outputs[n] = entry["output"]
+    return outputs
+
+
+class _Pending:
+    """one queued call, with the run it belongs to"""
+
+    __slots__ = ("prompt", "future", "context", "scope", "budget", "deadline")
+
+    def __init__(self, prompt: str):
+        self.prompt = prompt
+        self.future: Future = Future()
+        self.context = contextvars.copy_context()
+        self.scope: Optional[RunScope] = current_scope()
+        self.budget: Optional[WorkflowBudget] = current_budget()
+        self.deadline: Optional[Deadline] = current_deadline()
+
+
+class MicroBatchLLM(BaseLLM):
+    """
+    wrapper that turns concurrent single calls into batches.
+
+    generate_json / agenerate_json calls arriving within `max_wait` seconds
+    of each other (eg: the same step of many workflows under run_many) are
+    sent together as one llm.generate_json_batch of up to `max_batch`
+    prompts, typically into a PackedBatchLLM so they share one request.
+    Callers still get their own result, or their own exception.
+
+    The shared call's telemetry is split across the runs in the batch the
+    way usage is (split_usage: counts add up, lists go with the first
+    run): AgentrunRecord.extra["usage"] / ["retry"] / ..., tokens_used,
+    workflow budgets. Every run in a batch gets extra["batch"]["size"].
+
+    The shared call runs under the loosest deadline of the batch (none if
+    any caller has none), and every caller waits only as long as its own
+    deadline allows: a tight deadline fails its own call with
+    DeadlineExceeded, not the whole batch.
+
+    A lone call waits at most `max_wait` for company. Batches are
+    collected on one background thread and sent from a small pool, so
+    async callers never block their event loop. Streams are passed through.
+    """
+
+    def __init__(self, llm: BaseLLM, max_batch: int = 8, max_wait: float = 0.01, max_workers: int = 8):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+
+        self.llm = llm
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_workers = max_workers
+
+        self._cond = threading.Condition()
+        self._pending: List[_Pending] = []
+        self._first_at = 0.0
+        self._collector: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._counts = {"calls": 0, "batches": 0, "batched_calls": 0}
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        timeout = call_timeout()
+        future = self._enqueue(prompt)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()  # drops out if the batch has not been sent yet
+            raise DeadlineExceeded("batched llm call did not finish before the deadline") from None
+
+    async def agenerate_json(self, prompt: str) -> Dict[str, Any]:
+        timeout = call_timeout()
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(self._enqueue(prompt)), timeout)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("batched llm call did not finish before the deadline") from None
+
+    def stream_json(self, prompt: str) -> Iterator[Tuple[str, Any]]:
+        yield from self.llm.stream_json(prompt)
+
+    async def astream_json(self, prompt: str) -> AsyncIterator[Tuple[str, Any]]:
+        async for item in self.llm.astream_json(prompt):
+            yield item
+
+    def generate_json_batch(self, prompts: Sequence[str]) -> List[Union[Dict[str, Any], Exception]]:
+        return self.llm.generate_json_batch(prompts)  # already a batch
+
+    async def agenerate_json_batch(self, prompts: Sequence[str]) -> List[Union[Dict[str, Any], Exception]]:
+        return await self.llm.agenerate_json_batch(prompts)
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            counts = dict(self._counts)
+            counts["pending"] = len(self._pending)
+        counts["mean_batch_size"] = counts["batched_calls"] / counts["batches"] if counts["batches"] else 0.0
+        return counts
+
+    # internal helpers
+
+    def _enqueue(self, prompt: str) -> Future:
+        item = _Pending(prompt)
+        with self._cond:
+            if self._collector is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="llm-batch")
+                self._collector = threading.Thread(target=self._collect, name="llm-batch-collector", daemon=True)
+                self._collector.start()
+            if not self._pending:
+                self._first_at = time.monotonic()
+            self._pending.append(item)
+            self._counts["calls"] += 1
+            self._cond.notify()
+        return item.future
+
+    def _collect(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                while len(self._pending) < self.max_batch:
+                    remaining = self._first_at + self.max_wait - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                # leftovers keep their _first_at, they already waited
+
+            self._pool.submit(self._flush, batch)
+
+    def _flush(self, batch: List[_Pending]) -> None:
+        # waiters cancelled meanwhile (async callers) drop out of the batch
+        batch = [item for item in batch if item.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        with self._cond:
+            self._counts["batches"] += 1
+            self._counts["batched_calls"] += len(batch)
+
+        try:
+            results, shared = batch[0].context.run(self._call, [item.prompt for item in batch], _loosest_deadline(batch))
+        except BaseException as exc:
+            for item in batch:
+                item.future.set_exception(exc)
+            return
+
+        _share_telemetry(shared, batch)
+        for item, result in zip(batch, results):
+            if isinstance(result, Exception):
+                item.future.set_exception(result)
+            else:
+                item.future.set_result(result)
+
+    def _call(self, prompts: List[str], deadline: Optional[Deadline]) -> Tuple[List[Any], RunScope]:
+        # no budget and a scope of its own: telemetry is shared out by hand afterwards.
+        # the first caller's context otherwise (partial listeners etc), but not its deadline
+        with use_budget(None), use_deadline(deadline), open_scope() as shared:
+            return self.llm.generate_json_batch(prompts), shared
+
+
+def _loosest_deadline(batch: List[_Pending]) -> Optional[Deadline]:
+    deadlines = [item.deadline for item in batch]
+    if any(deadline is None for deadline in deadlines):
+        return None
+    return max(deadlines, key=lambda deadline: deadline.expires_at)
+
+
+def _share_telemetry(shared: RunScope, batch: List[_Pending]) -> None:
+    sections = {section: split_usage(values, len(batch)) for section, values in shared.extra.items()}
+
+    for i, item in enumerate(batch):
+        if item.scope is not None:
+            item.scope.set("batch", "size", len(batch))
+            for section, parts in sections.items():
+                for key, value in parts[i].items():
+                    if isinstance(value, list):
+                        for v in value:
+                            item.scope.append(section, key, v)
+                    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                        item.scope.incr(section, key, value)
+                    else:
+                        item.scope.set(section, key, value)
+
+        part = sections.get("usage", [{}] * len(batch))[i]
+        if item.budget is not None and part:
+            item.budget.add(
+                input_tokens=part.get("input_tokens", 0),
+                output_tokens=part.get("output_tokens", 0),
+                total_tokens=part.get("total_tokens", 0),
+                cost_usd=part.get("cost_usd", 0.0),
+                calls=part.get("llm_calls", 0),
+            )
@@ -0,0 +1,242 @@
+import asyncio
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+from extensions.llm.base import BaseLLM, llm_model_name, prompt_key
+
+
+class LRUTTLCache:
+    """
+    Small thread safe in-process LRU with a per entry ttl.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+
+            expires_at, value = item
+            if expires_at and expires_at < time.time():
+                del self._data[key]
+                self.expirations += 1
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds else 0.0
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCacheStore:
+    """
+    Persistent cache tier. Survives restarts and can be shared by
+    several worker processes on the same host (WAL mode + busy timeout).
+    """
+
+    def __init__(self, path: str = "data/llm_cache.sqlite", ttl_seconds: Optional[float] = 7 * 24 * 3600):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()  # sqlite connections are per thread
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        value, expires_at = row
+        if expires_at and expires_at < time.time():
+            return None
+        return json.loads(value)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        now = time.time()
+        expires_at = now + self.ttl_seconds if self.ttl_seconds else 0.0
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now, expires_at),
+        )
+        conn.commit()
+
+    def purge_expired(self) -> int:
+        conn = self._conn()
+        cur = conn.execute("DELETE FROM llm_cache WHERE expires_at > 0 AND expires_at < ?", (time.time(),))
+        conn.commit()
+        return cur.rowcount
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+
+class CachingLLM(BaseLLM):
+    """
+    wrapper that caches parsed json responses of any BaseLLM.
+
+    lookup order: in-memory LRU -> persistent store (optional) -> wrapped llm.
+    Keyed on prompt_key(normalized prompt, model name, settings).
+    Failures are never cached.
+    """
+
+    def __init__(
+        self,
+        llm: BaseLLM,
+        max_entries: int = 1024,
+        ttl_seconds: Optional[float] = 3600,
+        persistent_store: Optional[SQLiteCacheStore] = None,
+        settings: Optional[Dict[str, Any]] = None,
+    ):
+        self.llm = llm
+        self.memory = LRUTTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.persistent_store = persistent_store
+        self.settings = settings or {}
+
+        self._lock = threading.Lock()
+        self._counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        key = self.cache_key(prompt)
+
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        result = self.llm.generate_json(prompt)
+        self._store(key, result)
+        return copy.deepcopy(result)
+
+    async def agenerate_json(self, prompt: str) -> Dict[str, Any]:
+        key = self.cache_key(prompt)
+
+        # disk tier does blocking io, keep it off the event loop
+        cached = await asyncio.to_thread(self._lookup, key)
+        if cached is not None:
+            return cached
+
+        result = await self.llm.agenerate_json(prompt)
+        await asyncio.to_thread(self._store, key, result)
+        return copy.deepcopy(result)
+
+    def stream_json(self, prompt: str) -> Iterator[Tuple[str, Any]]:
+        key = self.cache_key(prompt)
+
+        cached = self._lookup(key)
+        if cached is not None:
+            yield from cached.items()
+            return
+
+        # only a stream that ran to the end is stored, never a partial object
+        result = {}
+        for field, value in self.llm.stream_json(prompt):
+            result[field] = value
+            yield field, copy.deepcopy(value)
+        self._store(key, result)
+
+    async def astream_json(self, prompt: str) -> AsyncIterator[Tuple[str, Any]]:
+        key = self.cache_key(prompt)
+
+        cached = await asyncio.to_thread(self._lookup, key)
+        if cached is not None:
+            for item in cached.items():
+                yield item
+            return
+
+        result = {}
+        async for field, value in self.llm.astream_json(prompt):
+            result[field] = value
+            yield field, copy.deepcopy(value)
+        await asyncio.to_thread(self._store, key, result)
+
+    def cache_key(self, prompt: str) -> str:
+        return prompt_key(prompt, llm_model_name(self.llm), self.settings)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+
+        lookups = counts["memory_hits"] + counts["disk_hits"] + counts["misses"]
+        hits = counts["memory_hits"] + counts["disk_hits"]
+
+        return {
+            **counts,
+            "hits": hits,
+            "lookups": lookups,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "evictions": self.memory.evictions,
+            "expirations": self.memory.expirations,
+            "memory_entries": len(self.memory),
+        }
+
+    # internal helpers
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return copy.deepcopy(value)  # callers may mutate what they get back
+
+        if self.persistent_store is not None:
+            value = self.persistent_store.get(key)
+            if value is not None:
+                self._count("disk_hits")
+                self.memory.set(key, value)  # promote to the fast tier
+                return copy.deepcopy(value)
+
+        self._count("misses")
+        return None
+
+    def _store(self, key: str, value: Dict[str, Any]) -> None:
+        self.memory.set(key, copy.deepcopy(value))
+        if self.persistent_store is not None:
+            self.persistent_store.set(key, value)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
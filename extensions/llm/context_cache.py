@@ -0,0 +1,106 @@
+import asyncio
+import hashlib
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from engine.prompts import estimate_tokens
+
+
+class ContextCache:
+    """
+    Static prompt prefix -> provider side cache handle (eg: a Gemini
+    cachedContents name), so a prefix is uploaded once per ttl instead of
+    with every request.
+
+    - `create(prefix, ttl_seconds)` uploads and returns the handle, or None
+      when the provider refuses (too small, unsupported model), a refusal
+      is remembered for a ttl so the provider isnt asked with every request
+    - an upload that fails (network, 5xx) is retried after `retry_after_s`,
+      until then the prefix is sent inline
+    - prefixes below `min_tokens` (estimated) are never uploaded, providers
+      have a minimum cacheable size
+    - handles are recreated `refresh_margin` seconds before their ttl ends
+
+    Uploads run outside the lock, so a slow one only holds up callers
+    with the same prefix (one upload per prefix, they wait for it).
+    """
+
+    def __init__(
+        self,
+        create: Callable[[str, float], Optional[str]],
+        ttl_seconds: float = 3600.0,
+        min_tokens: int = 0,
+        refresh_margin: float = 60.0,
+        retry_after_s: float = 30.0,
+    ):
+        self.create = create
+        self.ttl_seconds = ttl_seconds
+        self.min_tokens = min_tokens
+        self.refresh_margin = min(refresh_margin, ttl_seconds / 2)
+        self.retry_after_s = retry_after_s
+
+        self._handles: Dict[str, Tuple[Optional[str], float]] = {}   # prefix hash -> (handle, expires_at)
+        self._uploads: Dict[str, threading.Event] = {}                # prefix hash -> set when its upload is done
+        self._lock = threading.Lock()
+        self._counts = {"created": 0, "hits": 0, "refused": 0, "failed": 0, "too_small": 0}
+
+    def handle(self, prefix: str) -> Optional[str]:
+        if not prefix:
+            return None
+
+        key = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        while True:
+            with self._lock:
+                known = self._cached(key)
+                if known is not None:
+                    return known[0]
+
+                if estimate_tokens(prefix) < self.min_tokens:
+                    self._counts["too_small"] += 1
+                    self._handles[key] = (None, float("inf"))
+                    return None
+
+                upload = self._uploads.get(key)
+                if upload is None:
+                    upload = self._uploads[key] = threading.Event()
+                    break
+            upload.wait()  # someone else is uploading this prefix, then read what they stored
+
+        # no cache is not an error, the prefix is just sent inline until the retry
+        handle, outcome, keep_s = None, "failed", self.retry_after_s
+        try:
+            handle = self.create(prefix, self.ttl_seconds)
+            outcome, keep_s = ("created", self.ttl_seconds - self.refresh_margin) if handle else ("refused", self.ttl_seconds)
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._counts[outcome] += 1
+                self._handles[key] = (handle, time.monotonic() + keep_s)
+                self._uploads.pop(key).set()
+        return handle
+
+    async def ahandle(self, prefix: str) -> Optional[str]:
+        # hits are answered inline, an upload runs in a worker thread
+        if not prefix:
+            return None
+        key = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        with self._lock:
+            known = self._cached(key)
+        if known is not None:
+            return known[0]
+        return await asyncio.to_thread(self.handle, prefix)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._counts, "prefixes": len(self._handles)}
+
+    def _cached(self, key: str) -> Optional[Tuple[Optional[str], float]]:
+        # called with the lock held, counts a hit for live handles
+        known = self._handles.get(key)
+        if known is None or known[1] <= time.monotonic():
+            return None
+        if known[0]:
+            self._counts["hits"] += 1
+        return known
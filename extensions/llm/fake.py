@@ -0,0 +1,197 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Tuple, Union
+
+from engine.deadline import DeadlineExceeded, remaining_time
+from engine.prompts import Prompt
+from extensions.llm.base import BaseLLM, LLMServerError, LLMUsage, estimate_tokens, record_usage
+from extensions.llm.context_cache import ContextCache
+from extensions.llm.json_repair import parse_llm_json
+
+
+class FakeLLM(BaseLLM):
+    """
+    Deterministic stand-in for a provider: no network, no api key.
+    Used by benchmarks and tests to measure / exercise everything around the llm.
+
+    - latency: seconds per call, shaped by `distribution`
+        fixed     -> always `latency`
+        uniform   -> latency +- jitter
+        lognormal -> median `latency`, sigma `jitter` (long tail, like real apis)
+    - response: a dict, a fn(prompt) -> dict, or None for a generated
+      object with `response_fields` fields of `field_chars` characters
+    - failure_rate: share of calls that raise `failure` (retryable server error by default)
+    - malformed_rate: share of answers that come back as broken json text
+      (fenced, chatty, trailing commas, cut off) and go through
+      json_repair, like a real provider's would
+
+    - context_cache: local stand-in for provider side context caching, the
+      static prefix of a templated Prompt is "uploaded" once and reported
+      as cached_tokens afterwards (see ContextCache)
+
+    Same seed, same sequence of latencies / failures.
+    Usage is reported with estimated token counts, like a real provider would.
+    Under a deadline a call that would take longer waits until it and
+    raises DeadlineExceeded, like a provider request timing out.
+    """
+
+    def __init__(
+        self,
+        response: Union[Dict[str, Any], Callable[[str], Dict[str, Any]], None] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        distribution: str = "fixed",
+        response_fields: int = 3,
+        field_chars: int = 200,
+        failure_rate: float = 0.0,
+        failure: Callable[[str], Exception] = LLMServerError,
+        malformed_rate: float = 0.0,
+        seed: int = 0,
+        model: str = "fake",
+        context_cache: bool = False,
+    ):
+        if distribution not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"unknown latency distribution '{distribution}'")
+
+        self.response = response
+        self.latency = latency
+        self.jitter = jitter
+        self.distribution = distribution
+        self.response_fields = response_fields
+        self.field_chars = field_chars
+        self.failure_rate = failure_rate
+        self.failure = failure
+        self.malformed_rate = malformed_rate
+        self.model = model
+        self.context_cache = ContextCache(self._upload) if context_cache else None
+
+        self.calls = 0
+        self.failures = 0
+        self.malformed = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()   # one random sequence, whatever thread calls
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        delay, fail, malformed = self._draw()
+        if delay:
+            time.sleep(self._until_deadline(delay))
+            self._check_deadline(delay)
+        return self._respond(prompt, fail, malformed)
+
+    async def agenerate_json(self, prompt: str) -> Dict[str, Any]:
+        delay, fail, malformed = self._draw()
+        if delay:
+            await asyncio.sleep(self._until_deadline(delay))
+            self._check_deadline(delay)
+        return self._respond(prompt, fail, malformed)
+
+    def stream_json(self, prompt: str) -> Iterator[Tuple[str, Any]]:
+        # latency is spread over the fields, the first one arrives early
+        delay, fail, malformed = self._draw()
+        response = self._respond(prompt, fail, malformed)
+        step = delay / max(1, len(response))
+        for item in response.items():
+            if step:
+                time.sleep(step)
+            yield item
+
+    async def astream_json(self, prompt: str) -> AsyncIterator[Tuple[str, Any]]:
+        delay, fail, malformed = self._draw()
+        response = self._respond(prompt, fail, malformed)
+        step = delay / max(1, len(response))
+        for item in response.items():
+            if step:
+                await asyncio.sleep(step)
+            yield item
+
+    # internal helpers
+
+    def _until_deadline(self, delay: float) -> float:
+        remaining = remaining_time()
+        return delay if remaining is None else min(delay, remaining)
+
+    def _check_deadline(self, delay: float) -> None:
+        remaining = remaining_time()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded(f"[FakeLLM] call of {delay:.3f}s did not finish before the deadline")
+
+    def _draw(self) -> Tuple[float, bool, str]:
+        with self._lock:
+            self.calls += 1
+            fail = self.failure_rate > 0 and self._random.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+
+            malformed = ""
+            if self.malformed_rate > 0 and self._random.random() < self.malformed_rate:
+                malformed = self._random.choice(MALFORMED_STYLES)
+                self.malformed += 1
+
+            if self.distribution == "uniform":
+                delay = self._random.uniform(self.latency - self.jitter, self.latency + self.jitter)
+            elif self.distribution == "lognormal":
+                delay = self._random.lognormvariate(0.0, self.jitter) * self.latency
+            else:
+                delay = self.latency
+
+        return max(0.0, delay), fail, malformed
+
+    def _respond(self, prompt: str, fail: bool, malformed: str = "") -> Dict[str, Any]:
+        if fail:
+            raise self.failure("[FakeLLM] injected failure")
+
+        if callable(self.response):
+            response = self.response(prompt)
+        elif self.response is not None:
+            response = json.loads(json.dumps(self.response))  # fresh copy per call
+        else:
+            response = self._generated()
+
+        self._report(prompt, response)
+        if malformed:
+            return parse_llm_json(malformed_text(response, malformed), "FakeLLM")
+        return response
+
+    def _generated(self) -> Dict[str, Any]:
+        filler = ("lorem ipsum " * (self.field_chars // 12 + 1))[:self.field_chars]
+        return {f"field_{i}": filler for i in range(self.response_fields)}
+
+    def _report(self, prompt: str, response: Dict[str, Any]) -> None:
+        # like gemini: input tokens include the cached prefix, cached_tokens says how many of them
+        cached_tokens = 0
+        if self.context_cache is not None and isinstance(prompt, Prompt) and self.context_cache.handle(prompt.system):
+            cached_tokens = prompt.static_tokens()
+
+        input_tokens = estimate_tokens(prompt)
+        output_tokens = estimate_tokens(json.dumps(response))
+        record_usage(LLMUsage(
+            model=self.model,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=input_tokens + output_tokens,
+            cached_tokens=cached_tokens,
+        ))
+
+    def _upload(self, prefix: str, ttl_seconds: float) -> str:
+        return f"fake-cache/{len(prefix)}-{hash(prefix) & 0xffffffff:08x}"
+
+
+
+MALFORMED_STYLES = ("fenced", "chatty", "trailing_comma", "truncated")
+
+
+def malformed_text(response: Dict[str, Any], style: str) -> str:
+    """`response` as text broken the way llms break json"""
+    text = json.dumps(response, indent=2)
+    if style == "fenced":
+        return f"```json\n{text}\n```"
+    if style == "chatty":
+        return f"Sure! Here is the JSON you asked for:\n{text}\nLet me know if you need changes."
+    if style == "trailing_comma":
+        return text[:text.rfind("}")].rstrip() + ",\n}"
+    if style == "truncated":
+        return text[:max(1, int(len(text) * 0.9))]
+    raise ValueError(f"unknown malformed style '{style}'")
@@ -0,0 +1,279 @@
+import re
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from google import genai
+from google.genai import types
+from google.genai.errors import APIError
+
+from engine.config import (
+    GEMINI_API_KEY, GEMINI_MODEL, GEMINI_CONTEXT_CACHE, GEMINI_CACHE_TTL_SECONDS, GEMINI_CACHE_MIN_TOKENS,
+    LLM_INPUT_PRICE_PER_1M, LLM_OUTPUT_PRICE_PER_1M,
+)
+from engine.deadline import DeadlineExceeded, call_timeout, deadline_hit
+from engine.prompts import Prompt
+from extensions.llm.base import (
+    BaseLLM,
+    LLMUsage,
+    LLMAuthError,
+    LLMBadRequestError,
+    LLMError,
+    LLMRateLimitError,
+    LLMResponseParseError,
+    LLMServerError,
+    record_usage,
+)
+from extensions.llm.context_cache import ContextCache
+from extensions.llm.json_repair import parse_llm_json, record_json_outcome
+from extensions.llm.json_stream import IncrementalJSONParser
+
+# Gemini sometimes ignores "ONLY JSON", so we force it hard (sent as system instruction)
+JSON_INSTRUCTION = "Respond ONLY in valid JSON, nothing else. No explanation. No markdown."
+
+
+class GeminiClient(BaseLLM):
+    """
+    Gemini provider. The json instruction plus the static prefix of a
+    templated Prompt go out as system instruction, and with
+    GEMINI_CONTEXT_CACHE=on that prefix is uploaded once as cached
+    content and referenced by name afterwards.
+
+    Requests use json mode, constrained by the Prompt's response schema
+    when it has one. Answers that still come back fenced, chatty or cut
+    off are extracted / repaired locally (json_repair) before anything
+    is raised.
+
+    Under a deadline (engine.deadline) every request carries what is left
+    of it as its http timeout, and a timeout past the deadline surfaces
+    as DeadlineExceeded instead of a (retryable) LLMError.
+    """
+
+    def __init__(self, model: Optional[str] = None, context_cache: bool = GEMINI_CONTEXT_CACHE):   
+        if not GEMINI_API_KEY:
+            raise ValueError("Gemini Api Key not found in environment variables")
+        
+        self.client = genai.Client(api_key=GEMINI_API_KEY)
+        self.model = model or GEMINI_MODEL
+        self.context_cache = ContextCache(
+            self._create_cache,
+            ttl_seconds=GEMINI_CACHE_TTL_SECONDS,
+            min_tokens=GEMINI_CACHE_MIN_TOKENS,
+        ) if context_cache else None
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        return self.generate_json_with_usage(prompt)[0]
+
+    def generate_json_with_usage(self, prompt: str) -> Tuple[Dict[str, Any], Optional[LLMUsage]]:
+        
+        contents, config = self._request(prompt, self._cache_handle(prompt))
+        try:
+            response = self.client.models.generate_content(
+                model=self.model,
+                contents=contents,
+                config=config,
+            )
+        except Exception as e:
+            raise self._classify(e) from e
+
+        usage = self._usage(response)
+        return self._parse(response), usage
+
+    async def agenerate_json(self, prompt: str) -> Dict[str, Any]:
+
+        # native async client, so no thread is parked while waiting on the network
+        contents, config = self._request(prompt, await self._acache_handle(prompt))
+        try:
+            response = await self.client.aio.models.generate_content(
+                model=self.model,
+                contents=contents,
+                config=config,
+            )
+        except Exception as e:
+            raise self._classify(e) from e
+
+        self._usage(response)
+        return self._parse(response)
+
+    def stream_json(self, prompt: str) -> Iterator[Tuple[str, Any]]:
+
+        # fields are yielded as soon as they close, so the first one shows up
+        # long before generation of the whole object is done
+        contents, config = self._request(prompt, self._cache_handle(prompt))
+        try:
+            chunks = iter(self.client.models.generate_content_stream(
+                model=self.model,
+                contents=contents,
+                config=config,
+            ))
+        except Exception as e:
+            raise self._classify(e) from e
+
+        parser = IncrementalJSONParser()
+        last = None
+
+        while True:
+            try:
+                chunk = next(chunks, None)
+            except Exception as e:
+                raise self._classify(e) from e
+            if chunk is None:
+                break
+
+            last = chunk
+            yield from self._feed(parser, chunk)
+
+        yield from self._end_stream(parser, last)
+
+    async def astream_json(self, prompt: str) -> AsyncIterator[Tuple[str, Any]]:
+
+        contents, config = self._request(prompt, await self._acache_handle(prompt))
+        try:
+            chunks = await self.client.aio.models.generate_content_stream(
+                model=self.model,
+                contents=contents,
+                config=config,
+            )
+        except Exception as e:
+            raise self._classify(e) from e
+
+        parser = IncrementalJSONParser()
+        last = None
+        iterator = chunks.__aiter__()
+
+        while True:
+            try:
+                chunk = await iterator.__anext__()
+            except StopAsyncIteration:
+                break
+            except Exception as e:
+                raise self._classify(e) from e
+
+            last = chunk
+            for item in self._feed(parser, chunk):
+                yield item
+
+        for item in self._end_stream(parser, last):
+            yield item
+
+    # helpers shared by sync and async paths
+
+    def _system(self, prompt: str) -> str:
+        # the static part of the request: json instruction + a template's instructions
+        if isinstance(prompt, Prompt) and prompt.system:
+            return f"{JSON_INSTRUCTION}\n\n{prompt.system}"
+        return JSON_INSTRUCTION
+
+    def _request(self, prompt: str, cache_handle: Optional[str]) -> Tuple[str, types.GenerateContentConfig]:
+        contents = prompt.user if isinstance(prompt, Prompt) else prompt
+
+        # structured output: json mode, shaped by the agent's schema if it has one
+        output: Dict[str, Any] = {"response_mime_type": "application/json"}
+        schema = getattr(prompt, "schema", None)
+        if schema:
+            output["response_schema"] = schema
+
+        # the remaining time of the run is the most this request may take
+        timeout = call_timeout()
+        if timeout is not None:
+            output["http_options"] = types.HttpOptions(timeout=max(1, int(timeout * 1000)))
+
+        if cache_handle:
+            return contents, types.GenerateContentConfig(cached_content=cache_handle, **output)
+        return contents, types.GenerateContentConfig(system_instruction=self._system(prompt), **output)
+
+    def _cache_handle(self, prompt: str) -> Optional[str]:
+        if self.context_cache is None:
+            return None
+        return self.context_cache.handle(self._system(prompt))
+
+    async def _acache_handle(self, prompt: str) -> Optional[str]:
+        if self.context_cache is None:
+            return None
+        return await self.context_cache.ahandle(self._system(prompt))
+
+    def _create_cache(self, prefix: str, ttl_seconds: float) -> Optional[str]:
+        cache = self.client.caches.create(
+            model=self.model,
+            config=types.CreateCachedContentConfig(system_instruction=prefix, ttl=f"{int(ttl_seconds)}s"),
+        )
+        return getattr(cache, "name", None)
+
+    def _parse(self, response: Any) -> Dict[str, Any]:
+        try:
+            text = response.text
+        except Exception as e:
+            raise LLMResponseParseError(f"[Gemini invalid json]: {str(e)}") from e
+        return parse_llm_json(text, "Gemini")
+
+    def _feed(self, parser: IncrementalJSONParser, chunk: Any) -> List[Tuple[str, Any]]:
+        try:
+            return parser.feed(chunk.text or "")
+        except Exception as e:
+            raise LLMResponseParseError(f"[Gemini invalid json]: {str(e)}") from e
+
+    def _end_stream(self, parser: IncrementalJSONParser, last_chunk: Any) -> List[Tuple[str, Any]]:
+        # usage_metadata comes with the final chunk
+        if last_chunk is not None:
+            self._usage(last_chunk)
+        if parser.done:
+            record_json_outcome("clean")
+            return []
+
+        # cut off stream: the fields repair can still recover, after the ones already yielded
+        repaired = parse_llm_json(parser.text, "Gemini")
+        return [(field, value) for field, value in repaired.items() if field not in parser.fields]
+
+    def _usage(self, response: Any) -> Optional[LLMUsage]:
+        # usage is billed even if the json turns out broken, so record it before parsing
+        meta = getattr(response, "usage_metadata", None)
+        if meta is None:
+            return None
+
+        input_tokens = getattr(meta, "prompt_token_count", None) or 0
+        output_tokens = getattr(meta, "candidates_token_count", None) or 0
+        usage = LLMUsage(
+            model=self.model,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=getattr(meta, "total_token_count", None) or input_tokens + output_tokens,
+            cached_tokens=getattr(meta, "cached_content_token_count", None) or 0,
+            cost_usd=(input_tokens * LLM_INPUT_PRICE_PER_1M + output_tokens * LLM_OUTPUT_PRICE_PER_1M) / 1_000_000,
+        )
+        record_usage(usage)
+        return usage
+
+    def _classify(self, e: Exception) -> Exception:
+        """
+        map sdk errors onto our llm error types so retry logic can tell
+        a 429 / 5xx (worth retrying) from a bad key or bad request (not)
+        """
+        if deadline_hit():
+            return DeadlineExceeded(f"[Gemini] no answer before the deadline: {str(e)}")
+
+        if not isinstance(e, APIError):
+            # network level trouble (timeouts, resets), usually transient
+            return LLMError(f"[Gemini unexpected error]: {str(e)}")
+
+        code = getattr(e, "code", None) or 0
+        message = f"Gemini API error: {str(e)}"
+        retry_after = self._retry_after(e)
+
+        if code == 429:
+            return LLMRateLimitError(message, retry_after=retry_after)
+        if code in (401, 403):
+            return LLMAuthError(message)
+        if code >= 500:
+            return LLMServerError(message, retry_after=retry_after)
+        if code == 408:
+            return LLMError(message, retry_after=retry_after)
+        return LLMBadRequestError(message)
+
+    def _retry_after(self, e: Exception) -> Optional[float]:
+        # google.rpc.RetryInfo arrives as {"@type": "...RetryInfo", "retryDelay": "12s"}
+        details = getattr(e, "details", None)
+        error = details.get("error", details) if isinstance(details, dict) else {}
+        for item in error.get("details", []) if isinstance(error, dict) else []:
+            if isinstance(item, dict) and str(item.get("@type", "")).endswith("RetryInfo"):
+                match = re.match(r"([\d.]+)s", str(item.get("retryDelay", "")))
+                if match:
+                    return float(match.group(1))
+        return None
@@ -0,0 +1,195 @@
+import asyncio
+import contextvars
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, Optional, Tuple
+
+from engine.run_scope import scope_incr, scope_set
+from extensions.llm.base import BaseLLM
+
+
+class HedgedLLM(BaseLLM):
+    """
+    wrapper that cuts tail latency by hedging slow calls.
+
+    If a call has not answered after the hedge delay, an identical second
+    request is sent and whichever answers first (successfully) wins.
+    The loser is cancelled when possible (async) or ignored (sync, it
+    finishes on its worker thread and its usage still counts).
+
+    - hedge delay = `percentile` of recent call latencies (rolling window
+      of `window` calls), `initial_delay` until `min_samples` are known,
+      never below `min_delay`
+    - at most `max_hedge_rate` of recent calls get a hedge, so the extra
+      cost stays bounded
+    - streams are passed through unhedged
+
+    Per run, hedges and wins show up in AgentrunRecord.extra["hedge"],
+    stats() has the process wide counts and the current delay.
+    """
+
+    def __init__(
+        self,
+        llm: BaseLLM,
+        percentile: float = 0.95,
+        window: int = 200,
+        min_samples: int = 20,
+        initial_delay: float = 5.0,
+        min_delay: float = 0.05,
+        max_hedge_rate: float = 0.1,
+        max_workers: int = 32,
+    ):
+        if not 0 < percentile < 1:
+            raise ValueError("percentile must be between 0 and 1")
+
+        self.llm = llm
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_hedge_rate = max_hedge_rate
+        self.max_workers = max_workers
+
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._recent_hedges: Deque[bool] = deque(maxlen=window)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._counts = {"calls": 0, "hedged": 0, "hedge_wins": 0, "primary_wins": 0, "suppressed": 0}
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        delay = self.hedge_delay()
+        primary = self._submit(prompt)
+
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            self._note_fast_call()
+            return primary.result()
+        if not self._allow_hedge(delay):
+            return primary.result()
+
+        hedge = self._submit(prompt)
+        return self._first_success({primary: "primary", hedge: "hedge"})
+
+    async def agenerate_json(self, prompt: str) -> Dict[str, Any]:
+        delay = self.hedge_delay()
+        primary = asyncio.ensure_future(self._atimed(prompt))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                self._note_fast_call()
+                return await primary
+            if not self._allow_hedge(delay):
+                return await primary
+
+            hedge = asyncio.ensure_future(self._atimed(prompt))
+            tasks.append(hedge)
+            return await self._afirst_success({primary: "primary", hedge: "hedge"})
+        finally:
+            for task in tasks:
+                task.cancel()  # the loser (or everything, if our caller was cancelled)
+
+    def stream_json(self, prompt: str) -> Iterator[Tuple[str, Any]]:
+        yield from self.llm.stream_json(prompt)
+
+    async def astream_json(self, prompt: str) -> AsyncIterator[Tuple[str, Any]]:
+        async for item in self.llm.astream_json(prompt):
+            yield item
+
+    def hedge_delay(self) -> float:
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return max(self.min_delay, self.initial_delay)
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, math.ceil(self.percentile * len(ordered)) - 1)
+        return max(self.min_delay, ordered[index])
+
+    def stats(self) -> Dict[str, Any]:
+        delay = self.hedge_delay()
+        with self._lock:
+            counts = dict(self._counts)
+        counts["hedge_rate"] = counts["hedged"] / counts["calls"] if counts["calls"] else 0.0
+        counts["delay_s"] = delay
+        return counts
+
+    # internal helpers
+
+    def _allow_hedge(self, delay: float) -> bool:
+        """called once per slow call, decides (and counts) whether it gets a hedge"""
+        with self._lock:
+            self._counts["calls"] += 1
+            recent = sum(self._recent_hedges)
+            allowed = recent + 1 <= self.max_hedge_rate * max(len(self._recent_hedges) + 1, self.min_samples)
+            self._recent_hedges.append(allowed)
+            self._counts["hedged" if allowed else "suppressed"] += 1
+
+        if allowed:
+            scope_incr("hedge", "hedged")
+            scope_set("hedge", "delay_s", delay)
+        return allowed
+
+    def _note_fast_call(self) -> None:
+        with self._lock:
+            self._counts["calls"] += 1
+            self._recent_hedges.append(False)
+
+    def _record_win(self, name: str) -> None:
+        with self._lock:
+            self._counts[f"{name}_wins"] += 1
+        if name == "hedge":
+            scope_incr("hedge", "hedge_wins")
+
+    def _observe(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def _submit(self, prompt: str) -> Future:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="zap-hedge")
+            pool = self._pool
+
+        # each call runs in a copy of the caller's context, so usage / budget / run scope still apply
+        context = contextvars.copy_context()
+        return pool.submit(context.run, self._timed, prompt)
+
+    def _timed(self, prompt: str) -> Dict[str, Any]:
+        started = time.monotonic()
+        result = self.llm.generate_json(prompt)
+        self._observe(time.monotonic() - started)
+        return result
+
+    async def _atimed(self, prompt: str) -> Dict[str, Any]:
+        started = time.monotonic()
+        result = await self.llm.agenerate_json(prompt)
+        self._observe(time.monotonic() - started)
+        return result
+
+    def _first_success(self, pending: Dict[Future, str]) -> Dict[str, Any]:
+        errors: Dict[str, BaseException] = {}
+        while pending:
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()  # only helps if it has not started yet
+                    self._record_win(name)
+                    return future.result()
+                errors[name] = future.exception()
+        raise errors.get("primary") or errors["hedge"]
+
+    async def _afirst_success(self, pending: Dict[asyncio.Future, str]) -> Dict[str, Any]:
+        errors: Dict[str, BaseException] = {}
+        while pending:
+            done, _ = await asyncio.wait(list(pending), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = pending.pop(task)
+                if task.exception() is None:
+                    self._record_win(name)
+                    return task.result()
+                errors[name] = task.exception()
+        raise errors.get("primary") or errors["hedge"]
@@ -0,0 +1,180 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+from engine.deadline import DeadlineExceeded, call_timeout, deadline_hit
+from engine.run_scope import open_scope
+from extensions.llm.base import (
+    BaseLLM,
+    LLMAuthError,
+    LLMBadRequestError,
+    LLMError,
+    LLMRateLimitError,
+    LLMResponseParseError,
+    LLMServerError,
+    LLMUsage,
+    record_usage,
+)
+from extensions.llm.json_repair import parse_llm_json
+
+
+class HTTPLLM(BaseLLM):
+    """
+    Provider for any backend speaking a minimal json-over-http protocol:
+
+        POST <url>  {"model": "...", "prompt": "...", "schema": {...}}
+        200         {"output": {...}, "usage": {"input_tokens": 12, "output_tokens": 40}}
+        4xx / 5xx   {"error": "..."}   (+ Retry-After header on 429 / 503)
+
+    "schema" (the Prompt's response schema) is only sent when there is
+    one. An "output" that comes back as raw model text is extracted /
+    repaired like any other llm answer (json_repair).
+
+    Under a deadline (engine.deadline) the request timeout is what is
+    left of it, capped by `timeout`.
+
+    Handy for self-hosted models behind a thin gateway, and with
+    serve_llm() for exercising routing / failover offline.
+    """
+
+    def __init__(self, url: str, model: str = "", timeout: float = 60.0, headers: Optional[Dict[str, str]] = None):
+        if not url:
+            raise ValueError("HTTPLLM needs a url (LLM_HTTP_URL)")
+
+        self.url = url
+        self.model = model or url
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        return self.generate_json_with_usage(prompt)[0]
+
+    def generate_json_with_usage(self, prompt: str) -> Tuple[Dict[str, Any], Optional[LLMUsage]]:
+        request_body = {"model": self.model, "prompt": prompt}
+        if getattr(prompt, "schema", None):
+            request_body["schema"] = prompt.schema
+        body = json.dumps(request_body).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, headers=self.headers, method="POST")
+
+        try:
+            with urllib.request.urlopen(request, timeout=call_timeout(self.timeout)) as response:
+                raw = response.read()
+        except urllib.error.HTTPError as e:
+            raise self._classify(e) from e
+        except Exception as e:
+            if deadline_hit():
+                raise DeadlineExceeded(f"[HTTP] {self.url} did not answer before the deadline: {str(e)}") from e
+            # connection refused, reset, timeout: usually transient
+            raise LLMError(f"[HTTP unexpected error]: {str(e)}") from e
+
+        try:
+            data = json.loads(raw)
+            output = data["output"]
+        except Exception as e:
+            raise LLMResponseParseError(f"[HTTP invalid json]: {str(e)}") from e
+
+        usage = self._usage(data.get("usage"))
+        if isinstance(output, str):
+            output = parse_llm_json(output, "HTTP")
+        return output, usage
+
+    # helpers
+
+    def _usage(self, raw: Any) -> Optional[LLMUsage]:
+        if not isinstance(raw, dict):
+            return None
+
+        input_tokens = int(raw.get("input_tokens", 0))
+        output_tokens = int(raw.get("output_tokens", 0))
+        usage = LLMUsage(
+            model=self.model,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=int(raw.get("total_tokens", input_tokens + output_tokens)),
+            cost_usd=float(raw.get("cost_usd", 0.0)),
+        )
+        record_usage(usage)
+        return usage
+
+    def _classify(self, e: urllib.error.HTTPError) -> LLMError:
+        try:
+            detail = json.loads(e.read()).get("error", "")
+        except Exception:
+            detail = ""
+        message = f"HTTP {e.code} from {self.url}: {detail or e.reason}"
+
+        retry_after = None
+        header = e.headers.get("Retry-After") if e.headers else None
+        if header:
+            try:
+                retry_after = float(header)
+            except ValueError:
+                pass
+
+        if e.code == 429:
+            return LLMRateLimitError(message, retry_after=retry_after)
+        if e.code in (401, 403):
+            return LLMAuthError(message)
+        if e.code >= 500:
+            return LLMServerError(message, retry_after=retry_after)
+        if e.code == 408:
+            return LLMError(message, retry_after=retry_after)
+        return LLMBadRequestError(message)
+
+
+# status codes serve_llm answers with, most specific first
+_ERROR_STATUS = (
+    (LLMRateLimitError, 429),
+    (LLMAuthError, 401),
+    (LLMBadRequestError, 400),
+    (LLMResponseParseError, 502),
+)
+
+
+def serve_llm(llm: BaseLLM, port: int = 8765, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Expose any BaseLLM (typically a FakeLLM) over the HTTPLLM protocol on a
+    daemon thread (port=0 picks a free one), a local stand-in for a remote
+    provider. Call .shutdown() on the returned server to stop it.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                prompt = request["prompt"]
+            except Exception as e:
+                self._send(400, {"error": f"bad request: {e}"})
+                return
+
+            # the wrapped llm reports usage into this scope, it goes back in the response
+            with open_scope() as scope:
+                try:
+                    output = llm.generate_json(prompt)
+                except Exception as e:
+                    status = next((code for kind, code in _ERROR_STATUS if isinstance(e, kind)), 500)
+                    retry_after = getattr(e, "retry_after", None)
+                    self._send(status, {"error": str(e)}, retry_after)
+                    return
+
+            self._send(200, {"output": output, "usage": scope.extra.get("usage")})
+
+        def _send(self, status: int, payload: Dict[str, Any], retry_after: Optional[float] = None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if retry_after is not None:
+                self.send_header("Retry-After", str(retry_after))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # no per request noise on stderr
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="zap-llm-server", daemon=True).start()
+    return server
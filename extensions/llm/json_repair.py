@@ -0,0 +1,202 @@
+import json
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from engine.run_scope import scope_incr
+from extensions.llm.base import LLMResponseParseError
+
+_FENCE = re.compile(r"```[a-zA-Z]*\s*\n?(.*?)(?:```|$)", re.DOTALL)
+_SMART_QUOTES = "“”"
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+OUTCOMES = ("clean", "extracted", "repaired", "failed")
+
+_lock = threading.Lock()
+_counts = {outcome: 0 for outcome in OUTCOMES}
+
+
+def parse_llm_json(text: str, source: str = "LLM") -> Dict[str, Any]:
+    """
+    The json object in an llm answer, without paying for another call
+    when the answer is almost right:
+
+      clean      the text is the object
+      extracted  the object sits in a ```json fence or between prose
+      repaired   cheap local fixes made it parse: trailing commas, smart
+                 quotes, python literals, raw newlines in strings, and a
+                 truncated tail (open strings / brackets are closed)
+
+    Anything else raises LLMResponseParseError (retryable, a fresh sample
+    usually parses). The outcome is counted per run in
+    AgentrunRecord.extra["json"] and process wide in json_parse_stats().
+    """
+    text = (text or "").strip()
+
+    result = _loads(text)
+    if result is not None:
+        return record_json_outcome("clean", result)
+
+    candidate = _candidate(text)
+    if candidate is not None:
+        result = _loads(candidate)
+        if result is not None:
+            return record_json_outcome("extracted", result)
+
+        result = _loads(repair_json(candidate))
+        if result is not None:
+            return record_json_outcome("repaired", result)
+
+    record_json_outcome("failed")
+    snippet = text[:120] + ("..." if len(text) > 120 else "")
+    raise LLMResponseParseError(f"[{source} invalid json]: no json object in {snippet!r}")
+
+
+def repair_json(text: str) -> str:
+    """
+    Targeted fixes for the ways llms break json, in one pass that knows
+    whether it is inside a string (so string contents are left alone,
+    apart from escaping raw newlines).
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    cuts: List[Tuple[int, Tuple[str, ...]]] = []   # (len(out), open brackets) at each comma, for truncated answers
+    in_string = escape = smart = False
+    i = 0
+
+    while i < len(text):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif (ch == '"' and not smart) or (smart and ch in _SMART_QUOTES):
+                ch = '"'
+                in_string = False
+            elif ch == '"':
+                ch = '\\"'   # a plain quote inside a smart quoted string
+            elif ch == "\n":
+                ch = "\\n"
+            out.append(ch)
+            i += 1
+            continue
+
+        if ch == '"' or ch in _SMART_QUOTES:
+            smart = ch != '"'
+            ch = '"'
+            in_string = True
+        elif ch == ",":
+            cuts.append((len(out), tuple(stack)))
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            _drop_trailing_comma(out)
+            if stack:
+                stack.pop()
+            out.append(ch)
+            if not stack:
+                break   # the object is complete, whatever follows is prose
+            i += 1
+            continue
+        elif ch.isalpha():
+            word = re.match(r"[A-Za-z]+", text[i:]).group(0)
+            out.append(_LITERALS.get(word, word))
+            i += len(word)
+            continue
+        out.append(ch)
+        i += 1
+
+    if not stack:
+        return "".join(out)
+
+    # truncated answer: close what is still open, or else drop the
+    # unfinished last member (cut at the latest commas) and close that
+    closed = ("".join(out) + ('"' if in_string else "")).rstrip().rstrip(",")
+    attempts = [] if closed.endswith(":") else [closed + "".join(reversed(stack))]
+    for length, open_brackets in reversed(cuts[-3:]):
+        attempts.append("".join(out[:length]) + "".join(reversed(open_brackets)))
+
+    for attempt in attempts:
+        if _loads(attempt) is not None:
+            return attempt
+    return "".join(out)
+
+
+def record_json_outcome(outcome: str, result: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """count one parsed answer (providers that parse on their own, eg: streams, report "clean")"""
+    with _lock:
+        _counts[outcome] += 1
+    scope_incr("json", outcome)
+    return result
+
+
+def json_parse_stats() -> Dict[str, float]:
+    """process wide outcome counts, with the share of answers that needed help / failed"""
+    with _lock:
+        counts: Dict[str, float] = dict(_counts)
+    total = sum(counts.values())
+    counts["total"] = total
+    counts["recovered_rate"] = (counts["extracted"] + counts["repaired"]) / total if total else 0.0
+    counts["failure_rate"] = counts["failed"] / total if total else 0.0
+    return counts
+
+
+def reset_json_parse_stats() -> None:
+    with _lock:
+        for outcome in OUTCOMES:
+            _counts[outcome] = 0
+
+
+# internal helpers
+
+def _loads(text: str) -> Optional[Dict[str, Any]]:
+    try:
+        result = json.loads(text)
+    except ValueError:
+        return None
+    return result if isinstance(result, dict) else None
+
+
+def _candidate(text: str) -> Optional[str]:
+    # fenced block first, else from the first "{" on
+    match = _FENCE.search(text)
+    if match and "{" in match.group(1):
+        text = match.group(1)
+    start = text.find("{")
+    if start < 0:
+        return None
+    end = _object_end(text, start)
+    return text[start:end] if end else text[start:]
+
+
+def _object_end(text: str, start: int) -> Optional[int]:
+    # index after the brace closing text[start], None if it never closes
+    depth = 0
+    in_string = escape = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return None
+
+
+def _drop_trailing_comma(out: List[str]) -> None:
+    j = len(out) - 1
+    while j >= 0 and out[j].isspace():
+        j -= 1
+    if j >= 0 and out[j] == ",":
+        del out[j]
@@ -0,0 +1,120 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class IncrementalJSONParser:
+    """
+    Parses a json object that arrives in chunks (streamed llm output).
+
+    feed() returns the top level fields that completed with this chunk,
+    eg: feed('{"headline": "Hi", "intro') -> [("headline", "Hi")].
+    Only the top level object is tracked, nested values are handed to
+    json.loads once their closing bracket arrives.
+
+    Anything before the first "{" (eg: a stray ```json fence) is skipped.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect = "key"            # key -> colon -> value -> comma -> key ...
+        self._token_start: Optional[int] = None
+        self._key: Optional[str] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self.text += chunk
+        completed: List[Tuple[str, Any]] = []
+
+        while self._pos < len(self.text) and not self.done:
+            self._step(self.text[self._pos], completed)
+            self._pos += 1
+
+        return completed
+
+    def result(self) -> Dict[str, Any]:
+        """the full object, raises ValueError if the stream ended early"""
+        if not self.done:
+            raise ValueError(f"incomplete json object ({len(self.fields)} fields parsed)")
+        return dict(self.fields)
+
+    # internal helpers
+
+    def _step(self, ch: str, completed: List[Tuple[str, Any]]) -> None:
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                if self._depth == 1:
+                    self._close_token(self._pos + 1, completed)
+            return
+
+        if self._depth == 0:
+            if ch == "{":
+                self._depth = 1
+            return
+
+        if ch == '"':
+            self._in_string = True
+            if self._depth == 1:
+                self._token_start = self._pos
+            return
+
+        if ch in "{[":
+            if self._depth == 1:
+                self._token_start = self._pos
+            self._depth += 1
+            return
+
+        if ch in "}]":
+            self._depth -= 1
+            if self._depth == 1:
+                self._close_token(self._pos + 1, completed)
+            elif self._depth == 0:
+                self._close_scalar(completed)
+                self.done = True
+            return
+
+        if self._depth > 1:
+            return
+
+        if ch == ":":
+            self._expect = "value"
+            self._token_start = None
+        elif ch == ",":
+            self._close_scalar(completed)
+            self._expect = "key"
+            self._token_start = None
+        elif not ch.isspace() and self._expect == "value" and self._token_start is None:
+            self._token_start = self._pos  # number / true / false / null
+
+    def _close_token(self, end: int, completed: List[Tuple[str, Any]]) -> None:
+        # a string or bracketed value (or a key) just closed at the top level
+        raw = self.text[self._token_start:end]
+        self._token_start = None
+
+        if self._expect == "key":
+            self._key = json.loads(raw)
+            self._expect = "colon"
+        elif self._expect == "value":
+            self._emit(raw, completed)
+
+    def _close_scalar(self, completed: List[Tuple[str, Any]]) -> None:
+        # scalars have no closing char, they end at the next "," or "}"
+        if self._expect == "value" and self._token_start is not None:
+            self._emit(self.text[self._token_start:self._pos].strip(), completed)
+            self._token_start = None
+
+    def _emit(self, raw: str, completed: List[Tuple[str, Any]]) -> None:
+        value = json.loads(raw)
+        self.fields[self._key] = value
+        completed.append((self._key, value))
+        self._expect = "comma"
@@ -0,0 +1,58 @@
+from typing import Callable, List, Optional, Tuple, Union
+
+from engine.registry import LazyRegistry
+from extensions.llm.base import BaseLLM
+
+# provider name -> fn(model or None) -> BaseLLM, or "package.module:fn" imported on first use
+ProviderFactory = Callable[[Optional[str]], BaseLLM]
+
+PROVIDERS = LazyRegistry("LLM provider")
+
+
+def register_provider(name: str, factory: Union[str, ProviderFactory]) -> None:
+    """make a provider available to create_provider / LLM_PROVIDER under `name`"""
+    PROVIDERS.register(name, factory)
+
+
+def provider_names() -> List[str]:
+    return PROVIDERS.names()
+
+
+def parse_provider_specs(value: str) -> List[Tuple[str, Optional[str]]]:
+    """
+    "gemini"                                   -> [("gemini", None)]
+    "gemini,gemini:gemini-2.5-flash,http"      -> one (provider, model) per backend
+    """
+    specs = []
+    for item in value.split(","):
+        name, _, model = item.strip().partition(":")
+        if name:
+            specs.append((name, model or None))
+    return specs
+
+
+def create_provider(name: str, model: Optional[str] = None) -> BaseLLM:
+    return PROVIDERS.get(name)(model)
+
+
+# built in providers, sdks are imported when a provider is first created
+
+def _gemini(model: Optional[str]) -> BaseLLM:
+    from extensions.llm.gemini import GeminiClient
+    return GeminiClient(model=model)
+
+
+def _http(model: Optional[str]) -> BaseLLM:
+    from engine.config import LLM_HTTP_URL
+    from extensions.llm.http_provider import HTTPLLM
+    return HTTPLLM(LLM_HTTP_URL, model=model or "")
+
+
+def _fake(model: Optional[str]) -> BaseLLM:
+    from extensions.llm.fake import FakeLLM
+    return FakeLLM(model=model or "fake")
+
+
+register_provider("gemini", _gemini)
+register_provider("http", _http)
+register_provider("fake", _fake)
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+from engine.deadline import DeadlineExceeded, call_timeout
+from engine.run_scope import scope_incr
+from extensions.llm.base import BaseLLM, estimate_tokens
+
+try:
+    import fcntl  # posix only, used for the shared state file
+except ImportError:  # pragma: no cover - windows
+    fcntl = None
+
+
+class _LocalState:
+    """bucket state for a single process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[str, float] = {}
+
+    def update(self, fn):
+        with self._lock:
+            return fn(self._values)
+
+
+class FileRateState:
+    """
+    bucket state in a small json file guarded by flock, so every worker
+    process on the host draws from the same buckets
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def update(self, fn):
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+
+                raw = b""
+                while True:
+                    chunk = os.read(fd, 4096)
+                    if not chunk:
+                        break
+                    raw += chunk
+                values = json.loads(raw) if raw.strip() else {}
+
+                result = fn(values)
+
+                data = json.dumps(values).encode("utf-8")
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, data)
+                return result
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+
+
+class RateLimiter:
+    """
+    Token bucket pacing for requests/min and (estimated) tokens/min.
+
+    Implemented as GCRA: every caller reserves its slot under one lock,
+    in arrival order, and then waits for it. Nobody can be overtaken
+    once they have a slot, which gives fair FIFO queueing for free, and
+    the same reservation works for blocking and async waiters.
+
+    Under a deadline (engine.deadline) a wait that would not end before
+    it is not reserved at all: acquire raises DeadlineExceeded at once
+    instead of sleeping into the deadline and failing there.
+    """
+
+    def __init__(
+        self,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        burst_requests: Optional[float] = None,
+        burst_tokens: Optional[float] = None,
+        shared_state_path: Optional[str] = None,
+        name: str = "llm",
+    ):
+        self.buckets: Dict[str, tuple] = {}
+        if rpm:
+            self.buckets[f"{name}.requests"] = (60.0 / rpm, burst_requests or max(1.0, rpm / 60.0))
+        if tpm:
+            self.buckets[f"{name}.tokens"] = (60.0 / tpm, burst_tokens or max(1.0, tpm / 60.0))
+
+        self.state = FileRateState(shared_state_path) if shared_state_path else _LocalState()
+
+    def reserve(self, tokens: float = 0.0, max_wait: Optional[float] = None) -> float:
+        """
+        reserve capacity for one request of ~`tokens` tokens,
+        returns how long the caller must wait before sending it.
+        a wait of max_wait or more is returned without reserving anything
+        """
+        if not self.buckets:
+            return 0.0
+
+        costs = {}
+        for key in self.buckets:
+            costs[key] = 1.0 if key.endswith(".requests") else max(1.0, tokens)
+
+        def take(values: Dict[str, float]) -> float:
+            now = time.time()   # wall clock, comparable across processes
+            wait_s = 0.0
+            new_tats = {}
+            for key, (interval, burst) in self.buckets.items():
+                tat = max(values.get(key, now), now)
+                new_tats[key] = tat + costs[key] * interval
+                allowed_at = new_tats[key] - burst * interval
+                wait_s = max(wait_s, allowed_at - now)
+
+            wait_s = max(0.0, wait_s)
+            if max_wait is None or wait_s < max_wait:
+                values.update(new_tats)
+            return wait_s
+
+        return self.state.update(take)
+
+    def acquire(self, tokens: float = 0.0) -> float:
+        wait_s = self._reserve_in_time(tokens)
+        if wait_s > 0:
+            time.sleep(wait_s)
+        return wait_s
+
+    async def aacquire(self, tokens: float = 0.0) -> float:
+        wait_s = self._reserve_in_time(tokens)
+        if wait_s > 0:
+            await asyncio.sleep(wait_s)
+        return wait_s
+
+    def _reserve_in_time(self, tokens: float) -> float:
+        # the remaining time caps the wait, raises DeadlineExceeded when none is left
+        timeout = call_timeout()
+        wait_s = self.reserve(tokens, max_wait=timeout)
+        if timeout is not None and wait_s >= timeout:
+            scope_incr("rate_limit", "deadline")
+            raise DeadlineExceeded(f"rate limit wait of {wait_s:.3f}s would overrun the deadline ({timeout:.3f}s left)")
+        return wait_s
+
+
+class RateLimitedLLM(BaseLLM):
+    """
+    wrapper that paces calls to any BaseLLM through a RateLimiter.
+
+    Share one limiter between every wrapper that hits the same quota
+    (and pass shared_state_path to share it across processes).
+    Token cost = estimated prompt tokens + expected_output_tokens.
+    """
+
+    def __init__(self, llm: BaseLLM, limiter: RateLimiter, expected_output_tokens: int = 500):
+        self.llm = llm
+        self.limiter = limiter
+        self.expected_output_tokens = expected_output_tokens
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        self._record(self.limiter.acquire(self._cost(prompt)))
+        return self.llm.generate_json(prompt)
+
+    async def agenerate_json(self, prompt: str) -> Dict[str, Any]:
+        self._record(await self.limiter.aacquire(self._cost(prompt)))
+        return await self.llm.agenerate_json(prompt)
+
+    def stream_json(self, prompt: str) -> Iterator[Tuple[str, Any]]:
+        self._record(self.limiter.acquire(self._cost(prompt)))
+        yield from self.llm.stream_json(prompt)
+
+    async def astream_json(self, prompt: str) -> AsyncIterator[Tuple[str, Any]]:
+        self._record(await self.limiter.aacquire(self._cost(prompt)))
+        async for item in self.llm.astream_json(prompt):
+            yield item
+
+    def _cost(self, prompt: str) -> int:
+        return estimate_tokens(prompt) + self.expected_output_tokens
+
+    def _record(self, wait_s: float) -> None:
+        scope_incr("rate_limit", "calls")
+        if wait_s > 0:
+            scope_incr("rate_limit", "throttled")
+            scope_incr("rate_limit", "wait_s", wait_s)
@@ -0,0 +1,197 @@
+import json
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, List, Optional
+
+from engine.deadline import DeadlineExceeded
+from engine.guardrails import GuardrailViolation
+from extensions.llm.base import LLMError, LLMResponseParseError
+
+
+# error classification
+
+NON_RETRYABLE = (GuardrailViolation, DeadlineExceeded, ValueError, TypeError, KeyError, json.JSONDecodeError)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """
+    LLMError subclasses say it themselves. Programming / contract errors
+    are permanent, anything else unknown (network blips etc) is worth a retry.
+    """
+    if isinstance(exc, LLMError):
+        return exc.retryable
+    if isinstance(exc, NON_RETRYABLE):
+        return False
+    return isinstance(exc, Exception)
+
+
+# backoff
+
+class BackoffPolicy:
+    """
+    Exponential backoff with optional full jitter:
+        delay = random(0, min(max_delay, base * multiplier ** attempt))
+
+    A provider retry-after hint wins over the computed delay, but is
+    capped at max_delay too (a "Retry-After: 3600" must not park a worker
+    for an hour, a deadline cuts the retry off anyway).
+    """
+
+    def __init__(
+        self,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        multiplier: float = 2.0,
+        jitter: bool = True,
+    ):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """attempt is 0 based (0 = delay before the first retry)"""
+        if retry_after is not None:
+            return min(self.max_delay, max(0.0, retry_after))
+
+        ceiling = min(self.max_delay, self.base_delay * (self.multiplier ** attempt))
+        return random.uniform(0, ceiling) if self.jitter else ceiling
+
+    @classmethod
+    def fixed(cls, delay_seconds: float) -> "BackoffPolicy":
+        # the old RetryLLM behaviour
+        return cls(base_delay=delay_seconds, max_delay=delay_seconds, multiplier=1.0, jitter=False)
+
+
+# retry budget
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of recent requests (per process), so a
+    degraded provider doesnt get hit with a retry storm.
+
+    retries allowed in the window = max(min_retries, ratio * requests)
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10, window_s: float = 10.0):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window_s = window_s
+
+        self._requests: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._requests.append(time.monotonic())
+
+    def try_acquire_retry(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+
+            allowed = max(self.min_retries, self.ratio * len(self._requests))
+            if len(self._retries) >= allowed:
+                return False
+
+            self._retries.append(now)
+            return True
+
+    def _trim(self, now: float) -> None:
+        for bucket in (self._requests, self._retries):
+            while bucket and now - bucket[0] > self.window_s:
+                bucket.popleft()
+
+
+# circuit breaker
+
+class CircuitOpenError(LLMError):
+    retryable = False
+
+
+class CircuitBreaker:
+    """
+    closed    -> calls go through, consecutive retryable failures are counted
+    open      -> calls fail fast with CircuitOpenError for recovery_timeout_s
+    half_open -> a few probe calls go through, success closes, failure reopens
+
+    Only retryable failures count: a bad prompt is not provider ill health,
+    and neither is an answer that didnt parse.
+
+    A probe that ends without a verdict (cancelled, eg: by a step deadline)
+    must hand its slot back with release_probe(), else the breaker stays
+    half open with no probe left to close it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout_s: float = 30.0, half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout_s = recovery_timeout_s
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+
+        # fn(old_state, new_state) called on every transition
+        self.listeners: List[Callable[[str, str], None]] = []
+
+    def before_call(self) -> bool:
+        """raises CircuitOpenError to fail fast, returns True when the call is a half open probe"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_timeout_s:
+                    raise CircuitOpenError("LLM circuit is open, failing fast")
+                self._transition(self.HALF_OPEN)
+
+            if self.state == self.HALF_OPEN:
+                if self._half_open_calls >= self.half_open_max_calls:
+                    raise CircuitOpenError("LLM circuit is half open, probe already in flight")
+                self._half_open_calls += 1
+                return True
+            return False
+
+    def release_probe(self) -> None:
+        """give a half open probe slot back without judging the provider"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._half_open_calls = max(0, self._half_open_calls - 1)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            if self.state != self.CLOSED:
+                self._transition(self.CLOSED)
+
+    def record_failure(self, exc: BaseException) -> None:
+        if not is_retryable(exc) or isinstance(exc, LLMResponseParseError):
+            self.release_probe()
+            return
+
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._transition(self.OPEN)
+
+    def _transition(self, new_state: str) -> None:
+        # called with the lock held
+        old_state = self.state
+        self.state = new_state
+        self._half_open_calls = 0
+        if new_state == self.CLOSED:
+            self._failures = 0
+
+        for listener in self.listeners:
+            try:
+                listener(old_state, new_state)
+            except Exception:
+                pass  # observers must not break the breaker
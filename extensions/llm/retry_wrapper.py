@@ -0,0 +1,225 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+from engine.deadline import DeadlineExceeded, check_deadline, remaining_time
+from engine.run_scope import scope_append, scope_incr
+from extensions.llm.base import BaseLLM
+from extensions.llm.retry_policy import (
+    BackoffPolicy,
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryBudget,
+    is_retryable,
+)
+
+
+class RetryLLM(BaseLLM):
+    """
+    wrapper that adds retry behavior
+    to any LLM implementation following BaseLLM.
+
+    - only retryable errors are retried (see retry_policy.is_retryable)
+    - delays come from a BackoffPolicy (fixed delay_seconds if none given)
+    - an optional RetryBudget caps retries per process
+    - an optional CircuitBreaker fails fast while the provider is unhealthy
+
+    attempts, retries and breaker transitions are written to the
+    current run scope, so they show up in AgentrunRecord.extra["retry"].
+
+    streams are retried only until their first field was yielded,
+    after that the caller already has part of the answer.
+
+    a call that is cancelled (or a stream that is closed) mid attempt says
+    nothing about the provider: a half open probe slot it held is handed
+    back to the breaker, nothing is recorded.
+
+    under a deadline (engine.deadline) no attempt starts once it has
+    passed, and a retry whose delay alone would overrun it is not made:
+    DeadlineExceeded is raised instead (chained to the last error).
+    """
+
+    def __init__(
+        self,
+        llm: BaseLLM,
+        max_attempts: int = 2,
+        delay_seconds: float = 1,
+        policy: Optional[BackoffPolicy] = None,
+        budget: Optional[RetryBudget] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.llm = llm
+        self.max_attempts = max_attempts
+        self.delay_seconds = delay_seconds
+        self.policy = policy or BackoffPolicy.fixed(delay_seconds)
+        self.budget = budget
+        self.breaker = breaker
+
+        # one listener per breaker, however many wrappers share it (the factory's is process wide)
+        if self.breaker is not None and _record_transition not in self.breaker.listeners:
+            self.breaker.listeners.append(_record_transition)
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+
+        attempt = 0
+
+        while True:
+            probe = False
+            try:
+                probe = self._before_call()
+                return self._after_success(self.llm.generate_json(prompt))
+
+            except Exception as e:
+                delay = self._after_failure(e, attempt)
+                if delay is None:
+                    raise  # re raise, not worth (or not allowed) another try
+
+                attempt += 1
+                time.sleep(delay)
+
+            except BaseException:
+                self._release_probe(probe)
+                raise
+
+    async def agenerate_json(self, prompt: str) -> Dict[str, Any]:
+
+        attempt = 0
+
+        while True:
+            probe = False
+            try:
+                probe = self._before_call()
+                return self._after_success(await self.llm.agenerate_json(prompt))
+
+            except Exception as e:
+                delay = self._after_failure(e, attempt)
+                if delay is None:
+                    raise
+
+                attempt += 1
+                await asyncio.sleep(delay)  # dont block the event loop while waiting
+
+            except BaseException:
+                self._release_probe(probe)  # eg: CancelledError from a step deadline
+                raise
+
+    def stream_json(self, prompt: str) -> Iterator[Tuple[str, Any]]:
+
+        attempt = 0
+
+        while True:
+            started = probe = False
+            try:
+                probe = self._before_call()
+                for item in self.llm.stream_json(prompt):
+                    started = True
+                    yield item
+                self._after_success(None)
+                return
+
+            except Exception as e:
+                delay = self._after_failure(e, attempt, resumable=not started)
+                if delay is None:
+                    raise
+
+                attempt += 1
+                time.sleep(delay)
+
+            except BaseException:
+                self._release_probe(probe)  # eg: GeneratorExit, the caller stopped reading
+                raise
+
+    async def astream_json(self, prompt: str) -> AsyncIterator[Tuple[str, Any]]:
+
+        attempt = 0
+
+        while True:
+            started = probe = False
+            try:
+                probe = self._before_call()
+                async for item in self.llm.astream_json(prompt):
+                    started = True
+                    yield item
+                self._after_success(None)
+                return
+
+            except Exception as e:
+                delay = self._after_failure(e, attempt, resumable=not started)
+                if delay is None:
+                    raise
+
+                attempt += 1
+                await asyncio.sleep(delay)
+
+            except BaseException:
+                self._release_probe(probe)
+                raise
+
+    # internal helpers
+
+    def _before_call(self) -> bool:
+        """True when this attempt holds a half open probe slot"""
+        check_deadline()
+        probe = self.breaker.before_call() if self.breaker is not None else False  # raises CircuitOpenError when open
+        if self.budget is not None:
+            self.budget.record_request()
+        scope_incr("retry", "attempts")
+        return probe
+
+    def _release_probe(self, probe: bool) -> None:
+        # the attempt ended without a verdict, dont leave the breaker waiting on it
+        if probe:
+            self.breaker.release_probe()
+
+    def _after_success(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        if self.breaker is not None:
+            self.breaker.record_success()
+        return result
+
+    def _after_failure(self, exc: Exception, attempt: int, resumable: bool = True) -> Optional[float]:
+        """
+        book keeping for a failed attempt.
+        returns the delay before the next attempt, or None to give up
+        """
+        # a fail fast from the breaker itself is not a provider failure
+        if self.breaker is not None and not isinstance(exc, CircuitOpenError):
+            self.breaker.record_failure(exc)
+
+        scope_append("retry", "errors", f"{type(exc).__name__}: {exc}")
+
+        if isinstance(exc, DeadlineExceeded):
+            scope_incr("retry", "deadline")
+            return None
+
+        if not is_retryable(exc):
+            scope_incr("retry", "non_retryable")
+            return None
+
+        if not resumable:
+            scope_incr("retry", "mid_stream")  # fields already went out, cant start over
+            return None
+
+        if attempt >= self.max_attempts - 1:
+            scope_incr("retry", "exhausted")
+            return None
+
+        delay = self.policy.delay(attempt, getattr(exc, "retry_after", None))
+
+        # sleeping past the deadline only to fail there is no retry
+        remaining = remaining_time()
+        if remaining is not None and remaining <= delay:
+            scope_incr("retry", "deadline")
+            raise DeadlineExceeded(f"no time left to retry ({remaining:.3f}s left, retry needs {delay:.3f}s)") from exc
+
+        if self.budget is not None and not self.budget.try_acquire_retry():
+            scope_incr("retry", "budget_denied")
+            return None
+
+        scope_incr("retry", "retries")
+        scope_append("retry", "delays_s", round(delay, 3))
+        return delay
+
+
+def _record_transition(old_state: str, new_state: str) -> None:
+    # runs in the call that caused the transition, so it lands in that run's record
+    scope_append("retry", "circuit", {"from": old_state, "to": new_state, "at": time.time()})
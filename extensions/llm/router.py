@@ -0,0 +1,255 @@
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from engine.log_sink import get_sink
+from engine.run_scope import scope_append, scope_incr, scope_set
+from extensions.llm.base import BaseLLM, LLMBadRequestError, LLMError, llm_model_name
+from extensions.llm.retry_policy import is_retryable
+
+
+class Backend:
+    """
+    One routed backend and its health: rolling latency / outcome windows,
+    consecutive failures and ejection state.
+    """
+
+    def __init__(self, name: str, llm: BaseLLM, window: int):
+        self.name = name
+        self.llm = llm
+        self.latencies: Deque[float] = deque(maxlen=window)   # successful calls only
+        self.outcomes: Deque[bool] = deque(maxlen=window)     # True = ok
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.ejections = 0
+        self.probe_started = 0.0                              # 0 = no probe in flight
+        self.calls = 0
+        self.failures = 0
+
+    def latency(self) -> Optional[float]:
+        return sum(self.latencies) / len(self.latencies) if self.latencies else None
+
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def score(self) -> float:
+        """expected seconds to a successful answer, lower is better (unknown = try it first)"""
+        latency = self.latency()
+        if latency is None:
+            return 0.0
+        return latency / max(0.05, 1.0 - self.error_rate())
+
+
+def _backend_fault(exc: BaseException) -> bool:
+    """
+    Failures that say something about the backend (and are worth another
+    backend). A bad request would fail anywhere, so it is raised as is.
+    """
+    if isinstance(exc, LLMBadRequestError):
+        return False
+    if isinstance(exc, LLMError):
+        return True  # includes auth / parse errors: another backend or model may be fine
+    return is_retryable(exc)
+
+
+class RouterLLM(BaseLLM):
+    """
+    Spreads calls over several backends (providers and / or models) and
+    prefers the fastest healthy one.
+
+    - each backend keeps a rolling window of latencies and outcomes, its
+      score is mean latency / success rate; backends without data go first
+    - on a backend fault the same call fails over to the next backend
+      (up to `max_attempts` backends), a bad request is raised right away
+    - `eject_after` consecutive faults, or an error rate above
+      `max_error_rate` (once `min_samples` outcomes are known), ejects the
+      backend for `eject_seconds`, doubling on every re-ejection up to
+      `max_eject_seconds`
+    - once the ejection ran out, one real call probes the backend: success
+      puts it back in rotation, failure ejects it again
+    - if every backend is ejected, they are still tried (soonest back first)
+      rather than failing without a call
+
+    The chosen backend and failovers go into AgentrunRecord.extra["router"],
+    stats() has the per backend health.
+    """
+
+    def __init__(
+        self,
+        backends: Union[Dict[str, BaseLLM], Sequence[Tuple[str, BaseLLM]]],
+        window: int = 50,
+        eject_after: int = 3,
+        max_error_rate: float = 0.5,
+        min_samples: int = 10,
+        eject_seconds: float = 30.0,
+        max_eject_seconds: float = 300.0,
+        max_attempts: Optional[int] = None,
+    ):
+        items = list(backends.items()) if isinstance(backends, dict) else list(backends)
+        if not items:
+            raise ValueError("RouterLLM needs at least one backend")
+
+        self.backends = [Backend(name, llm, window) for name, llm in items]
+        self.eject_after = eject_after
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self.max_attempts = max_attempts or len(self.backends)
+        self.model = llm_model_name(self.backends[0].llm)
+
+        self._lock = threading.Lock()
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        error: Optional[BaseException] = None
+        for backend in self._candidates():
+            started = time.monotonic()
+            try:
+                result = backend.llm.generate_json(prompt)
+            except Exception as e:
+                error = e
+                if not self._failed(backend, e):
+                    raise
+                continue
+            self._succeeded(backend, time.monotonic() - started)
+            return result
+        raise error
+
+    async def agenerate_json(self, prompt: str) -> Dict[str, Any]:
+        error: Optional[BaseException] = None
+        for backend in self._candidates():
+            started = time.monotonic()
+            try:
+                result = await backend.llm.agenerate_json(prompt)
+            except Exception as e:
+                error = e
+                if not self._failed(backend, e):
+                    raise
+                continue
+            self._succeeded(backend, time.monotonic() - started)
+            return result
+        raise error
+
+    def stream_json(self, prompt: str) -> Iterator[Tuple[str, Any]]:
+        # fails over only until the first field was yielded
+        error: Optional[BaseException] = None
+        for backend in self._candidates():
+            started = time.monotonic()
+            yielded = False
+            try:
+                for item in backend.llm.stream_json(prompt):
+                    yielded = True
+                    yield item
+            except Exception as e:
+                error = e
+                if not self._failed(backend, e) or yielded:
+                    raise
+                continue
+            self._succeeded(backend, time.monotonic() - started)
+            return
+        raise error
+
+    async def astream_json(self, prompt: str) -> AsyncIterator[Tuple[str, Any]]:
+        error: Optional[BaseException] = None
+        for backend in self._candidates():
+            started = time.monotonic()
+            yielded = False
+            try:
+                async for item in backend.llm.astream_json(prompt):
+                    yielded = True
+                    yield item
+            except Exception as e:
+                error = e
+                if not self._failed(backend, e) or yielded:
+                    raise
+                continue
+            self._succeeded(backend, time.monotonic() - started)
+            return
+        raise error
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                b.name: {
+                    "state": self._state(b, now),
+                    "calls": b.calls,
+                    "failures": b.failures,
+                    "latency_s": b.latency(),
+                    "error_rate": b.error_rate(),
+                    "ejections": b.ejections,
+                }
+                for b in self.backends
+            }
+
+    # internal helpers
+
+    def _state(self, backend: Backend, now: float) -> str:
+        if backend.probe_started:
+            return "probing"
+        if backend.ejected_until > now:
+            return "ejected"
+        return "healthy"
+
+    def _candidates(self) -> List[Backend]:
+        """
+        the backends to try for one call, in order. A backend whose
+        ejection ran out goes first as the probe (one probe at a time, a
+        probe that never reported back, eg: a cancelled call, expires).
+        """
+        now = time.monotonic()
+        with self._lock:
+            probes, healthy, ejected = [], [], []
+            for backend in self.backends:
+                probe_in_flight = backend.probe_started and now - backend.probe_started < self.eject_seconds
+                if backend.consecutive_failures and backend.ejected_until and backend.ejected_until <= now and not probe_in_flight:
+                    backend.probe_started = now
+                    probes.append(backend)
+                elif backend.ejected_until > now or probe_in_flight:
+                    ejected.append(backend)
+                else:
+                    healthy.append(backend)
+
+            healthy.sort(key=Backend.score)
+            ejected.sort(key=lambda b: b.ejected_until)
+            return (probes + healthy + ejected)[:self.max_attempts]
+
+    def _succeeded(self, backend: Backend, seconds: float) -> None:
+        with self._lock:
+            backend.calls += 1
+            backend.latencies.append(seconds)
+            backend.outcomes.append(True)
+            backend.consecutive_failures = 0
+            backend.ejected_until = 0.0
+            backend.probe_started = 0.0
+        scope_set("router", "backend", backend.name)
+
+    def _failed(self, backend: Backend, exc: BaseException) -> bool:
+        """book keeping for a failed call, True if the next backend should be tried"""
+        if not _backend_fault(exc):
+            with self._lock:
+                backend.calls += 1
+                backend.probe_started = 0.0
+            return False
+
+        eject_for = 0.0
+        with self._lock:
+            backend.calls += 1
+            backend.failures += 1
+            backend.outcomes.append(False)
+            backend.consecutive_failures += 1
+
+            too_many = backend.consecutive_failures >= self.eject_after
+            too_often = len(backend.outcomes) >= self.min_samples and backend.error_rate() > self.max_error_rate
+            if backend.probe_started or too_many or too_often:
+                eject_for = min(self.max_eject_seconds, self.eject_seconds * (2 ** backend.ejections))
+                backend.ejected_until = time.monotonic() + eject_for
+                backend.ejections += 1
+            backend.probe_started = 0.0
+
+        scope_incr("router", "failovers")
+        scope_append("router", "errors", f"{backend.name}: {type(exc).__name__}: {exc}")
+        if eject_for:
+            get_sink().warning("router.eject", backend=backend.name, seconds=eject_for, error=f"{type(exc).__name__}: {exc}")
+        return True
@@ -0,0 +1,140 @@
+import asyncio
+import concurrent.futures
+import copy
+import threading
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+from engine.deadline import DeadlineExceeded, call_timeout, deadline_hit
+from extensions.llm.base import BaseLLM, llm_model_name, prompt_key
+
+
+class _LeaderGone(Exception):
+    """set on the shared future when the leader gave up for its own reasons, waiters then retry the call"""
+
+
+class SingleFlightLLM(BaseLLM):
+    """
+    wrapper that coalesces identical in-flight requests.
+
+    The first caller for a prompt key (the leader) does the real call,
+    everyone who shows up while it is in flight waits on the same
+    result, or gets the same exception. Works across threads and
+    asyncio tasks alike, since waiters share one concurrent Future.
+
+    A leader that is cancelled, or fails on its own deadline, hands the
+    call over instead of failing its waiters: one of them makes it again
+    as the new leader, the others wait on that one. Each waiter waits
+    only as long as its own deadline allows (engine.deadline), then
+    fails with DeadlineExceeded while the shared call goes on.
+
+    Nothing is kept after the call finishes, that is CachingLLM's job.
+    Streams are passed through uncoalesced, a waiter would only get
+    its fields after the leader finished, which defeats streaming.
+    """
+
+    def __init__(self, llm: BaseLLM, settings: Optional[Dict[str, Any]] = None):
+        self.llm = llm
+        self.settings = settings or {}
+
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._counts = {"leaders": 0, "coalesced": 0}
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        key = prompt_key(prompt, llm_model_name(self.llm), self.settings)
+
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            timeout = call_timeout()  # raises once this caller is out of time
+            try:
+                return copy.deepcopy(future.result(timeout))
+            except _LeaderGone:
+                continue  # take over (or join whoever did)
+            except concurrent.futures.TimeoutError:
+                raise DeadlineExceeded("coalesced llm call did not finish before the deadline") from None
+
+        try:
+            result = self.llm.generate_json(prompt)
+        except Exception as exc:
+            self._settle(key, future, exc=self._shared_error(exc))
+            raise
+        except BaseException:
+            self._settle(key, future, exc=_LeaderGone())
+            raise
+
+        self._settle(key, future, result=result)
+        return result
+
+    async def agenerate_json(self, prompt: str) -> Dict[str, Any]:
+        key = prompt_key(prompt, llm_model_name(self.llm), self.settings)
+
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            timeout = call_timeout()
+            try:
+                # shield: a cancelled (or timed out) waiter must not cancel the shared call
+                result = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+            except _LeaderGone:
+                continue
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded("coalesced llm call did not finish before the deadline") from None
+            return copy.deepcopy(result)
+
+        try:
+            result = await self.llm.agenerate_json(prompt)
+        except Exception as exc:
+            self._settle(key, future, exc=self._shared_error(exc))
+            raise
+        except BaseException:
+            # cancelled leader: its waiters are still alive and still want the answer
+            self._settle(key, future, exc=_LeaderGone())
+            raise
+
+        self._settle(key, future, result=result)
+        return result
+
+    def stream_json(self, prompt: str) -> Iterator[Tuple[str, Any]]:
+        yield from self.llm.stream_json(prompt)
+
+    async def astream_json(self, prompt: str) -> AsyncIterator[Tuple[str, Any]]:
+        async for item in self.llm.astream_json(prompt):
+            yield item
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._counts, "in_flight": len(self._inflight)}
+
+    # internal helpers
+
+    def _join(self, key: str):
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self._counts["coalesced"] += 1
+                return future, False
+
+            future = Future()
+            self._inflight[key] = future
+            self._counts["leaders"] += 1
+            return future, True
+
+    def _shared_error(self, exc: Exception) -> Exception:
+        # the leader running out of time says nothing about the call, a waiter may still have time for it
+        if isinstance(exc, DeadlineExceeded) or deadline_hit():
+            return _LeaderGone()
+        return exc
+
+    def _settle(self, key: str, future: Future, result: Any = None, exc: Optional[BaseException] = None) -> None:
+        # drop the key first, so late arrivals start a fresh call
+        with self._lock:
+            self._inflight.pop(key, None)
+
+        if exc is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
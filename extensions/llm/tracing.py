@@ -0,0 +1,71 @@
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+from engine.run_scope import scope_append
+from extensions.llm.base import BaseLLM, llm_model_name
+
+
+class TracingLLM(BaseLLM):
+    """
+    wrapper that times every call to the wrapped llm.
+
+    One entry per call goes into the current run scope, so it ends up in
+    AgentrunRecord.extra["trace"]["llm_calls"]:
+        {"model", "start_ts", "end_ts", "status": ok | error, "error"}
+    MetricsHook turns these into llm spans under the agent span.
+    Wrap the provider itself to see every upstream attempt (retries included),
+    wrap the outer chain to see what the agent saw (cache hits included).
+    """
+
+    def __init__(self, llm: BaseLLM):
+        self.llm = llm
+        self.model = llm_model_name(llm)
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        start = time.time()
+        try:
+            result = self.llm.generate_json(prompt)
+        except Exception as e:
+            self._record(start, e)
+            raise
+        self._record(start)
+        return result
+
+    async def agenerate_json(self, prompt: str) -> Dict[str, Any]:
+        start = time.time()
+        try:
+            result = await self.llm.agenerate_json(prompt)
+        except Exception as e:
+            self._record(start, e)
+            raise
+        self._record(start)
+        return result
+
+    def stream_json(self, prompt: str) -> Iterator[Tuple[str, Any]]:
+        # the call lasts until the last field arrived
+        start = time.time()
+        try:
+            yield from self.llm.stream_json(prompt)
+        except Exception as e:
+            self._record(start, e)
+            raise
+        self._record(start)
+
+    async def astream_json(self, prompt: str) -> AsyncIterator[Tuple[str, Any]]:
+        start = time.time()
+        try:
+            async for item in self.llm.astream_json(prompt):
+                yield item
+        except Exception as e:
+            self._record(start, e)
+            raise
+        self._record(start)
+
+    def _record(self, start: float, error: Optional[Exception] = None) -> None:
+        scope_append("trace", "llm_calls", {
+            "model": self.model,
+            "start_ts": start,
+            "end_ts": time.time(),
+            "status": "error" if error is not None else "ok",
+            "error": f"{type(error).__name__}: {error}" if error is not None else None,
+        })
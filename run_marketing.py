@@ -1,34 +1,46 @@
-from dotenv import load_dotenv
-load_dotenv()
+import argparse
+import json
+import sys
 
+from engine.config import WORKFLOW_TIMEOUT_S
 from engine.orchestrator import Orchestrator
 from engine.hooks import HookManager
+from engine.batch import BatchStats, JsonlWriter, read_jsonl
+from engine.memory import MemoryStore
 
 from extensions.hooks.logging_hook import LoggingHook
 from extensions.hooks.memory_hook import MemoryHook
+from extensions.hooks.metrics_hook import MetricsHook
 
-from domains.marketing.agent_factory import build_marketing_agents
-from domains.marketing.workflow.marketing_workflow import create_marketing_workflow
+from domains.registry import load_domain
 
 
-def main():
-    agents = build_marketing_agents()
-
-    steps = create_marketing_workflow(
-        input_validator=agents["input_validator"],
-        audience_analyzer=agents["audience_analyzer"],
-        value_proposition_agent=agents["value_proposition"],
-        content_outline_generator=agents["content_outline"],
-    )
+def build_orchestrator(hooks: list, background_hooks: bool = False) -> Orchestrator:
+    # agents, providers and their sdks are imported here, not at startup
+    # (config, .env included, is read once by engine.config)
+    steps = load_domain("marketing")()
 
-    orchestrator = Orchestrator(
+    return Orchestrator(
         steps=steps,
-        hook_manager=HookManager([
-            LoggingHook(),
-            MemoryHook(),
-        ])
+        hook_manager=HookManager(hooks, background=background_hooks),
+        timeout_s=WORKFLOW_TIMEOUT_S or None,
     )
 
+
+def export_telemetry(metrics: MetricsHook, folder: str) -> None:
+    metrics.write_prometheus(f"{folder}/metrics.prom")
+    metrics.export_metrics(f"{folder}/metrics.otlp.json")
+    spans = metrics.export_traces(f"{folder}/traces.otlp.json")
+    print(f"telemetry: {spans} spans written to {folder}", file=sys.stderr)
+
+
+def run_demo(telemetry_dir: str | None = None):
+    metrics = MetricsHook()
+    orchestrator = build_orchestrator([
+        LoggingHook(),
+        MemoryHook(),
+    ] + ([metrics] if telemetry_dir else []))
+
     user_input = {
         "payload": {
             "product_description": "AI CRM tool",
@@ -41,8 +53,58 @@ def main():
     result = orchestrator.run(user_input)
 
     print("\n FINAL RESULT :")
-    print(result["final_output"].model_dump_json(indent=2))
+    if result["final_output"] is not None:
+        print(result["final_output"].model_dump_json(indent=2))
+    print(f"usage: {result['usage']}")
+
+    if telemetry_dir:
+        export_telemetry(metrics, telemetry_dir)
+
+
+def run_batch(input_path: str, output_path: str, concurrency: int, telemetry_dir: str | None = None):
+    # one process, one set of agents/clients for the whole file
+    # (no LoggingHook here, per brief stdout dumps dont scale to thousands)
+    # append only memory, so parallel batch processes dont clobber each other
+    # memory writes happen on the hook worker thread, close() waits for them
+    metrics = MetricsHook()
+    orchestrator = build_orchestrator([
+        MemoryHook(MemoryStore(append_only=True)),
+    ] + ([metrics] if telemetry_dir else []), background_hooks=True)
+
+    stats = BatchStats()
+
+    out = sys.stdout if output_path == "-" else open(output_path, "w", encoding="utf-8")
+    try:
+        writer = JsonlWriter(out)
+        for index, result in orchestrator.run_many(read_jsonl(input_path), max_concurrency=concurrency):
+            writer.write(index, result)
+            stats.add(result)
+    finally:
+        orchestrator.hooks.close()
+        if out is not sys.stdout:
+            out.close()
+
+    stats.finish()
+    if telemetry_dir:
+        export_telemetry(metrics, telemetry_dir)
+
+    print("\n BATCH SUMMARY :", file=sys.stderr)
+    print(json.dumps(stats.summary(), indent=2), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the marketing workflow")
+    parser.add_argument("--input", help="jsonl file with one brief per line (enables bulk mode)")
+    parser.add_argument("--output", default="-", help="where to write jsonl results, '-' for stdout")
+    parser.add_argument("--concurrency", type=int, default=8, help="max workflows in flight")
+    parser.add_argument("--telemetry", help="folder for prometheus / otlp json exports of the run")
+    args = parser.parse_args()
+
+    if args.input:
+        run_batch(args.input, args.output, args.concurrency, args.telemetry)
+    else:
+        run_demo(args.telemetry)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,106 @@
+# BaseAgent.run fast path: trusted inputs skip re-validation, tracebacks are formatted on read
+
+from typing import Any, Dict
+
+import engine.agent_base as agent_base
+from engine.agent_base import BaseAgent, Agentinput, Agentoutput, AgentrunRecord
+from engine.orchestrator import Orchestrator, WorkflowStep
+
+
+class EchoAgent(BaseAgent):
+
+    def execute(self, validated_input: Agentinput, context: Dict[str, Any]) -> Agentoutput:
+        validated_input.payload["touched_by"] = self.name   # must not leak into upstream output
+        return Agentoutput(output=dict(validated_input.payload))
+
+
+class FailingAgent(BaseAgent):
+
+    def execute(self, validated_input: Agentinput, context: Dict[str, Any]) -> Agentoutput:
+        raise ValueError("boom")
+
+
+def count_validations(monkeypatch) -> list:
+    calls = []
+    original = agent_base.schema_validator
+
+    def counting(schema):
+        validate = original(schema)
+
+        def wrapped(raw):
+            calls.append(schema)
+            return validate(raw)
+        return wrapped
+
+    monkeypatch.setattr(agent_base, "schema_validator", counting)
+    return calls
+
+
+def test_prevalidated_input_is_not_validated_again(monkeypatch):
+    calls = count_validations(monkeypatch)
+    agent = EchoAgent(name="echo")
+
+    output, record = agent.run(Agentinput(payload={"n": 1}))
+
+    assert record.status == "success"
+    assert record.input["payload"]["n"] == 1
+    assert calls == []
+
+
+def test_raw_dict_input_is_still_validated(monkeypatch):
+    calls = count_validations(monkeypatch)
+
+    _, record = EchoAgent(name="echo").run({"payload": "not a dict"})
+
+    assert record.status == "error"
+    assert record.error.startswith("InputvalidationError")
+    assert calls == [Agentinput]
+
+
+def test_orchestrator_trusts_only_upstream_outputs(monkeypatch):
+    calls = count_validations(monkeypatch)
+    steps = [
+        WorkflowStep(agent=EchoAgent(name="a")),
+        WorkflowStep(agent=EchoAgent(name="b")),
+        WorkflowStep(agent=EchoAgent(name="c"), input_transformer=lambda payload, ctx: dict(payload)),
+        WorkflowStep(agent=EchoAgent(name="d"), input_transformer=lambda payload, ctx: {1: payload}),
+    ]
+
+    result = Orchestrator(steps=steps).run({"payload": {"n": 1}, "metadata": {}})
+
+    assert calls == [Agentinput, Agentinput]   # user input + d's int keyed payload, not b's or c's input
+    assert [rec.status for rec in result["rec_history"]] == ["success"] * 3 + ["error"]
+    assert result["rec_history"][3].error.startswith("InputvalidationError")
+    assert result["rec_history"][0].output["touched_by"] == "a"   # b got its own copy
+
+
+def test_dag_trusts_only_steps_with_upstream_outputs(monkeypatch):
+    calls = count_validations(monkeypatch)
+    steps = [
+        WorkflowStep(agent=EchoAgent(name="a"), depends_on=[]),
+        WorkflowStep(agent=EchoAgent(name="b"), depends_on=[]),
+        WorkflowStep(agent=EchoAgent(name="c"), depends_on=["a", "b"]),
+    ]
+
+    result = Orchestrator(steps=steps).run({"payload": {"n": 1}, "metadata": {}})
+
+    assert result["status"] == "success"
+    assert calls == [Agentinput, Agentinput]   # the two roots get the user input
+
+
+def test_traceback_is_formatted_lazily():
+    output, record = FailingAgent(name="failing").run({"payload": {}, "metadata": {}})
+
+    assert record.status == "error"
+    assert record.error == "ValueError: boom"
+    assert isinstance(record.exception, ValueError)
+    assert "Traceback (most recent call last)" in record.error_traceback
+
+    dumped = record.model_dump()
+    assert "exception" not in dumped
+    assert dumped["error"].startswith("ValueError: boom\nTraceback")
+
+    # records read back from storage carry the full text in error
+    restored = AgentrunRecord(**dumped)
+    assert restored.exception is None
+    assert restored.model_dump()["error"] == dumped["error"]
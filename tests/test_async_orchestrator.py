@@ -0,0 +1,114 @@
+# async path self test, no real llm involved
+
+import asyncio
+import time
+from typing import Dict, Any
+
+from engine.agent_base import Agentinput
+from engine.hooks import BaseHook, HookManager
+from engine.llm_agent import LLMAgent
+from engine.orchestrator import AsyncOrchestrator, WorkflowStep
+from extensions.llm.base import BaseLLM
+from tests.test_agent_base import DummyAgent
+
+
+class EchoLLM(BaseLLM):
+    """returns the prompt back, with a small non blocking delay on the async path"""
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        return {"echo": prompt}
+
+    async def agenerate_json(self, prompt: str) -> Dict[str, Any]:
+        await asyncio.sleep(0.05)
+        return {"echo": prompt}
+
+
+class EchoAgent(LLMAgent):
+
+    def __init__(self, llm: BaseLLM):
+        super().__init__(name="echo_agent", llm=llm)
+
+    def build_prompt(self, validated_input: Agentinput, context: Dict[str, Any]) -> str:
+        return str(validated_input.payload.get("value"))
+
+    def parse_response(self, llm_response: Dict[str, Any], validated_input: Agentinput):
+        return {"output": {"echo": llm_response["echo"]}}
+
+
+class AsyncCountingHook(BaseHook):
+
+    def __init__(self):
+        self.events = []
+
+    async def on_workflow_start(self, initial_input: dict) -> None:
+        self.events.append("start")
+
+    def after_agent_run(self, agent: Any, agent_output: Any, record: Any) -> None:
+        self.events.append(agent.name)
+
+    async def on_workflow_end(self, result: dict, rec_history: list) -> None:
+        self.events.append("end")
+
+
+def test_async_orchestrator_runs_many_workflows_concurrently():
+    hook = AsyncCountingHook()
+    orchestrator = AsyncOrchestrator(
+        steps=[WorkflowStep(agent=DummyAgent()), WorkflowStep(agent=EchoAgent(EchoLLM()))],
+        hook_manager=HookManager([hook]),
+    )
+
+    async def main():
+        inputs = [{"payload": {"n": i}, "metadata": {}} for i in range(20)]
+        return await asyncio.gather(*(orchestrator.arun(inp) for inp in inputs))
+
+    results = asyncio.run(main())
+
+    assert all(r["status"] == "success" for r in results)
+    assert results[3]["final_output"].output == {"echo": "6"}
+    assert hook.events.count("start") == 20 and hook.events.count("end") == 20
+
+
+def test_sync_run_still_works_on_async_orchestrator():
+    orchestrator = AsyncOrchestrator(steps=[WorkflowStep(agent=EchoAgent(EchoLLM()))])
+
+    result = orchestrator.run({"payload": {"value": "hi"}, "metadata": {}})
+
+    assert result["status"] == "success"
+    assert result["final_output"].output == {"echo": "hi"}
+
+
+def test_async_dag_steps_overlap():
+    class NamedEcho(EchoAgent):
+        def __init__(self, name: str):
+            super().__init__(EchoLLM())
+            self.name = name
+
+    orchestrator = AsyncOrchestrator(steps=[
+        WorkflowStep(agent=NamedEcho("a"), depends_on=[]),
+        WorkflowStep(agent=NamedEcho("b"), depends_on=[]),
+        WorkflowStep(agent=NamedEcho("c"), depends_on=[]),
+    ])
+
+    start = time.perf_counter()
+    result = asyncio.run(orchestrator.arun({"payload": {"value": 1}, "metadata": {}}))
+    elapsed = time.perf_counter() - start
+
+    assert result["status"] == "success"
+    assert [r.agent_name for r in result["rec_history"]] == ["a", "b", "c"]
+    assert elapsed < 0.14  # three 50ms llm calls overlapped
+
+
+def test_async_agent_failure_is_recorded():
+    agent = DummyAgent()
+
+    output, record = asyncio.run(agent.arun({"payload": {}, "metadata": {}}))
+
+    assert record.status == "error"
+    assert output.metadata["exception_type"] == "ValueError"
+
+
+if __name__ == "__main__":
+    test_async_orchestrator_runs_many_workflows_concurrently()
+    test_sync_run_still_works_on_async_orchestrator()
+    test_async_dag_steps_overlap()
+    test_async_agent_failure_is_recorded()
@@ -0,0 +1,187 @@
+# batched llm calls: packed into one request, split back per item, partial failures stay partial
+
+import asyncio
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+from engine.agent_base import Agentinput, Agentoutput
+import pytest
+
+from engine.budget import WorkflowBudget, split_usage, use_budget
+from engine.deadline import Deadline, DeadlineExceeded, use_deadline
+from engine.llm_agent import LLMAgent
+from engine.prompts import PromptTemplate
+from extensions.llm.base import LLMBadRequestError
+from extensions.llm.batching import MicroBatchLLM, PackedBatchLLM
+from extensions.llm.fake import FakeLLM
+
+TEMPLATE = PromptTemplate(
+    "test.echo",
+    instructions='Echo the word. Return {"word": ""}',
+    body="Word: {word}",
+)
+
+TASK = re.compile(r"### Task (\d+)\nWord: (\S+)")
+
+
+def answer(prompt: str, drop: str = "") -> Dict[str, Any]:
+    """answers single and packed prompts, leaving out tasks whose word is `drop`"""
+    tasks = TASK.findall(prompt)
+    if not tasks:
+        word = prompt.rsplit("Word: ", 1)[-1]
+        if word == "bad":
+            raise LLMBadRequestError("cant answer that")
+        return {"word": word}
+    return {"results": [{"id": int(i), "output": {"word": w}} for i, w in tasks if w != drop]}
+
+
+class EchoAgent(LLMAgent):
+    def build_prompt(self, validated_input: Agentinput, context: Dict[str, Any]) -> str:
+        return TEMPLATE.render(word=validated_input.payload["word"])
+
+    def parse_response(self, llm_response: Dict[str, Any], validated_input: Agentinput) -> Agentoutput:
+        return Agentoutput(output=llm_response)
+
+
+def test_default_batch_keeps_order_and_returns_failures():
+    llm = FakeLLM(response=answer, latency=0.05)
+
+    results = llm.generate_json_batch([TEMPLATE.render(word=w) for w in ("a", "bad", "c")])
+
+    assert results[0] == {"word": "a"} and results[2] == {"word": "c"}
+    assert isinstance(results[1], LLMBadRequestError)
+
+
+def test_prompts_are_packed_and_split_back():
+    inner = FakeLLM(response=answer)
+    llm = PackedBatchLLM(inner, max_items=2)
+    words = ["a", "b", "c", "d", "e"]
+
+    results = llm.generate_json_batch([TEMPLATE.render(word=w) for w in words])
+
+    assert results == [{"word": w} for w in words]
+    assert inner.calls == 3    # two packs of two, the last one alone
+    assert llm.stats() == {"packs": 2, "packed_items": 4, "unpacked": 4, "fallbacks": 0}
+
+
+def test_shared_prefix_is_sent_once_per_pack():
+    seen = []
+    llm = PackedBatchLLM(FakeLLM(response=lambda p: seen.append(p) or answer(p)))
+
+    llm.generate_json_batch([TEMPLATE.render(word=w) for w in ("a", "b", "c")])
+
+    assert seen[0].count(TEMPLATE.instructions) == 1
+    assert seen[0].system.startswith(TEMPLATE.instructions) and seen[0].template == "test.echo"
+
+
+def test_missing_items_and_failed_packs_fall_back_to_single_calls():
+    dropping = PackedBatchLLM(FakeLLM(response=lambda p: answer(p, drop="b")))
+    failing = PackedBatchLLM(FakeLLM(response=lambda p: {"not": "a batch answer"} if "### Task" in p else answer(p)))
+    prompts = [TEMPLATE.render(word=w) for w in ("a", "b", "c")]
+
+    assert dropping.generate_json_batch(prompts) == [{"word": "a"}, {"word": "b"}, {"word": "c"}]
+    assert dropping.stats()["fallbacks"] == 1
+    assert failing.generate_json_batch(prompts) == [{"word": "a"}, {"word": "b"}, {"word": "c"}]
+    assert failing.stats()["fallbacks"] == 3
+
+
+def test_async_packing():
+    inner = FakeLLM(response=answer)
+    llm = PackedBatchLLM(inner)
+
+    results = asyncio.run(llm.agenerate_json_batch([TEMPLATE.render(word=w) for w in ("a", "bad", "c")]))
+
+    assert results == [{"word": "a"}, {"word": "bad"}, {"word": "c"}]   # packed, so "bad" was answered too
+    assert inner.calls == 1
+
+
+def test_concurrent_agent_runs_share_one_request():
+    inner = FakeLLM(response=answer, latency=0.02)
+    llm = MicroBatchLLM(PackedBatchLLM(inner, max_items=8), max_batch=8, max_wait=0.2)
+    agent = EchoAgent(name="echo", llm=llm)
+    budget = WorkflowBudget()
+
+    def run(word):
+        with use_budget(budget):
+            return agent.run({"payload": {"word": word}, "metadata": {}})
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        runs = list(pool.map(run, [f"w{i}" for i in range(8)]))
+
+    assert inner.calls == 1
+    assert [out.output["word"] for out, _ in runs] == [f"w{i}" for i in range(8)]
+    records = [record for _, record in runs]
+    assert all(r.extra["batch"]["size"] == 8 for r in records)
+    assert sum(r.tokens_used for r in records) == budget.total_tokens > 0
+    assert budget.llm_calls == 1
+    assert llm.stats()["batches"] == 1
+
+
+def test_a_tight_deadline_only_fails_its_own_call():
+    llm = MicroBatchLLM(PackedBatchLLM(FakeLLM(response=answer, latency=0.2)), max_batch=2, max_wait=0.5)
+
+    def tight():
+        with use_deadline(Deadline(0.05)), pytest.raises(DeadlineExceeded):
+            llm.generate_json(TEMPLATE.render(word="a"))
+
+    def loose():
+        with use_deadline(Deadline(5.0)):
+            return llm.generate_json(TEMPLATE.render(word="b"))
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        cut, answered = pool.submit(tight), pool.submit(loose)
+        cut.result()
+        assert answered.result() == {"word": "b"}
+
+    assert llm.stats()["batches"] == 1   # same batch, sent under the loose deadline
+
+
+def test_micro_batching_serves_async_callers_and_isolates_failures():
+    llm = MicroBatchLLM(FakeLLM(response=answer), max_batch=4, max_wait=0.05)
+
+    async def main():
+        return await asyncio.gather(
+            *(llm.agenerate_json(TEMPLATE.render(word=w)) for w in ("a", "bad", "c")),
+            return_exceptions=True,
+        )
+
+    a, bad, c = asyncio.run(main())
+
+    assert a == {"word": "a"} and c == {"word": "c"}
+    assert isinstance(bad, LLMBadRequestError)
+
+
+def test_run_batch_makes_one_llm_call_with_records_per_input():
+    inner = FakeLLM(response=answer)
+    agent = EchoAgent(name="echo", llm=PackedBatchLLM(inner))
+    inputs = [{"payload": {"word": w}, "metadata": {}} for w in ("a", "b", "a")] + [{"payload": "not a dict"}]
+
+    budget = WorkflowBudget()
+
+    with use_budget(budget):
+        runs = agent.run_batch(inputs)
+
+    assert inner.calls == 1   # "a" twice is asked once
+    assert [record.status for _, record in runs] == ["success", "success", "success", "error"]
+    assert runs[2][0].output == {"word": "a"}
+    assert sum(record.tokens_used or 0 for _, record in runs) == budget.total_tokens > 0
+    assert runs[0][1].extra["batch"]["size"] == 3
+
+
+def test_run_batch_keeps_failed_items_apart():
+    agent = EchoAgent(name="echo", llm=FakeLLM(response=answer))
+
+    runs = asyncio.run(agent.arun_batch([{"payload": {"word": w}, "metadata": {}} for w in ("a", "bad")]))
+
+    assert runs[0][1].status == "success" and runs[1][1].status == "error"
+    assert "cant answer that" in runs[1][1].error
+
+
+def test_split_usage_adds_up():
+    parts = split_usage({"total_tokens": 10, "cost_usd": 0.3, "llm_calls": 1, "calls": [{"model": "m"}]}, 3)
+
+    assert [p.get("total_tokens") for p in parts] == [4, 3, 3]
+    assert abs(sum(p["cost_usd"] for p in parts) - 0.3) < 1e-12
+    assert [p.get("llm_calls", 0) for p in parts] == [1, 0, 0]
+    assert parts[0]["calls"] == [{"model": "m"}] and "calls" not in parts[1]
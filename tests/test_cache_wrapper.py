@@ -0,0 +1,70 @@
+# caching wrapper self test, uses a counting fake llm instead of gemini
+
+import time
+from typing import Dict, Any
+
+from extensions.llm.base import BaseLLM
+from extensions.llm.cache_wrapper import CachingLLM, LRUTTLCache, SQLiteCacheStore
+from extensions.hooks.cache_stats_hook import CacheStatsHook
+
+
+class CountingLLM(BaseLLM):
+
+    def __init__(self):
+        self.model = "fake-model"
+        self.calls = 0
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        self.calls += 1
+        return {"answer": prompt.strip(), "n": self.calls}
+
+
+def test_memory_tier_hits_and_normalizes_whitespace():
+    inner = CountingLLM()
+    llm = CachingLLM(inner)
+
+    first = llm.generate_json("  hello\n    world ")
+    first["answer"] = "mutated by caller"
+    second = llm.generate_json("hello world")
+
+    assert inner.calls == 1
+    assert second["n"] == 1 and second["answer"] != "mutated by caller"
+    assert llm.stats()["memory_hits"] == 1 and llm.stats()["misses"] == 1
+
+
+def test_lru_eviction_and_ttl():
+    cache = LRUTTLCache(max_entries=2, ttl_seconds=0.05)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    cache.get("a")
+    cache.set("c", {"v": 3})   # b is least recently used
+
+    assert cache.get("b") is None and cache.evictions == 1
+
+    time.sleep(0.06)
+    assert cache.get("a") is None and cache.expirations == 1
+
+
+def test_sqlite_tier_survives_new_wrapper(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+
+    inner = CountingLLM()
+    CachingLLM(inner, persistent_store=SQLiteCacheStore(path)).generate_json("brief")
+
+    # fresh process would look like this: empty memory tier, same file
+    restarted = CachingLLM(inner, persistent_store=SQLiteCacheStore(path))
+    hook = CacheStatsHook({"main": restarted})
+
+    hook.on_workflow_start({})
+    assert restarted.generate_json("brief")["n"] == 1
+    hook.on_workflow_end({"status": "success"}, [])
+
+    assert inner.calls == 1
+    assert hook.last_delta["main"]["disk_hits"] == 1
+
+
+if __name__ == "__main__":
+    import pathlib, tempfile
+    test_memory_tier_hits_and_normalizes_whitespace()
+    test_lru_eviction_and_ttl()
+    test_sqlite_tier_survives_new_wrapper(pathlib.Path(tempfile.mkdtemp()))
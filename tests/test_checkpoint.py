@@ -0,0 +1,99 @@
+# checkpoint + resume self test
+
+import asyncio
+from typing import Dict, Any
+
+import pytest
+
+from engine.agent_base import Agentinput, Agentoutput
+from engine.checkpoint import CheckpointStore
+from engine.orchestrator import AsyncOrchestrator, Orchestrator, WorkflowStep
+from tests.test_agent_base import DummyAgent
+
+
+class CountingAgent(DummyAgent):
+    """DummyAgent that counts calls and can be told to fail the first time"""
+
+    def __init__(self, name: str, fail_first: bool = False):
+        super().__init__()
+        self.name = name
+        self.fail_first = fail_first
+        self.calls = 0
+
+    def execute(self, validated_input: Agentinput, context: Dict[str, Any]) -> Agentoutput:
+        self.calls += 1
+        if self.fail_first and self.calls == 1:
+            raise RuntimeError("provider hiccup")
+        return super().execute(validated_input, context)
+
+
+def double_again(prev_output: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+    return {"n": prev_output["value"]}
+
+
+def build(fail_first_on: str, dag: bool = False):
+    agents = [CountingAgent(name, fail_first=(name == fail_first_on)) for name in ("one", "two", "three")]
+    steps = [WorkflowStep(agent=agents[0], depends_on=[] if dag else None)]
+    steps += [WorkflowStep(agent=a, input_transformer=double_again) for a in agents[1:]]
+    return agents, steps
+
+
+def test_resume_skips_completed_steps(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    agents, steps = build(fail_first_on="three")
+    orchestrator = Orchestrator(steps=steps, checkpoint_store=store)
+
+    first = orchestrator.run({"payload": {"n": 1}, "metadata": {}})
+    assert first["status"] == "error"
+
+    resumed = orchestrator.resume(first["run_id"])
+
+    assert resumed["status"] == "success"
+    assert resumed["final_output"].output == {"value": 8}
+    assert [a.calls for a in agents] == [1, 1, 2]
+    assert [r.agent_name for r in resumed["rec_history"]] == ["one", "two", "three"]
+
+    # a finished run leaves no checkpoint behind
+    assert list(tmp_path.iterdir()) == []
+    with pytest.raises(KeyError):
+        orchestrator.resume(first["run_id"])
+
+
+def test_resume_from_fresh_process_state(tmp_path):
+    _, steps = build(fail_first_on="two", dag=True)
+    first = Orchestrator(steps=steps, checkpoint_store=CheckpointStore(str(tmp_path))).run({"payload": {"n": 3}, "metadata": {}})
+    assert first["status"] == "error"
+
+    # new agents + new orchestrator + new store, like a restarted worker would have
+    agents, steps = build(fail_first_on="none", dag=True)
+    orchestrator = AsyncOrchestrator(steps=steps, checkpoint_store=CheckpointStore(str(tmp_path)))
+
+    result = asyncio.run(orchestrator.aresume(first["run_id"]))
+
+    assert result["status"] == "success"
+    assert result["final_output"].output == {"value": 24}
+    assert [a.calls for a in agents] == [0, 1, 1]
+
+
+def test_resume_unknown_run(tmp_path):
+    _, steps = build(fail_first_on="none")
+    with pytest.raises(KeyError):
+        Orchestrator(steps=steps, checkpoint_store=CheckpointStore(str(tmp_path))).resume("missing")
+
+
+def test_non_json_context_fails_the_save(tmp_path):
+    _, steps = build(fail_first_on="none")
+    orchestrator = Orchestrator(steps=steps, checkpoint_store=CheckpointStore(str(tmp_path)))
+
+    with pytest.raises(TypeError, match="not json serializable"):
+        orchestrator.run({"payload": {"n": 1}, "metadata": {}}, context={"client": object()})
+
+    assert list(tmp_path.iterdir()) == []   # no checkpoint with a stringified object in it
+
+
+if __name__ == "__main__":
+    import pathlib, tempfile
+    test_resume_skips_completed_steps(pathlib.Path(tempfile.mkdtemp()))
+    test_resume_from_fresh_process_state(pathlib.Path(tempfile.mkdtemp()))
+    test_resume_unknown_run(pathlib.Path(tempfile.mkdtemp()))
+    test_non_json_context_fails_the_save(pathlib.Path(tempfile.mkdtemp()))
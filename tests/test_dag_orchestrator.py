@@ -0,0 +1,100 @@
+# dag mode self test: independent steps should overlap, order and fail fast should not change
+
+import time
+from typing import Dict, Any
+
+import pytest
+
+from engine.agent_base import BaseAgent, Agentinput, Agentoutput
+from engine.hooks import BaseHook, HookManager
+from engine.orchestrator import Orchestrator, WorkflowStep
+
+
+class SleepyAgent(BaseAgent):
+    """sleeps, then returns its name + the payload it saw"""
+
+    def __init__(self, name: str, delay: float = 0.2, fail: bool = False):
+        super().__init__(name=name)
+        self.delay = delay
+        self.fail = fail
+
+    def execute(self, validated_input: Agentinput, context: Dict[str, Any]) -> Agentoutput:
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} failed")
+        return Agentoutput(output={"from": self.name, "seen": validated_input.payload})
+
+
+class OrderHook(BaseHook):
+
+    def __init__(self):
+        self.events = []
+
+    def before_agent_run(self, agent: Any, agent_input: dict) -> None:
+        self.events.append(("before", agent.name))
+
+    def after_agent_run(self, agent: Any, agent_output: Any, record: Any) -> None:
+        self.events.append(("after", agent.name))
+
+    def on_agent_error(self, agent: Any, error: Exception, record: Any) -> None:
+        self.events.append(("error", agent.name))
+
+
+def merge(prev_output: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+    return {"a": context["a"]["from"], "b": context["b"]["from"]}
+
+
+def test_independent_steps_run_in_parallel():
+    steps = [
+        WorkflowStep(agent=SleepyAgent("root", delay=0.0)),
+        WorkflowStep(agent=SleepyAgent("a"), depends_on=["root"]),
+        WorkflowStep(agent=SleepyAgent("b"), depends_on=["root"]),
+        WorkflowStep(agent=SleepyAgent("join", delay=0.0), input_transformer=merge, depends_on=["a", "b"]),
+    ]
+    hook = OrderHook()
+    orchestrator = Orchestrator(steps=steps, hook_manager=HookManager([hook]))
+
+    start = time.perf_counter()
+    result = orchestrator.run({"payload": {"x": 1}, "metadata": {}})
+    elapsed = time.perf_counter() - start
+
+    assert result["status"] == "success"
+    assert elapsed < 0.35  # a and b overlapped (sequential would be ~0.4s)
+    assert [r.agent_name for r in result["rec_history"]] == ["root", "a", "b", "join"]
+    assert result["final_output"].output["seen"] == {"a": "a", "b": "b"}
+    assert hook.events[-1] == ("after", "join")
+
+
+def test_dag_fail_fast_stops_scheduling():
+    steps = [
+        WorkflowStep(agent=SleepyAgent("root", delay=0.0)),
+        WorkflowStep(agent=SleepyAgent("a", delay=0.0, fail=True), depends_on=["root"]),
+        WorkflowStep(agent=SleepyAgent("b", delay=0.1), depends_on=["root"]),
+        WorkflowStep(agent=SleepyAgent("join", delay=0.0), depends_on=["a", "b"]),
+    ]
+    hook = OrderHook()
+
+    result = Orchestrator(steps=steps, hook_manager=HookManager([hook])).run({"payload": {}, "metadata": {}})
+
+    assert result["status"] == "error"
+    assert result["final_output"].output == {"error": "a failed"}
+    assert [r.agent_name for r in result["rec_history"]] == ["root", "a", "b"]  # b was already in flight
+    assert ("error", "a") in hook.events
+    assert ("before", "join") not in hook.events
+
+
+def test_dag_rejects_cycles_and_unknown_deps():
+    with pytest.raises(ValueError):
+        Orchestrator(steps=[
+            WorkflowStep(agent=SleepyAgent("a"), depends_on=["b"]),
+            WorkflowStep(agent=SleepyAgent("b"), depends_on=["a"]),
+        ])
+
+    with pytest.raises(ValueError):
+        Orchestrator(steps=[WorkflowStep(agent=SleepyAgent("a"), depends_on=["nope"])])
+
+
+if __name__ == "__main__":
+    test_independent_steps_run_in_parallel()
+    test_dag_fail_fast_stops_scheduling()
+    test_dag_rejects_cycles_and_unknown_deps()
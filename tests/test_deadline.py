@@ -0,0 +1,197 @@
+# deadlines: a workflow / step timeout bounds every llm call under it, and timeouts get their own status
+
+import asyncio
+import time
+from typing import Any, Dict
+
+import pytest
+
+from engine.agent_base import Agentinput, Agentoutput, BaseAgent
+from engine.deadline import Deadline, DeadlineExceeded, call_timeout, current_deadline, step_deadline, use_deadline
+from engine.llm_agent import LLMAgent
+from engine.orchestrator import AsyncOrchestrator, Orchestrator, WorkflowStep
+from engine.run_scope import open_scope
+from extensions.llm.base import BaseLLM, LLMServerError
+from extensions.llm.fake import FakeLLM
+from extensions.llm.http_provider import HTTPLLM, serve_llm
+from extensions.llm.retry_policy import BackoffPolicy, CircuitBreaker
+from extensions.llm.retry_wrapper import RetryLLM
+from extensions.llm.singleflight import SingleFlightLLM
+
+INPUT = {"payload": {}, "metadata": {}}
+
+
+class EchoAgent(LLMAgent):
+    def build_prompt(self, validated_input: Agentinput, context: Dict[str, Any]) -> str:
+        return self.name
+
+    def parse_response(self, llm_response: Dict[str, Any], validated_input: Agentinput) -> Agentoutput:
+        return Agentoutput(output=llm_response)
+
+
+class DeafLLM(BaseLLM):
+    """ignores deadlines, so only the orchestrator cancelling it ends a slow call"""
+
+    def __init__(self, latencies):
+        self.latencies = list(latencies)
+        self.calls = 0
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        return {"ok": 1}
+
+    async def agenerate_json(self, prompt: str) -> Dict[str, Any]:
+        self.calls += 1
+        await asyncio.sleep(self.latencies.pop(0))
+        return {"ok": 1}
+
+
+class SleepyAgent(BaseAgent):
+    def execute(self, validated_input: Agentinput, context: Dict[str, Any]) -> Agentoutput:
+        time.sleep(0.06)
+        return Agentoutput(output={"ok": 1})
+
+
+class HungAgent(BaseAgent):
+    """blocks without ever looking at the deadline, like a stuck tool call"""
+
+    def execute(self, validated_input: Agentinput, context: Dict[str, Any]) -> Agentoutput:
+        time.sleep(1.0)
+        return Agentoutput(output={"late": True})
+
+    async def aexecute(self, validated_input: Agentinput, context: Dict[str, Any]) -> Agentoutput:
+        await asyncio.sleep(1.0)
+        return Agentoutput(output={"late": True})
+
+
+def test_nested_deadlines_only_tighten():
+    with use_deadline(Deadline(1.0, "outer")):
+        assert step_deadline(5.0, "inner").what == "outer"
+        with use_deadline(step_deadline(0.01, "inner")):
+            assert current_deadline().what == "inner"
+            assert call_timeout(30.0) <= 0.01
+            time.sleep(0.02)
+            with pytest.raises(DeadlineExceeded, match="inner of 0.01s exceeded"):
+                call_timeout(30.0)
+        assert call_timeout(30.0) <= 1.0
+
+    assert call_timeout(30.0) == 30.0 and step_deadline(None, "x") is None
+
+
+def test_slow_llm_step_is_recorded_as_timeout():
+    steps = [
+        WorkflowStep(agent=EchoAgent(name="fast", llm=FakeLLM(response={"ok": 1}))),
+        WorkflowStep(agent=EchoAgent(name="slow", llm=FakeLLM(latency=1.0)), timeout_s=0.05),
+    ]
+
+    started = time.perf_counter()
+    result = Orchestrator(steps=steps).run(INPUT)
+
+    assert time.perf_counter() - started < 0.5
+    assert result["status"] == "error"
+    assert [rec.status for rec in result["rec_history"]] == ["success", "timeout"]
+    assert result["rec_history"][1].error.startswith("DeadlineExceeded: ")
+
+
+def test_workflow_deadline_stops_before_the_next_step():
+    steps = [WorkflowStep(agent=SleepyAgent(name=f"s{i}")) for i in range(5)]
+
+    result = Orchestrator(steps=steps, timeout_s=0.1).run(INPUT)
+
+    assert result["status"] == "error"
+    assert result["error"].startswith("DeadlineExceeded: workflow deadline of 0.1s")
+    assert len(result["rec_history"]) == 2   # the second step still finished within the grace
+    assert all(rec.status == "success" for rec in result["rec_history"])
+
+
+def test_hung_step_is_given_up_on():
+    failed = []
+    hung = HungAgent(name="hung")
+    hung.add_hook("on_error", lambda agent, record: failed.append(record.status))
+
+    started = time.perf_counter()
+    result = Orchestrator(steps=[WorkflowStep(agent=hung, timeout_s=0.05)]).run(INPUT)
+
+    assert time.perf_counter() - started < 0.5
+    assert result["rec_history"][0].status == "timeout"
+    assert failed == ["timeout"]
+
+
+def test_dag_gives_up_on_a_hung_branch_without_waiting_for_it():
+    steps = [
+        WorkflowStep(agent=EchoAgent(name="root", llm=FakeLLM(response={"ok": 1})), depends_on=[]),
+        WorkflowStep(agent=HungAgent(name="hung"), depends_on=["root"], timeout_s=0.05),
+        WorkflowStep(agent=EchoAgent(name="side", llm=FakeLLM(response={"ok": 1})), depends_on=["root"]),
+    ]
+
+    started = time.perf_counter()
+    result = Orchestrator(steps=steps).run(INPUT)
+
+    assert time.perf_counter() - started < 0.5
+    assert [rec.status for rec in result["rec_history"]] == ["success", "timeout", "success"]
+    assert result["status"] == "error"
+
+
+def test_async_steps_are_cancelled_at_their_deadline():
+    steps = [
+        WorkflowStep(agent=EchoAgent(name="slow", llm=FakeLLM(latency=1.0)), timeout_s=0.05),
+    ]
+    hung = [WorkflowStep(agent=HungAgent(name="hung"), timeout_s=0.05)]
+
+    async def main():
+        return await asyncio.gather(AsyncOrchestrator(steps=steps).arun(INPUT), AsyncOrchestrator(steps=hung).arun(INPUT))
+
+    started = time.perf_counter()
+    slow, stuck = asyncio.run(main())
+
+    assert time.perf_counter() - started < 0.5
+    assert slow["rec_history"][0].status == "timeout" and stuck["rec_history"][0].status == "timeout"
+
+
+def test_cancelled_async_step_leaves_the_llm_chain_healthy():
+    # the timed out run leads a shared call that is also a half open breaker probe
+    inner = DeafLLM([1.0, 0.0])
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout_s=0.0)
+    llm = SingleFlightLLM(RetryLLM(inner, max_attempts=2, policy=BackoffPolicy.fixed(0.0), breaker=breaker))
+    breaker.record_failure(LLMServerError("500"))
+
+    timed = AsyncOrchestrator(steps=[WorkflowStep(agent=EchoAgent(name="echo", llm=llm), timeout_s=0.05)])
+    waiting = AsyncOrchestrator(steps=[WorkflowStep(agent=EchoAgent(name="echo", llm=llm))])
+
+    async def late():
+        await asyncio.sleep(0.02)   # joins the timed out run's call
+        return await waiting.arun(INPUT)
+
+    async def main():
+        return await asyncio.gather(timed.arun(INPUT), late())
+
+    cut, shared = asyncio.run(main())
+
+    assert cut["rec_history"][0].status == "timeout"
+    assert shared["status"] == "success"   # not CancelledError, not "probe already in flight"
+    assert inner.calls == 2 and breaker.state == CircuitBreaker.CLOSED
+
+
+def test_retries_stop_when_the_deadline_cant_be_met():
+    llm = RetryLLM(FakeLLM(failure_rate=1.0), max_attempts=5, policy=BackoffPolicy.fixed(1.0))
+
+    started = time.perf_counter()
+    with use_deadline(Deadline(0.2)), open_scope() as scope:
+        with pytest.raises(DeadlineExceeded) as raised:
+            llm.generate_json("x")
+
+    assert time.perf_counter() - started < 0.1   # no 1s sleep that would end past the deadline
+    assert "LLMServerError" in repr(raised.value.__cause__)
+    assert scope.extra["retry"]["attempts"] == 1 and scope.extra["retry"]["deadline"] == 1
+
+
+def test_http_requests_time_out_at_the_deadline():
+    server = serve_llm(FakeLLM(latency=1.0), port=0)
+    llm = HTTPLLM(f"http://127.0.0.1:{server.server_address[1]}", timeout=30.0)
+
+    try:
+        started = time.perf_counter()
+        with use_deadline(Deadline(0.1)), pytest.raises(DeadlineExceeded):
+            llm.generate_json("x")
+        assert time.perf_counter() - started < 0.5
+    finally:
+        server.shutdown()
@@ -0,0 +1,94 @@
+# FakeLLM: deterministic latency / failures, usage reporting, streaming
+
+import asyncio
+import time
+
+import pytest
+
+from engine.agent_base import Agentinput, Agentoutput
+from engine.llm_agent import LLMAgent
+from extensions.llm.base import LLMServerError
+from extensions.llm.fake import FakeLLM
+
+
+class EchoAgent(LLMAgent):
+
+    def build_prompt(self, validated_input: Agentinput, context: dict) -> str:
+        return "prompt " * 40
+
+    def parse_response(self, llm_response: dict, validated_input: Agentinput) -> Agentoutput:
+        return Agentoutput(output=llm_response)
+
+
+def outcomes(llm: FakeLLM, calls: int) -> list:
+    result = []
+    for _ in range(calls):
+        try:
+            llm.generate_json("x")
+            result.append("ok")
+        except LLMServerError:
+            result.append("fail")
+    return result
+
+
+def test_same_seed_same_failures():
+    first = outcomes(FakeLLM(failure_rate=0.3, seed=7), 50)
+    second = outcomes(FakeLLM(failure_rate=0.3, seed=7), 50)
+
+    assert first == second
+    assert 5 <= first.count("fail") <= 25
+
+
+def test_generated_response_size():
+    response = FakeLLM(response_fields=5, field_chars=64).generate_json("x")
+
+    assert len(response) == 5
+    assert all(len(value) == 64 for value in response.values())
+
+
+def test_fixed_response_is_copied_per_call():
+    llm = FakeLLM(response={"items": [1]})
+    llm.generate_json("x")["items"].append(2)
+
+    assert llm.generate_json("x") == {"items": [1]}
+
+
+def test_latency_distributions():
+    draws = lambda llm: [llm._draw()[0] for _ in range(200)]
+
+    assert set(draws(FakeLLM(latency=0.01))) == {0.01}
+    assert all(0.005 <= d <= 0.015 for d in draws(FakeLLM(latency=0.01, jitter=0.005, distribution="uniform")))
+    assert max(draws(FakeLLM(latency=0.01, jitter=1.0, distribution="lognormal"))) > 0.02   # long tail
+
+    with pytest.raises(ValueError):
+        FakeLLM(distribution="poisson")
+
+
+def test_latency_is_applied_sync_and_async():
+    llm = FakeLLM(latency=0.05)
+
+    start = time.perf_counter()
+    llm.generate_json("x")
+    assert time.perf_counter() - start >= 0.05
+
+    start = time.perf_counter()
+    asyncio.run(llm.agenerate_json("x"))
+    assert time.perf_counter() - start >= 0.05
+
+
+def test_usage_is_reported_to_the_record():
+    _, record = EchoAgent(name="echo", llm=FakeLLM()).run({"payload": {}, "metadata": {}})
+
+    assert record.status == "success"
+    assert record.extra["usage"]["llm_calls"] == 1
+    assert record.tokens_used > 0
+
+
+def test_streams_fields_one_by_one():
+    llm = FakeLLM(response={"a": 1, "b": 2, "c": 3}, latency=0.03)
+
+    start = time.perf_counter()
+    first = next(iter(llm.stream_json("x")))
+
+    assert first == ("a", 1)
+    assert time.perf_counter() - start < 0.03   # first field before the full latency
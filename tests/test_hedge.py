@@ -0,0 +1,137 @@
+# hedged requests: a slow call gets a second identical request, the first answer wins, the hedge rate is capped
+
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List
+
+import pytest
+
+from engine.agent_base import Agentinput, Agentoutput
+from engine.llm_agent import LLMAgent
+from extensions.llm.base import BaseLLM, LLMServerError
+from extensions.llm.hedge import HedgedLLM
+
+
+class ScriptedLLM(BaseLLM):
+    """call n sleeps delays[n] (last one repeats), optionally fails instead of answering"""
+
+    def __init__(self, delays: List[float], fail_calls: tuple = ()):
+        self.delays = delays
+        self.fail_calls = fail_calls
+        self.calls = 0
+        self.cancelled = 0
+        self._lock = threading.Lock()
+
+    def _next(self):
+        with self._lock:
+            n = self.calls
+            self.calls += 1
+        return n, self.delays[min(n, len(self.delays) - 1)]
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        n, delay = self._next()
+        time.sleep(delay)
+        if n in self.fail_calls:
+            raise LLMServerError(f"call {n} failed")
+        return {"call": n}
+
+    async def agenerate_json(self, prompt: str) -> Dict[str, Any]:
+        n, delay = self._next()
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if n in self.fail_calls:
+            raise LLMServerError(f"call {n} failed")
+        return {"call": n}
+
+
+class EchoAgent(LLMAgent):
+    def build_prompt(self, validated_input: Agentinput, context: Dict[str, Any]) -> str:
+        return "p"
+
+    def parse_response(self, llm_response: Dict[str, Any], validated_input: Agentinput) -> Agentoutput:
+        return Agentoutput(output=llm_response)
+
+
+def test_fast_calls_are_not_hedged_and_feed_the_window():
+    inner = ScriptedLLM([0.001])
+    llm = HedgedLLM(inner, min_samples=5, initial_delay=1.0, min_delay=0.0)
+
+    for _ in range(10):
+        llm.generate_json("p")
+
+    stats = llm.stats()
+    assert inner.calls == 10
+    assert stats["calls"] == 10 and stats["hedged"] == 0
+    assert stats["delay_s"] < 0.05  # learned from the window, no longer the initial delay
+
+
+def test_slow_primary_is_beaten_by_the_hedge():
+    inner = ScriptedLLM([0.5, 0.01])
+    llm = HedgedLLM(inner, initial_delay=0.05)
+    agent = EchoAgent(name="a", llm=llm)
+
+    started = time.monotonic()
+    output, record = agent.run({"payload": {}, "metadata": {}})
+
+    assert time.monotonic() - started < 0.3
+    assert output.output == {"call": 1}
+    assert record.extra["hedge"]["hedged"] == 1 and record.extra["hedge"]["hedge_wins"] == 1
+    assert llm.stats()["hedge_wins"] == 1
+
+
+def test_async_loser_is_cancelled():
+    inner = ScriptedLLM([0.5, 0.01])
+    llm = HedgedLLM(inner, initial_delay=0.05)
+
+    result = asyncio.run(llm.agenerate_json("p"))
+
+    assert result == {"call": 1}
+    assert inner.cancelled == 1
+
+
+def test_primary_still_wins_when_it_answers_first():
+    inner = ScriptedLLM([0.1, 0.5])
+    llm = HedgedLLM(inner, initial_delay=0.05)
+
+    assert asyncio.run(llm.agenerate_json("p")) == {"call": 0}
+    assert llm.stats()["primary_wins"] == 1
+
+
+def test_hedge_rate_is_capped():
+    inner = ScriptedLLM([0.03])
+    llm = HedgedLLM(inner, initial_delay=0.01, min_delay=0.0, min_samples=20, max_hedge_rate=0.1)
+
+    for _ in range(10):
+        llm.generate_json("p")
+
+    stats = llm.stats()
+    assert stats["hedged"] == 2 and stats["suppressed"] == 8
+    assert stats["hedge_rate"] == pytest.approx(0.2)
+
+
+def test_failed_primary_falls_back_to_the_hedge():
+    inner = ScriptedLLM([0.1, 0.2], fail_calls=(0,))
+    llm = HedgedLLM(inner, initial_delay=0.05)
+
+    assert llm.generate_json("p") == {"call": 1}
+
+
+def test_fast_failure_is_raised_without_a_hedge():
+    inner = ScriptedLLM([0.0], fail_calls=(0,))
+    llm = HedgedLLM(inner, initial_delay=0.5)
+
+    with pytest.raises(LLMServerError):
+        llm.generate_json("p")
+    assert inner.calls == 1
+
+
+def test_both_failing_raises_the_primary_error():
+    inner = ScriptedLLM([0.1, 0.0], fail_calls=(0, 1))
+    llm = HedgedLLM(inner, initial_delay=0.05)
+
+    with pytest.raises(LLMServerError, match="call 0"):
+        asyncio.run(llm.agenerate_json("p"))
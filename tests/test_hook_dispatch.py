@@ -0,0 +1,198 @@
+# background hook dispatch: deferrable observers leave the critical path, guardrails stay inline, nothing is lost on close
+
+import asyncio
+import threading
+from typing import Any, Dict
+
+import pytest
+
+from engine.agent_base import Agentinput, Agentoutput, BaseAgent
+from engine.guardrails import GuardrailViolation
+from engine.hook_dispatch import BackgroundDispatcher
+from engine.hooks import BaseHook, HookManager
+from engine.orchestrator import AsyncOrchestrator, Orchestrator, WorkflowStep
+
+
+class EchoAgent(BaseAgent):
+    def execute(self, validated_input: Agentinput, context: Dict[str, Any]) -> Agentoutput:
+        return Agentoutput(output=validated_input.payload)
+
+
+class RecordingHook(BaseHook):
+    """deferrable observer, can be held up by a gate to simulate a slow sink"""
+
+    deferrable = True
+
+    def __init__(self, gate: threading.Event | None = None):
+        self.gate = gate
+        self.events = []
+        self.threads = set()
+
+    def _seen(self, event: str) -> None:
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.threads.add(threading.current_thread().name)
+        self.events.append(event)
+
+    def on_workflow_start(self, initial_input: dict) -> None:
+        self._seen("start")
+
+    def after_agent_run(self, agent: Any, agent_output: Any, record: Any) -> None:
+        self._seen(f"after:{agent.name}")
+
+    def on_workflow_end(self, result: dict, rec_history: list) -> None:
+        self._seen("end")
+
+
+class BlockingGuardrail(BaseHook):
+    def before_agent_run(self, agent: Any, agent_input: dict) -> None:
+        if agent.name == "b":
+            raise GuardrailViolation("b is not allowed")
+
+
+def steps():
+    return [WorkflowStep(agent=EchoAgent(name="a")), WorkflowStep(agent=EchoAgent(name="b"))]
+
+
+INPUT = {"payload": {"x": 1}, "metadata": {}}
+
+
+def test_deferrable_hooks_run_on_the_worker_in_order():
+    hook = RecordingHook()
+    manager = HookManager([hook], background=True)
+
+    result = Orchestrator(steps=steps(), hook_manager=manager).run(INPUT)
+    assert manager.close(timeout=5)
+
+    assert result["status"] == "success"
+    assert hook.events == ["start", "after:a", "after:b", "end"]
+    assert hook.threads == {"zap-hook-dispatch"}
+    assert manager.dispatch_stats()["processed"] == 4
+
+
+def test_slow_observer_does_not_hold_up_the_workflow():
+    gate = threading.Event()
+    hook = RecordingHook(gate)
+    manager = HookManager([hook], background=True)
+
+    result = Orchestrator(steps=steps(), hook_manager=manager).run(INPUT)
+
+    # the run finished while the hook is still stuck on its first event
+    assert result["status"] == "success"
+    assert hook.events == []
+
+    gate.set()
+    assert manager.flush(timeout=5)
+    assert hook.events == ["start", "after:a", "after:b", "end"]
+    manager.close()
+
+
+def test_guardrails_still_stop_the_run_in_background_mode():
+    hook = RecordingHook()
+    manager = HookManager([BlockingGuardrail(), hook], background=True)
+
+    with pytest.raises(GuardrailViolation):
+        Orchestrator(steps=steps(), hook_manager=manager).run(INPUT)
+
+    manager.close(timeout=5)
+    assert hook.events == ["start", "after:a"]
+
+
+def test_non_deferrable_hooks_stay_inline():
+    hook = RecordingHook()
+    hook.deferrable = False
+    manager = HookManager([hook], background=True)
+
+    Orchestrator(steps=steps(), hook_manager=manager).run(INPUT)
+
+    assert hook.events == ["start", "after:a", "after:b", "end"]
+    assert hook.threads == {threading.current_thread().name}
+    assert manager.dispatch_stats()["submitted"] == 0
+    manager.close()
+
+
+def test_async_orchestrator_defers_async_hooks_too():
+    class AsyncRecordingHook(RecordingHook):
+        async def on_workflow_end(self, result: dict, rec_history: list) -> None:
+            await asyncio.sleep(0)
+            self._seen("end")
+
+    hook = AsyncRecordingHook()
+    manager = HookManager([hook], background=True)
+
+    asyncio.run(AsyncOrchestrator(steps=steps(), hook_manager=manager).arun(INPUT))
+    manager.close(timeout=5)
+
+    assert hook.events == ["start", "after:a", "after:b", "end"]
+
+
+def blocked_dispatcher(overflow: str, max_queue: int, **kw):
+    """dispatcher whose worker is stuck on a first event until the returned gate opens"""
+    gate = threading.Event()
+    started = threading.Event()
+    handled = []
+
+    def first():
+        started.set()
+        gate.wait(5)
+
+    dispatcher = BackgroundDispatcher(max_queue=max_queue, overflow=overflow, **kw)
+    dispatcher.submit("first", first, ())
+    assert started.wait(5)
+    return dispatcher, gate, handled
+
+
+def test_drop_oldest_keeps_the_newest_events():
+    dispatcher, gate, handled = blocked_dispatcher("drop_oldest", max_queue=3)
+
+    for i in range(10):
+        assert dispatcher.submit("event", handled.append, (i,))
+
+    gate.set()
+    assert dispatcher.close(timeout=5)
+    assert handled == [7, 8, 9]
+    assert dispatcher.stats()["dropped"] == 7
+
+
+def test_sample_keeps_every_nth_event_under_pressure():
+    dispatcher, gate, handled = blocked_dispatcher("sample", max_queue=10, sample_every=3)
+
+    accepted = [dispatcher.submit("event", handled.append, (i,)) for i in range(20)]
+
+    gate.set()
+    dispatcher.close(timeout=5)
+
+    # first 5 fill half the queue, then one in three gets in until it is full
+    assert handled == [0, 1, 2, 3, 4, 7, 10, 13, 16, 19]
+    assert accepted.count(False) == dispatcher.stats()["dropped"] == 10
+
+
+def test_block_waits_for_room_and_loses_nothing():
+    dispatcher, gate, handled = blocked_dispatcher("block", max_queue=2)
+
+    producer = threading.Thread(target=lambda: [dispatcher.submit("event", handled.append, (i,)) for i in range(6)])
+    producer.start()
+    producer.join(0.2)
+    assert producer.is_alive()  # stuck on the full queue
+
+    gate.set()
+    producer.join(5)
+    assert dispatcher.close(timeout=5)
+    assert handled == list(range(6))
+    assert dispatcher.stats()["dropped"] == 0
+
+
+def test_hook_errors_are_counted_not_raised():
+    dispatcher = BackgroundDispatcher()
+
+    dispatcher.submit("boom", lambda: 1 / 0, ())
+    dispatcher.close(timeout=5)
+
+    assert dispatcher.stats()["errors"] == 1
+    with pytest.raises(RuntimeError):
+        dispatcher.submit("late", print, ())
+
+
+def test_unknown_overflow_policy_is_rejected():
+    with pytest.raises(ValueError):
+        HookManager([], background=True, overflow="drop_newest")
@@ -0,0 +1,113 @@
+# structured output: schemas travel with the prompt, almost-json answers are recovered without another call
+
+import pickle
+from typing import Any, Dict
+
+import pytest
+
+from engine.agent_base import Agentinput, Agentoutput
+from engine.llm_agent import LLMAgent
+from engine.prompts import PromptTemplate, response_schema
+from extensions.llm.base import LLMResponseParseError
+from extensions.llm.batching import PackedBatchLLM
+from extensions.llm.fake import MALFORMED_STYLES, FakeLLM, malformed_text
+from extensions.llm.json_repair import json_parse_stats, parse_llm_json, reset_json_parse_stats
+from extensions.llm.retry_policy import CircuitBreaker, is_retryable
+
+ANSWER = {"headline": "Grow faster", "benefits": [{"title": "Automation", "description": "No manual work"}], "cta": "Start"}
+
+TEMPLATE = PromptTemplate(
+    "test.outline",
+    instructions="Write an outline.",
+    body="Product: {product}",
+    response_schema=response_schema({"headline": str, "benefits": [{"title": str, "description": str}], "cta": str}),
+)
+
+
+class OutlineAgent(LLMAgent):
+    def build_prompt(self, validated_input: Agentinput, context: Dict[str, Any]) -> str:
+        return TEMPLATE.render(product=validated_input.payload["product"])
+
+    def parse_response(self, llm_response: Dict[str, Any], validated_input: Agentinput) -> Agentoutput:
+        return Agentoutput(output=llm_response)
+
+
+@pytest.mark.parametrize("text, outcome", [
+    ('{"a": 1}', "clean"),
+    ('```json\n{"a": 1}\n```', "extracted"),
+    ('Sure, here you go: {"a": 1} Anything else?', "extracted"),
+    ('{"a": [1, 2,], "b": True,}', "repaired"),
+    ('{“a”: “x”}', "repaired"),
+    ('{"a": "two\nlines"}', "repaired"),
+])
+def test_answers_are_extracted_or_repaired(text, outcome):
+    reset_json_parse_stats()
+
+    assert parse_llm_json(text)["a"] in (1, [1, 2], "x", "two\nlines")
+    assert json_parse_stats()[outcome] == 1
+
+
+def test_truncated_answers_keep_what_is_complete():
+    assert parse_llm_json('{"a": [1, 2], "b": "cut of') == {"a": [1, 2], "b": "cut of"}
+    assert parse_llm_json('{"a": [1, 2], "b":') == {"a": [1, 2]}
+    assert parse_llm_json('{"a": {"b": 1, "c": [{"d": 2}, {"e') == {"a": {"b": 1, "c": [{"d": 2}]}}
+
+
+def test_string_contents_are_left_alone():
+    assert parse_llm_json('Result: {"a": "x, }", "b": "say “hi”", "c": "None"}') == {"a": "x, }", "b": "say “hi”", "c": "None"}
+
+
+def test_unrecoverable_answers_raise_a_retryable_error_the_breaker_ignores():
+    reset_json_parse_stats()
+    breaker = CircuitBreaker(failure_threshold=1)
+
+    with pytest.raises(LLMResponseParseError) as raised:
+        parse_llm_json("I cannot help with that.")
+
+    assert is_retryable(raised.value)
+    breaker.record_failure(raised.value)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert json_parse_stats()["failure_rate"] == 1.0
+
+
+def test_every_malformed_style_is_recovered():
+    for style in MALFORMED_STYLES:
+        recovered = parse_llm_json(malformed_text(ANSWER, style))
+        assert recovered["headline"] == ANSWER["headline"]
+
+
+def test_outcomes_land_in_the_record():
+    agent = OutlineAgent(name="outline", llm=FakeLLM(response=ANSWER, malformed_rate=1.0))
+
+    output, record = agent.run({"payload": {"product": "CRM"}, "metadata": {}})
+
+    assert record.status == "success" and output.output["headline"] == "Grow faster"
+    assert sum(record.extra["json"].values()) == 1
+    assert set(record.extra["json"]) <= {"extracted", "repaired"}
+
+
+def test_schema_travels_with_the_prompt():
+    prompt = TEMPLATE.render(product="CRM")
+
+    assert prompt.schema["required"] == ["headline", "benefits", "cta"]
+    assert prompt.schema["properties"]["benefits"] == {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": {"title": {"type": "string"}, "description": {"type": "string"}},
+            "required": ["title", "description"],
+        },
+    }
+    assert pickle.loads(pickle.dumps(prompt)).schema == prompt.schema
+    with pytest.raises(ValueError, match="unsupported"):
+        response_schema({"when": object})
+
+
+def test_packed_prompts_wrap_the_shared_schema():
+    seen = []
+    llm = PackedBatchLLM(FakeLLM(response=lambda p: seen.append(p) or {"results": []}))
+
+    llm.generate_json_batch([TEMPLATE.render(product=p) for p in ("a", "b")])
+
+    entry = seen[0].schema["properties"]["results"]["items"]
+    assert entry["properties"]["output"] == TEMPLATE.response_schema
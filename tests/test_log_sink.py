@@ -0,0 +1,174 @@
+# structured logs: one json line per event, nothing serialized below the level, payloads clipped, files rotated
+
+import io
+import json
+from typing import Any, Dict
+
+import pytest
+
+from engine.agent_base import Agentinput, Agentoutput, BaseAgent
+from engine.hooks import BaseHook, HookManager
+from engine.log_sink import LogSink, get_sink, set_sink
+from engine.orchestrator import Orchestrator, WorkflowStep
+from extensions.hooks.logging_hook import LoggingHook
+
+
+class EchoAgent(BaseAgent):
+    def execute(self, validated_input: Agentinput, context: Dict[str, Any]) -> Agentoutput:
+        return Agentoutput(output=validated_input.payload)
+
+
+class FailingAgent(BaseAgent):
+    def execute(self, validated_input: Agentinput, context: Dict[str, Any]) -> Agentoutput:
+        raise ValueError("boom")
+
+
+class Expensive:
+    """counts how often it gets turned into text"""
+
+    def __init__(self):
+        self.rendered = 0
+
+    def __str__(self) -> str:
+        self.rendered += 1
+        return "expensive"
+
+
+def lines(stream: io.StringIO):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+@pytest.fixture
+def captured():
+    stream = io.StringIO()
+    previous = set_sink(LogSink(stream=stream, level="debug"))
+    yield stream
+    set_sink(previous)
+
+
+def test_one_compact_json_line_per_event():
+    stream = io.StringIO()
+    sink = LogSink(stream=stream)
+
+    sink.info("agent.end", agent="a", output={"x": [1, 2]})
+
+    raw = stream.getvalue()
+    assert raw.count("\n") == 1 and "  " not in raw
+    entry = json.loads(raw)
+    assert entry["level"] == "info" and entry["event"] == "agent.end"
+    assert entry["output"] == {"x": [1, 2]}
+
+
+def test_events_below_the_level_are_never_serialized():
+    stream = io.StringIO()
+    sink = LogSink(stream=stream, level="warning")
+    value = Expensive()
+
+    sink.info("agent.start", value=value)
+    sink.debug("agent.partial", value=value)
+    sink.warning("budget.low", value=value)
+
+    assert value.rendered == 1
+    assert [e["event"] for e in lines(stream)] == ["budget.low"]
+    assert not sink.enabled("info") and sink.enabled("error")
+
+
+def test_payloads_are_truncated_and_redacted():
+    stream = io.StringIO()
+    sink = LogSink(stream=stream, max_field_chars=5, max_items=2, max_depth=2, redact_keys=["API_KEY"])
+
+    sink.info(
+        "x",
+        text="abcdefgh",
+        items=[1, 2, 3, 4],
+        config={"api_key": "secret", "Api_Key": "secret", "model": "m"},
+        deep={"a": {"b": {"c": 1}}},
+    )
+
+    entry = lines(stream)[0]
+    assert entry["text"] == "abcde…[+3 chars]"
+    assert entry["items"] == [1, 2, "…+2 items"]
+    assert entry["config"] == {"api_key": "[redacted]", "Api_Key": "[redacted]", "…": "+1 keys"}
+    assert entry["deep"] == {"a": {"b": "[dict with 1 keys]"}}
+
+
+def test_sampling_keeps_one_in_n_but_never_drops_errors():
+    stream = io.StringIO()
+    sink = LogSink(stream=stream, sample={"agent.partial": 3, "agent.error": 3})
+
+    for i in range(7):
+        sink.info("agent.partial", i=i)
+    for i in range(2):
+        sink.error("agent.error", i=i)
+
+    entries = lines(stream)
+    assert [e["i"] for e in entries if e["event"] == "agent.partial"] == [0, 3, 6]
+    assert len([e for e in entries if e["event"] == "agent.error"]) == 2
+    assert sink.stats()["sampled_out"] == 4
+
+
+def test_file_output_is_rotated(tmp_path):
+    path = tmp_path / "logs" / "run.jsonl"
+    sink = LogSink(path=str(path), max_bytes=200, backups=2)
+
+    for i in range(30):
+        sink.info("tick", i=i, pad="x" * 40)
+    sink.close()
+
+    assert sink.stats()["rotations"] > 2
+    assert sorted(p.name for p in path.parent.iterdir()) == ["run.jsonl", "run.jsonl.1", "run.jsonl.2"]
+    newest = (path.parent / "run.jsonl.1").read_text() + path.read_text()
+    assert [json.loads(line)["i"] for line in newest.splitlines()][-1] == 29
+
+
+def test_logging_hook_writes_lifecycle_events(captured):
+    steps = [WorkflowStep(agent=EchoAgent(name="a")), WorkflowStep(agent=EchoAgent(name="b"))]
+    hooks = HookManager([LoggingHook(payloads=False)])
+
+    Orchestrator(steps=steps, hook_manager=hooks).run({"payload": {"x": 1}, "metadata": {}})
+
+    events = [(e["event"], e.get("agent")) for e in lines(captured)]
+    assert events == [
+        ("workflow.start", None),
+        ("orchestrator.step", "a"), ("agent.start", "a"), ("agent.end", "a"),
+        ("orchestrator.step", "b"), ("agent.start", "b"), ("agent.end", "b"),
+        ("workflow.end", None),
+    ]
+    assert "input" not in lines(captured)[2]
+
+
+def test_logging_hook_keeps_payloads_out_of_errors(captured):
+    steps = [WorkflowStep(agent=FailingAgent(name="failing"))]
+
+    Orchestrator(steps=steps, hook_manager=HookManager([LoggingHook(payloads=False)])).run({"payload": {"secret": "s3cr3t"}, "metadata": {}})
+
+    error = [e for e in lines(captured) if e["event"] == "agent.error"][0]
+    assert error["record"]["status"] == "error" and error["record"]["agent_name"] == "failing"
+    assert "input" not in error["record"] and "s3cr3t" not in captured.getvalue()
+
+
+def test_hook_errors_go_to_the_sink(captured):
+    class Broken(BaseHook):
+        def on_workflow_start(self, initial_input: dict) -> None:
+            raise RuntimeError("boom")
+
+    HookManager([Broken()]).workflow_start({})
+
+    entry = lines(captured)[0]
+    assert entry["level"] == "error" and entry["event"] == "hook.error"
+    assert entry["hook"] == "Broken" and "boom" in entry["error"]
+
+
+def test_default_sink_is_shared_and_replaceable():
+    sink = get_sink()
+    assert get_sink() is sink
+
+    replacement = LogSink(stream=io.StringIO())
+    assert set_sink(replacement) is sink
+    assert get_sink() is replacement
+    set_sink(sink)
+
+
+def test_unknown_level_is_rejected():
+    with pytest.raises(ValueError):
+        LogSink(level="verbose")
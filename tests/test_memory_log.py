@@ -0,0 +1,97 @@
+# append only memory store self test
+
+import json
+import multiprocessing
+import os
+
+from engine.agent_base import Agentoutput, BaseAgent
+from engine.hooks import HookManager
+from engine.memory import AppendOnlyLogBackend, MemoryStore
+from engine.orchestrator import Orchestrator, WorkflowStep
+from extensions.hooks.memory_hook import MemoryHook
+from tests.test_memory import make_dummy_record
+
+
+class DoneAgent(BaseAgent):
+    def execute(self, validated_input, context):
+        return Agentoutput(output={"done": True})
+
+
+def _save_many(log_dir: str, count: int):
+    store = MemoryStore(append_only=True, log_dir=log_dir, file_path=os.path.join(log_dir, "legacy.json"))
+    for i in range(count):
+        store.save_workflow_run([make_dummy_record(f"proc_{os.getpid()}", i)])
+
+
+def test_concurrent_processes_lose_nothing(tmp_path):
+    log_dir = str(tmp_path / "log")
+    AppendOnlyLogBackend(log_dir)
+
+    procs = [multiprocessing.Process(target=_save_many, args=(log_dir, 50)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+
+    store = MemoryStore(append_only=True, log_dir=log_dir, file_path=str(tmp_path / "legacy.json"))
+    assert sum(1 for _ in store.iter_runs()) == 200
+
+
+def test_segments_rotate_and_latest_reads_tail(tmp_path):
+    store = MemoryStore(
+        file_path=str(tmp_path / "memory.json"),
+        append_only=True,
+        max_segment_bytes=2048,
+        fsync="always",
+    )
+
+    for i in range(30):
+        store.save_workflow_run([make_dummy_record("agent", i)])
+
+    segments = [n for n in os.listdir(tmp_path / "memory_log") if n.endswith(".jsonl")]
+    assert len(segments) > 1
+    assert store.get_latest()["records"][0]["output"] == {"result": 29}
+    assert len(store.get_all_runs()) == 30
+
+    store.clear()
+    assert store.get_latest() is None
+
+
+def test_legacy_json_is_readable_and_migrates(tmp_path):
+    legacy_path = tmp_path / "memory.json"
+    old = MemoryStore(file_path=str(legacy_path))
+    old.save_workflow_run([make_dummy_record("old_agent", 1)])
+
+    store = MemoryStore(file_path=str(legacy_path), append_only=True)
+    store.save_workflow_run([make_dummy_record("new_agent", 2)])
+
+    names = [run["records"][0]["agent_name"] for run in store.iter_runs()]
+    assert names == ["old_agent", "new_agent"]
+
+    assert store.backend.migrate_legacy() == 1
+    assert not legacy_path.exists()
+    assert len(store.get_all_runs()) == 2
+
+    # each log line is compact json
+    segment = next((tmp_path / "memory_log").glob("*.jsonl"))
+    first_line = segment.read_text().splitlines()[0]
+    assert "\n" not in first_line and json.loads(first_line)["run_id"]
+
+
+def test_runs_are_found_by_the_workflow_run_id(tmp_path):
+    store = MemoryStore(file_path=str(tmp_path / "memory.json"), append_only=True)
+    orchestrator = Orchestrator(steps=[WorkflowStep(agent=DoneAgent(name="done"))], hook_manager=HookManager([MemoryHook(store)]))
+
+    result = orchestrator.run({"payload": {}, "metadata": {}})
+
+    run = store.get_run(result["run_id"])
+    assert run is not None and run["records"][0]["agent_name"] == "done"
+    assert store.query(run_id=result["run_id"])[0]["workflow_run_id"] == result["run_id"]
+
+
+if __name__ == "__main__":
+    import pathlib, tempfile
+    test_concurrent_processes_lose_nothing(pathlib.Path(tempfile.mkdtemp()))
+    test_segments_rotate_and_latest_reads_tail(pathlib.Path(tempfile.mkdtemp()))
+    test_legacy_json_is_readable_and_migrates(pathlib.Path(tempfile.mkdtemp()))
+    test_runs_are_found_by_the_workflow_run_id(pathlib.Path(tempfile.mkdtemp()))
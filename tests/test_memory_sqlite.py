@@ -0,0 +1,64 @@
+# sqlite memory backend self test
+
+import time
+
+from engine.memory import MemoryStore
+from engine.memory_sqlite import SQLiteMemoryBackend
+from extensions.hooks.memory_hook import MemoryHook
+from tests.test_memory import make_dummy_record
+
+
+def make_run(agent_statuses):
+    records = []
+    for name, status in agent_statuses:
+        rec = make_dummy_record(name, 1)
+        rec.status = status
+        records.append(rec)
+    return records
+
+
+def test_query_api_and_batched_inserts(tmp_path):
+    store = MemoryStore(backend=SQLiteMemoryBackend(str(tmp_path / "memory.sqlite")))
+
+    store.save_workflow_runs([
+        make_run([("marketing.input_validator", "success"), ("marketing.value_proposition", "error")]),
+        make_run([("marketing.input_validator", "success"), ("marketing.value_proposition", "success")]),
+        make_run([("marketing.input_validator", "success"), ("marketing.value_proposition", "error")]),
+    ])
+
+    failed = store.query(agent_name="marketing.value_proposition", status="error", since=time.time() - 3600)
+    assert len(failed) == 2
+    assert all(rec["status"] == "error" for rec in failed)
+
+    page = store.query(agent_name="marketing.input_validator", limit=2, offset=2)
+    assert len(page) == 1
+
+    run = store.get_run(failed[0]["workflow_run_id"])
+    assert [rec["agent_name"] for rec in run["records"]] == ["marketing.input_validator", "marketing.value_proposition"]
+
+    assert len(store.backend.query_runs(status="error")) == 2
+    assert len(store.get_all_runs()) == 3
+
+
+def test_memory_hook_works_with_sqlite_backend(tmp_path):
+    store = MemoryStore(backend=SQLiteMemoryBackend(str(tmp_path / "memory.sqlite")))
+    hook = MemoryHook(store)
+
+    history = make_run([("dummy_agent", "success")])
+    hook.on_workflow_end({"status": "success"}, history)
+
+    assert store.get_latest()["run_id"] == history[0].run_id
+
+
+def test_scan_fallback_matches_on_json_backend(tmp_path):
+    store = MemoryStore(file_path=str(tmp_path / "memory.json"))
+    store.save_workflow_run(make_run([("a", "success"), ("b", "error")]))
+
+    assert [rec["agent_name"] for rec in store.query(status="error")] == ["b"]
+
+
+if __name__ == "__main__":
+    import pathlib, tempfile
+    test_query_api_and_batched_inserts(pathlib.Path(tempfile.mkdtemp()))
+    test_memory_hook_works_with_sqlite_backend(pathlib.Path(tempfile.mkdtemp()))
+    test_scan_fallback_matches_on_json_backend(pathlib.Path(tempfile.mkdtemp()))
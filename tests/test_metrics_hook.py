@@ -0,0 +1,129 @@
+# metrics / tracing: histograms and counters per agent, workflow -> agent -> llm spans keyed by run_id, prometheus and otlp exports
+
+import json
+import urllib.request
+from typing import Any, Dict
+
+from engine.agent_base import Agentinput, Agentoutput
+from engine.hooks import HookManager
+from engine.llm_agent import LLMAgent
+from engine.orchestrator import Orchestrator, WorkflowStep
+from extensions.hooks.metrics_hook import MetricsHook, span_id_for, trace_id_for
+from extensions.llm.fake import FakeLLM
+from extensions.llm.tracing import TracingLLM
+
+
+class EchoAgent(LLMAgent):
+    def build_prompt(self, validated_input: Agentinput, context: Dict[str, Any]) -> str:
+        return self.name
+
+    def parse_response(self, llm_response: Dict[str, Any], validated_input: Agentinput) -> Agentoutput:
+        return Agentoutput(output=llm_response)
+
+
+INPUT = {"payload": {"x": 1}, "metadata": {}}
+
+
+def run_workflow(hook: MetricsHook, llm=None):
+    llm = llm or TracingLLM(FakeLLM(response={"ok": True}, model="fake-1"))
+    steps = [WorkflowStep(agent=EchoAgent(name="a", llm=llm)), WorkflowStep(agent=EchoAgent(name="b", llm=llm))]
+    return Orchestrator(steps=steps, hook_manager=HookManager([hook])).run(INPUT)
+
+
+def test_tracing_llm_records_each_call_in_the_run_scope():
+    llm = TracingLLM(FakeLLM(failure_rate=1.0, model="flaky"))
+    agent = EchoAgent(name="a", llm=llm)
+
+    _, record = agent.run(INPUT)
+
+    calls = record.extra["trace"]["llm_calls"]
+    assert len(calls) == 1
+    assert calls[0]["model"] == "flaky" and calls[0]["status"] == "error"
+    assert calls[0]["error"].startswith("LLMServerError")
+    assert calls[0]["end_ts"] >= calls[0]["start_ts"]
+
+
+def test_spans_link_workflow_agent_and_llm_calls():
+    hook = MetricsHook()
+
+    result = run_workflow(hook)
+
+    spans = hook.spans()
+    names = [s["name"] for s in spans]
+    assert names == ["workflow", "agent a", "llm fake-1", "agent b", "llm fake-1"]
+
+    trace_id = trace_id_for(result["run_id"])
+    assert {s["trace_id"] for s in spans} == {trace_id}
+
+    root, agent_a, llm_a = spans[0], spans[1], spans[2]
+    assert root["parent_span_id"] is None
+    assert agent_a["parent_span_id"] == root["span_id"]
+    assert agent_a["span_id"] == span_id_for(result["rec_history"][0].run_id)
+    assert llm_a["parent_span_id"] == agent_a["span_id"]
+
+
+def test_agent_counters_and_histograms():
+    hook = MetricsHook(buckets=(0.5, 1.0))
+
+    run_workflow(hook)
+    run_workflow(hook)
+    broken = TracingLLM(FakeLLM(failure_rate=1.0, model="fake-1"))
+    result = run_workflow(hook, llm=broken)
+
+    assert result["status"] == "error"
+    text = hook.prometheus_text()
+    assert 'zap_agent_runs_total{agent="a",status="success"} 2' in text
+    assert 'zap_agent_runs_total{agent="a",status="error"} 1' in text
+    assert 'zap_workflow_runs_total{status="error"} 1' in text
+    assert 'zap_llm_calls_total{model="fake-1",status="error"} 1' in text
+    assert 'zap_agent_duration_seconds_bucket{agent="b",le="+Inf"} 2' in text
+    assert 'zap_agent_duration_seconds_count{agent="a"} 3' in text
+    assert "# TYPE zap_agent_duration_seconds histogram" in text
+
+
+def test_prometheus_file_and_endpoint(tmp_path):
+    hook = MetricsHook()
+    run_workflow(hook)
+
+    path = tmp_path / "metrics.prom"
+    hook.write_prometheus(str(path))
+    assert "zap_agent_runs_total" in path.read_text()
+
+    server = hook.serve_prometheus(port=0)
+    try:
+        host, port = server.server_address[:2]
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as response:
+            assert response.status == 200
+            assert "zap_workflow_runs_total" in response.read().decode()
+    finally:
+        server.shutdown()
+
+
+def test_otlp_json_exports(tmp_path):
+    hook = MetricsHook()
+    result = run_workflow(hook)
+
+    traces = tmp_path / "traces.json"
+    assert hook.export_traces(str(traces)) == 5
+    assert hook.spans() == []  # drained
+
+    document = json.loads(traces.read_text())
+    spans = document["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert spans[0]["traceId"] == trace_id_for(result["run_id"])
+    assert "parentSpanId" not in spans[0] and spans[1]["parentSpanId"] == spans[0]["spanId"]
+    assert spans[1]["status"] == {"code": 1}
+    assert int(spans[1]["endTimeUnixNano"]) >= int(spans[1]["startTimeUnixNano"])
+
+    metrics_path = tmp_path / "metrics.json"
+    hook.export_metrics(str(metrics_path))
+    metrics = json.loads(metrics_path.read_text())["resourceMetrics"][0]["scopeMetrics"][0]["metrics"]
+    by_name = {m["name"]: m for m in metrics}
+    histogram = by_name["zap_agent_duration_seconds"]["histogram"]["dataPoints"][0]
+    assert len(histogram["bucketCounts"]) == len(histogram["explicitBounds"]) + 1
+    assert by_name["zap_agent_runs_total"]["sum"]["isMonotonic"] is True
+
+
+def test_non_uuid_run_ids_still_give_valid_ids():
+    assert len(trace_id_for("batch-42")) == 32
+    assert len(span_id_for("batch-42")) == 16
+    assert trace_id_for("batch-42") == trace_id_for("batch-42")
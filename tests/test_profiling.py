@@ -0,0 +1,116 @@
+# per-run profiling: opt-in via metadata, wall time split into llm wait / compute / framework, collapsed stacks across runs
+
+import asyncio
+from typing import Any, Dict
+
+from engine.agent_base import Agentinput, Agentoutput
+from engine.hooks import BaseHook, HookManager
+from engine.llm_agent import LLMAgent
+from engine.orchestrator import AsyncOrchestrator, Orchestrator, WorkflowStep
+from engine.profiling import ProfileOptions, ProfileReport
+from extensions.llm.fake import FakeLLM
+
+
+class EchoAgent(LLMAgent):
+    def build_prompt(self, validated_input: Agentinput, context: Dict[str, Any]) -> str:
+        return self.name
+
+    def parse_response(self, llm_response: Dict[str, Any], validated_input: Agentinput) -> Agentoutput:
+        return Agentoutput(output=llm_response)
+
+
+class SlowHook(BaseHook):
+    def after_agent_run(self, agent: Any, agent_output: Any, record: Any) -> None:
+        sum(range(20000))
+
+
+def profiled(flag: Any = True) -> Dict[str, Any]:
+    return {"payload": {"x": 1}, "metadata": {"profile": flag}}
+
+
+def test_runs_are_not_profiled_by_default():
+    agent = EchoAgent(name="a", llm=FakeLLM())
+
+    _, record = agent.run({"payload": {}, "metadata": {}})
+
+    assert "profile" not in record.extra
+
+
+def test_profiled_run_splits_wall_time():
+    agent = EchoAgent(name="a", llm=FakeLLM(latency=0.02))
+
+    _, record = agent.run(profiled())
+
+    profile = record.extra["profile"]
+    split = profile["split"]
+    assert split["llm_wait_s"] >= 0.02
+    assert split["llm_wait_s"] + split["compute_s"] + split["framework_s"] <= profile["wall_s"] + 1e-6
+    assert {"prepare", "execute", "build_prompt", "llm", "parse_response", "finalize"} <= set(profile["sections_s"])
+    assert "execute;llm" in profile["stacks"]
+    assert "cpu_top" not in profile and "memory" not in profile
+
+
+def test_failed_runs_keep_their_profile():
+    agent = EchoAgent(name="a", llm=FakeLLM(failure_rate=1.0))
+
+    _, record = agent.run(profiled())
+
+    assert record.status == "error"
+    assert "execute;llm" in record.extra["profile"]["stacks"]
+
+
+def test_cpu_and_memory_collectors():
+    agent = EchoAgent(name="a", llm=FakeLLM(response_fields=50, field_chars=2000))
+
+    _, record = agent.run(profiled("full"))
+
+    profile = record.extra["profile"]
+    assert any("generate_json" in row["function"] for row in profile["cpu_top"])
+    assert profile["memory"]["peak_kb"] > 0
+    assert profile["split"]["profiler_s"] > 0
+
+
+def test_workflow_flag_profiles_every_agent_and_hook():
+    steps = [WorkflowStep(agent=EchoAgent(name=n, llm=FakeLLM(latency=0.005))) for n in ("a", "b")]
+    orchestrator = Orchestrator(steps=steps, hook_manager=HookManager([SlowHook()]))
+
+    result = orchestrator.run(profiled())
+
+    assert set(result["profile"]["hooks_s"]) == {"", "a", "b"}
+    assert result["profile"]["split"]["llm_wait_s"] >= 0.01
+    for record in result["rec_history"]:
+        assert record.extra["profile"]["sections_s"]["orchestrator_hooks"] > 0
+
+
+def test_async_workflow_is_profiled_too():
+    steps = [WorkflowStep(agent=EchoAgent(name=n, llm=FakeLLM(latency=0.005))) for n in ("a", "b")]
+
+    result = asyncio.run(AsyncOrchestrator(steps=steps).arun(profiled()))
+
+    assert result["status"] == "success"
+    assert all(r.extra["profile"]["split"]["llm_wait_s"] >= 0.005 for r in result["rec_history"])
+
+
+def test_collapsed_stacks_aggregate_across_runs(tmp_path):
+    agent = EchoAgent(name="writer", llm=FakeLLM(latency=0.002))
+    report = ProfileReport()
+
+    records = [agent.run(profiled())[1] for _ in range(3)]
+    records.append(agent.run({"payload": {}, "metadata": {}})[1])  # not profiled, skipped
+
+    assert report.add_records(records) == 3
+    lines = dict(line.rsplit(" ", 1) for line in report.collapsed().splitlines())
+    assert int(lines["writer;execute;llm"]) >= 6000
+    assert "writer;framework" in lines
+
+    path = tmp_path / "stacks.txt"
+    report.write(str(path))
+    assert path.read_text() == report.collapsed()
+
+
+def test_profile_flag_parsing():
+    assert ProfileOptions.parse(None) is None
+    assert ProfileOptions.parse(False) is None
+    assert not ProfileOptions.parse(True).cpu
+    assert ProfileOptions.parse("cpu").cpu
+    assert ProfileOptions.parse({"memory": True, "top": 3}).top == 3
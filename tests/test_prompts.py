@@ -0,0 +1,165 @@
+# prompt templates: compiled once, static prefix kept apart, size estimated, prefix uploaded once to a context cache
+
+import copy
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+import pytest
+
+from domains.marketing.agents.audience_analyzer_agent import AudienceAnalyzerAgent
+from engine.agent_base import Agentinput, Agentoutput
+from engine.llm_agent import LLMAgent
+from engine.prompts import Prompt, PromptTemplate, clean_prompt_text
+from extensions.llm.context_cache import ContextCache
+from extensions.llm.fake import FakeLLM
+
+TEMPLATE = PromptTemplate(
+    "test.summary",
+    instructions="""
+        You summarize things.
+
+
+        Return {"summary": ""}
+    """,
+    body="""
+        Text: {text}
+        Style: {style}
+    """,
+)
+
+
+class SummaryAgent(LLMAgent):
+    def build_prompt(self, validated_input: Agentinput, context: Dict[str, Any]) -> Prompt:
+        return TEMPLATE.render(text=validated_input.payload["text"], style="short")
+
+    def parse_response(self, llm_response: Dict[str, Any], validated_input: Agentinput) -> Agentoutput:
+        return Agentoutput(output=llm_response)
+
+
+def test_templates_are_dedented_and_compiled_once():
+    assert TEMPLATE.instructions == 'You summarize things.\n\nReturn {"summary": ""}'
+    assert TEMPLATE.fields == ("text", "style")
+    assert clean_prompt_text("\n    a  \n\n\n    b\n") == "a\n\nb"
+
+
+def test_render_keeps_the_static_prefix_apart():
+    prompt = TEMPLATE.render(text="hello", style="short")
+
+    assert isinstance(prompt, str)
+    assert prompt.system == TEMPLATE.instructions
+    assert prompt.user == "Text: hello\nStyle: short"
+    assert prompt == f"{prompt.system}\n\n{prompt.user}"
+    assert prompt.static_tokens() < prompt.estimated_tokens()
+
+
+def test_render_rejects_missing_fields_and_format_specs():
+    with pytest.raises(ValueError, match="missing style"):
+        TEMPLATE.render(text="hello")
+    with pytest.raises(ValueError, match="format specs"):
+        PromptTemplate("bad", instructions="", body="{x:>10}")
+
+
+def test_prompts_survive_copy_and_pickle():
+    prompt = TEMPLATE.render(text="hello", style="short")
+
+    for clone in (copy.deepcopy(prompt), pickle.loads(pickle.dumps(prompt))):
+        assert clone == prompt and clone.system == prompt.system and clone.template == "test.summary"
+
+
+def test_agent_records_prompt_size():
+    agent = SummaryAgent(name="summary", llm=FakeLLM(response={"summary": "ok"}))
+
+    _, record = agent.run({"payload": {"text": "hello"}, "metadata": {}})
+
+    assert record.extra["prompt"]["template"] == "test.summary"
+    assert 0 < record.extra["prompt"]["static_tokens"] < record.extra["prompt"]["estimated_tokens"]
+
+
+def test_marketing_prefix_is_identical_across_briefs():
+    agent = AudienceAnalyzerAgent(FakeLLM())
+
+    first = agent.build_prompt(Agentinput(payload={"product_description": "CRM", "goal": "signups"}), {})
+    second = agent.build_prompt(Agentinput(payload={"product_description": "Helpdesk", "goal": "retention"}), {})
+
+    assert first.system == second.system and first.user != second.user
+    assert not first.startswith(" ")
+
+
+def test_context_cache_uploads_each_prefix_once():
+    uploads = []
+    cache = ContextCache(lambda prefix, ttl: uploads.append(prefix) or f"cache/{len(uploads)}")
+
+    handles = {cache.handle("static prefix") for _ in range(5)}
+
+    assert handles == {"cache/1"} and uploads == ["static prefix"]
+    assert cache.stats()["hits"] == 4
+
+
+def test_context_cache_refreshes_before_expiry_and_remembers_refusals():
+    uploads = []
+    cache = ContextCache(lambda prefix, ttl: uploads.append(prefix) or f"cache/{len(uploads)}", ttl_seconds=0.1, refresh_margin=0.05)
+    refusing = ContextCache(lambda prefix, ttl: None)
+    small = ContextCache(lambda prefix, ttl: "never", min_tokens=100)
+
+    cache.handle("p")
+    time.sleep(0.06)
+    assert cache.handle("p") == "cache/2"
+
+    assert refusing.handle("p") is None and refusing.handle("p") is None
+    assert refusing.stats()["refused"] == 1
+    assert small.handle("short") is None and small.stats()["too_small"] == 1
+
+
+def test_context_cache_uploads_outside_the_lock():
+    release = threading.Event()
+    uploads = []
+
+    def create(prefix, ttl):
+        uploads.append(prefix)
+        if prefix == "slow":
+            release.wait(1.0)
+        return f"cache/{prefix}"
+
+    cache = ContextCache(create)
+    cache.handle("fast")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        slow = [pool.submit(cache.handle, "slow") for _ in range(2)]
+        time.sleep(0.02)
+        started = time.perf_counter()
+        assert cache.handle("fast") == "cache/fast"   # not stuck behind the slow upload
+        assert time.perf_counter() - started < 0.05
+        release.set()
+        assert [f.result() for f in slow] == ["cache/slow"] * 2
+
+    assert uploads == ["fast", "slow"]   # still one upload per prefix
+
+
+def test_context_cache_retries_a_failed_upload():
+    attempts = []
+
+    def create(prefix, ttl):
+        attempts.append(prefix)
+        if len(attempts) == 1:
+            raise ConnectionError("503")
+        return "cache/1"
+
+    cache = ContextCache(create, retry_after_s=0.05)
+
+    assert cache.handle("p") is None and cache.handle("p") is None   # sent inline until the retry
+    time.sleep(0.06)
+    assert cache.handle("p") == "cache/1"
+    assert len(attempts) == 2 and cache.stats()["failed"] == 1
+
+
+def test_fake_llm_stands_in_for_provider_side_caching():
+    llm = FakeLLM(response={"summary": "ok"}, context_cache=True)
+    agent = SummaryAgent(name="summary", llm=llm)
+
+    records = [agent.run({"payload": {"text": f"t{i}"}, "metadata": {}})[1] for i in range(3)]
+
+    assert llm.context_cache.stats()["created"] == 1
+    assert all(r.extra["usage"]["cached_tokens"] == TEMPLATE.static_tokens for r in records)
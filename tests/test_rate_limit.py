@@ -0,0 +1,93 @@
+# rate limiter self test
+
+import asyncio
+import multiprocessing
+import time
+from typing import Dict, Any
+
+import pytest
+
+from engine.deadline import Deadline, DeadlineExceeded, use_deadline
+from extensions.llm.base import BaseLLM
+from extensions.llm.rate_limit import RateLimitedLLM, RateLimiter
+
+
+class InstantLLM(BaseLLM):
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        return {"t": time.time()}
+
+
+def test_requests_per_minute_pacing_is_fifo():
+    limiter = RateLimiter(rpm=600, burst_requests=2)   # 1 request / 100ms after a burst of 2
+
+    waits = [limiter.reserve() for _ in range(5)]
+
+    assert waits[0] == 0 and waits[1] == 0
+    assert 0.08 < waits[2] < 0.12
+    assert waits == sorted(waits)   # later arrivals never jump the queue
+
+
+def test_token_bucket_counts_estimated_tokens():
+    limiter = RateLimiter(tpm=60_000, burst_tokens=1000)   # 1000 tokens / s
+
+    assert limiter.reserve(tokens=1000) == 0
+    assert 0.45 < limiter.reserve(tokens=500) < 0.55
+
+
+def test_async_acquire_paces_wrapper():
+    llm = RateLimitedLLM(InstantLLM(), RateLimiter(rpm=1200, burst_requests=1), expected_output_tokens=0)
+
+    async def main():
+        start = time.perf_counter()
+        await asyncio.gather(*(llm.agenerate_json("p") for _ in range(4)))
+        return time.perf_counter() - start
+
+    assert asyncio.run(main()) >= 0.14   # 3 waits of 50ms
+
+
+def test_wait_past_the_deadline_fails_at_once():
+    limiter = RateLimiter(rpm=60, burst_requests=1)   # 1 request / s
+    llm = RateLimitedLLM(InstantLLM(), limiter, expected_output_tokens=0)
+    llm.generate_json("p")
+
+    async def main():
+        with use_deadline(Deadline(0.1)):
+            await llm.agenerate_json("p")
+
+    started = time.perf_counter()
+    with use_deadline(Deadline(0.1)), pytest.raises(DeadlineExceeded, match="rate limit wait"):
+        llm.generate_json("p")
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(main())
+    assert time.perf_counter() - started < 0.05   # no sleeping into the deadline
+
+    assert 0.9 < limiter.reserve() < 1.1   # the refused calls took no slot
+
+
+def _reserve_in_child(path: str, queue):
+    queue.put(RateLimiter(rpm=60, burst_requests=1, shared_state_path=path).reserve())
+
+
+def test_shared_state_across_processes(tmp_path):
+    path = str(tmp_path / "rate.json")
+    queue = multiprocessing.Queue()
+
+    procs = [multiprocessing.Process(target=_reserve_in_child, args=(path, queue)) for _ in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+
+    waits = sorted(queue.get() for _ in procs)
+    assert waits[0] == 0
+    assert 0.9 < waits[1] < 1.1 and 1.9 < waits[2] < 2.1
+
+
+if __name__ == "__main__":
+    import pathlib, tempfile
+    test_requests_per_minute_pacing_is_fifo()
+    test_token_bucket_counts_estimated_tokens()
+    test_async_acquire_paces_wrapper()
+    test_wait_past_the_deadline_fails_at_once()
+    test_shared_state_across_processes(pathlib.Path(tempfile.mkdtemp()))
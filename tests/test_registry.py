@@ -0,0 +1,43 @@
+# lazy registries: providers / domains are imported on first use, the cli starts without heavy modules
+
+import subprocess
+import sys
+
+import pytest
+
+from domains.registry import DOMAINS, load_domain
+from engine.registry import LazyRegistry
+
+
+def test_string_targets_are_imported_on_first_get(tmp_path, monkeypatch):
+    (tmp_path / "zap_lazy_plugin.py").write_text("def build():\n    return 'built'\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    registry = LazyRegistry("plugin")
+
+    registry.register("lazy", "zap_lazy_plugin:build")
+
+    assert "zap_lazy_plugin" not in sys.modules
+    assert registry.get("lazy")() == "built"
+    assert "zap_lazy_plugin" in sys.modules and registry.is_loaded("lazy")
+
+
+def test_unknown_names_list_the_known_ones():
+    registry = LazyRegistry("domain")
+    registry.register("marketing", lambda: [])
+
+    with pytest.raises(ValueError, match="Unsupported domain 'sales' \\(known: marketing\\)"):
+        registry.get("sales")
+
+
+def test_marketing_domain_is_registered():
+    assert "marketing" in DOMAINS.names()
+    assert callable(load_domain("marketing"))
+
+
+def test_cli_startup_skips_heavy_modules():
+    heavy = ["google.genai", "cProfile", "http.server", "domains.marketing.agent_factory"]
+    code = f"import sys, run_marketing; print([m for m in {heavy!r} if m in sys.modules])"
+
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+    assert out.stdout.strip() == "[]"
@@ -0,0 +1,141 @@
+# retry policy self test, no sleeping on real delays
+
+import asyncio
+from typing import Dict, Any, List
+
+import pytest
+
+from engine.agent_base import Agentinput
+from engine.llm_agent import LLMAgent
+from extensions.llm.base import BaseLLM, LLMAuthError, LLMRateLimitError, LLMServerError
+from extensions.llm.retry_policy import BackoffPolicy, CircuitBreaker, CircuitOpenError, RetryBudget
+from extensions.llm.retry_wrapper import RetryLLM
+
+
+class ScriptedLLM(BaseLLM):
+    """raises the scripted errors in order, then succeeds"""
+
+    def __init__(self, errors: List[Exception]):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return {"ok": True}
+
+
+class SlowLLM(BaseLLM):
+    """answers after `latency` seconds (async), long enough to be cancelled"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        return {"ok": True}
+
+    async def agenerate_json(self, prompt: str) -> Dict[str, Any]:
+        await asyncio.sleep(self.latency)
+        return {"ok": True}
+
+
+class OneShotAgent(LLMAgent):
+
+    def __init__(self, llm: BaseLLM):
+        super().__init__(name="one_shot", llm=llm)
+
+    def build_prompt(self, validated_input: Agentinput, context: Dict[str, Any]) -> str:
+        return "prompt"
+
+    def parse_response(self, llm_response: Dict[str, Any], validated_input: Agentinput):
+        return {"output": llm_response}
+
+
+NO_WAIT = BackoffPolicy(base_delay=0.0, max_delay=0.0)
+
+
+def test_full_jitter_bounds_and_retry_after_hint():
+    policy = BackoffPolicy(base_delay=1.0, max_delay=8.0)
+
+    assert all(0 <= policy.delay(3) <= 8.0 for _ in range(50))
+    assert policy.delay(10, retry_after=2.5) == 2.5
+    assert policy.delay(0, retry_after=3600) == 8.0
+    assert BackoffPolicy.fixed(1).delay(5) == 1
+
+
+def test_permanent_errors_are_not_retried():
+    inner = ScriptedLLM([LLMAuthError("bad key")])
+
+    with pytest.raises(LLMAuthError):
+        RetryLLM(inner, max_attempts=5, policy=NO_WAIT).generate_json("p")
+
+    assert inner.calls == 1
+
+
+def test_retry_budget_caps_retries():
+    budget = RetryBudget(ratio=0.0, min_retries=1)
+    llm = RetryLLM(ScriptedLLM([LLMServerError("503")] * 10), max_attempts=5, policy=NO_WAIT, budget=budget)
+
+    with pytest.raises(LLMServerError):
+        llm.generate_json("p")
+
+    assert llm.llm.calls == 2   # first try + the one retry the budget allowed
+
+
+def test_circuit_breaker_opens_and_recovers():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout_s=0.0)
+    llm = RetryLLM(ScriptedLLM([LLMServerError("500"), LLMServerError("500")]), max_attempts=1, policy=NO_WAIT, breaker=breaker)
+
+    for _ in range(2):
+        with pytest.raises(LLMServerError):
+            llm.generate_json("p")
+    assert breaker.state == CircuitBreaker.OPEN
+
+    assert llm.generate_json("p") == {"ok": True}   # recovery timeout 0 -> half open probe succeeds
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.recovery_timeout_s = 60
+    breaker.record_failure(LLMServerError("500"))
+    breaker.record_failure(LLMServerError("500"))
+    with pytest.raises(CircuitOpenError):
+        llm.generate_json("p")
+
+
+def test_retries_and_transitions_land_in_record_extra():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout_s=0.0)
+    llm = RetryLLM(ScriptedLLM([LLMRateLimitError("429", retry_after=0.0)]), max_attempts=3, policy=NO_WAIT, breaker=breaker)
+
+    RetryLLM(llm.llm, breaker=breaker)   # another wrapper on the same (shared) breaker
+    output, record = OneShotAgent(llm).run({"payload": {}, "metadata": {}})
+
+    assert record.status == "success"
+    retry = record.extra["retry"]
+    assert retry["attempts"] == 2 and retry["retries"] == 1
+    assert [t["to"] for t in retry["circuit"]] == ["open", "half_open", "closed"]
+
+
+def test_cancelled_probe_hands_its_slot_back():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout_s=0.0)
+    inner = SlowLLM(latency=1.0)
+    llm = RetryLLM(inner, max_attempts=3, policy=NO_WAIT, breaker=breaker)
+    breaker.record_failure(LLMServerError("500"))
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(llm.agenerate_json("p"), 0.05)   # the half open probe, cancelled
+
+        inner.latency = 0.0
+        return await llm.agenerate_json("p")
+
+    assert asyncio.run(main()) == {"ok": True}   # not "probe already in flight"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+if __name__ == "__main__":
+    test_full_jitter_bounds_and_retry_after_hint()
+    test_permanent_errors_are_not_retried()
+    test_retry_budget_caps_retries()
+    test_circuit_breaker_opens_and_recovers()
+    test_retries_and_transitions_land_in_record_extra()
+    test_cancelled_probe_hands_its_slot_back()
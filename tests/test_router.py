@@ -0,0 +1,141 @@
+# multi-provider routing: fastest healthy backend wins, failures fail over, bad backends are ejected and probed back in
+
+import asyncio
+import time
+from typing import Any, Dict
+
+import pytest
+
+from engine.agent_base import Agentinput, Agentoutput
+from engine.llm_agent import LLMAgent
+from extensions.llm.base import LLMBadRequestError, LLMRateLimitError, LLMServerError
+from extensions.llm.fake import FakeLLM
+from extensions.llm.http_provider import HTTPLLM, serve_llm
+from extensions.llm.providers import create_provider, parse_provider_specs
+from extensions.llm.router import RouterLLM
+
+
+class EchoAgent(LLMAgent):
+    def build_prompt(self, validated_input: Agentinput, context: Dict[str, Any]) -> str:
+        return "p"
+
+    def parse_response(self, llm_response: Dict[str, Any], validated_input: Agentinput) -> Agentoutput:
+        return Agentoutput(output=llm_response)
+
+
+def test_prefers_the_fastest_healthy_backend():
+    slow = FakeLLM(response={"from": "slow"}, latency=0.02)
+    fast = FakeLLM(response={"from": "fast"}, latency=0.001)
+    router = RouterLLM({"slow": slow, "fast": fast})
+
+    results = [router.generate_json("p")["from"] for _ in range(10)]
+
+    assert results[2:] == ["fast"] * 8  # each backend sampled once, then the fast one
+    assert slow.calls == 1
+
+
+def test_failing_backend_fails_over_and_gets_ejected():
+    broken = FakeLLM(failure_rate=1.0)
+    healthy = FakeLLM(response={"ok": True}, latency=0.005)
+    router = RouterLLM([("broken", broken), ("healthy", healthy)], eject_after=2)
+    agent = EchoAgent(name="a", llm=router)
+
+    _, record = agent.run({"payload": {}, "metadata": {}})
+    for _ in range(5):
+        router.generate_json("p")
+
+    assert record.status == "success"
+    assert record.extra["router"]["backend"] == "healthy"
+    assert record.extra["router"]["failovers"] == 1
+    assert broken.calls == 2  # ejected after its second failure, not called again
+    assert router.stats()["broken"]["state"] == "ejected"
+
+
+def test_ejected_backend_is_probed_back_in():
+    flaky = FakeLLM(response={"from": "flaky"})
+    backup = FakeLLM(response={"from": "backup"}, latency=0.01)
+    router = RouterLLM([("flaky", flaky), ("backup", backup)], eject_after=1, eject_seconds=0.05)
+
+    flaky.failure_rate = 1.0
+    assert router.generate_json("p") == {"from": "backup"}
+    assert router.stats()["flaky"]["state"] == "ejected"
+
+    flaky.failure_rate = 0.0
+    time.sleep(0.06)
+    assert router.generate_json("p") == {"from": "flaky"}  # the probe
+    assert router.stats()["flaky"]["state"] == "healthy"
+
+
+def test_failed_probe_doubles_the_ejection():
+    broken = FakeLLM(failure_rate=1.0)
+    router = RouterLLM([("broken", broken), ("ok", FakeLLM())], eject_after=1, eject_seconds=0.05)
+
+    router.generate_json("p")
+    time.sleep(0.06)
+    router.generate_json("p")
+
+    stats = router.stats()["broken"]
+    assert stats["ejections"] == 2 and stats["state"] == "ejected"
+
+
+def test_bad_request_is_not_failed_over():
+    first = FakeLLM(failure_rate=1.0, failure=LLMBadRequestError)
+    second = FakeLLM()
+    router = RouterLLM([("first", first), ("second", second)])
+
+    with pytest.raises(LLMBadRequestError):
+        router.generate_json("p")
+    assert second.calls == 0
+
+
+def test_every_backend_failing_raises_the_last_error():
+    router = RouterLLM([("a", FakeLLM(failure_rate=1.0)), ("b", FakeLLM(failure_rate=1.0))])
+
+    with pytest.raises(LLMServerError):
+        asyncio.run(router.agenerate_json("p"))
+
+
+def test_async_path_and_stream_fail_over():
+    router = RouterLLM([("broken", FakeLLM(failure_rate=1.0)), ("ok", FakeLLM(response={"a": 1, "b": 2}))])
+
+    assert asyncio.run(router.agenerate_json("p")) == {"a": 1, "b": 2}
+    assert list(router.stream_json("p")) == [("a", 1), ("b", 2)]
+
+
+def test_http_provider_round_trip():
+    server = serve_llm(FakeLLM(response={"ok": True}, model="remote"), port=0)
+    try:
+        host, port = server.server_address[:2]
+        llm = HTTPLLM(f"http://{host}:{port}/generate", model="remote")
+        agent = EchoAgent(name="a", llm=llm)
+
+        output, record = agent.run({"payload": {}, "metadata": {}})
+
+        assert output.output == {"ok": True}
+        assert record.extra["usage"]["llm_calls"] == 1
+        assert record.extra["usage"]["input_tokens"] > 0
+    finally:
+        server.shutdown()
+
+
+def test_http_errors_map_onto_llm_errors():
+    def limited(prompt: str) -> Exception:
+        return LLMRateLimitError(prompt, retry_after=2.0)
+
+    server = serve_llm(FakeLLM(failure_rate=1.0, failure=limited), port=0)
+    try:
+        host, port = server.server_address[:2]
+        with pytest.raises(LLMRateLimitError) as info:
+            HTTPLLM(f"http://{host}:{port}/").generate_json("p")
+        assert info.value.retry_after == 2.0
+    finally:
+        server.shutdown()
+
+
+def test_provider_registry():
+    assert parse_provider_specs("gemini, gemini:gemini-2.5-flash,fake") == [
+        ("gemini", None), ("gemini", "gemini-2.5-flash"), ("fake", None),
+    ]
+    assert create_provider("fake", "stand-in").model == "stand-in"
+    with pytest.raises(ValueError, match="Unsupported LLM provider"):
+        create_provider("nope")
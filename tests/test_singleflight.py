@@ -0,0 +1,154 @@
+# single flight self test: threads and asyncio tasks share one upstream call
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any
+
+import pytest
+
+from engine.deadline import Deadline, DeadlineExceeded, remaining_time, use_deadline
+from extensions.llm.base import BaseLLM
+from extensions.llm.singleflight import SingleFlightLLM
+
+
+class SlowLLM(BaseLLM):
+
+    def __init__(self, fail: bool = False):
+        self.model = "fake-model"
+        self.fail = fail
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        with self._lock:
+            self.calls += 1
+        time.sleep(0.1)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return {"prompt": prompt}
+
+    async def agenerate_json(self, prompt: str) -> Dict[str, Any]:
+        self.calls += 1
+        await asyncio.sleep(0.1)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return {"prompt": prompt}
+
+
+class DeadlineAwareLLM(SlowLLM):
+    """takes 0.1s, gives up with DeadlineExceeded when the caller's deadline comes first"""
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        with self._lock:
+            self.calls += 1
+        remaining = remaining_time()
+        if remaining is not None and remaining < 0.1:
+            time.sleep(remaining)
+            raise DeadlineExceeded("no time left")
+        time.sleep(0.1)
+        return {"prompt": prompt}
+
+
+def call_within(llm: BaseLLM, seconds: float, delay: float = 0.0):
+    """runs a call under its own deadline, returns (result or exception, time taken)"""
+    time.sleep(delay)
+    started = time.perf_counter()
+    with use_deadline(Deadline(seconds)):
+        try:
+            outcome = llm.generate_json("same brief")
+        except DeadlineExceeded as exc:
+            outcome = exc
+    return outcome, time.perf_counter() - started
+
+
+def test_threads_share_one_call():
+    inner = SlowLLM()
+    llm = SingleFlightLLM(inner)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(llm.generate_json, ["same brief"] * 8))
+
+    assert inner.calls == 1
+    assert all(r == {"prompt": "same brief"} for r in results)
+    assert llm.stats() == {"leaders": 1, "coalesced": 7, "in_flight": 0}
+
+
+def test_threads_share_the_exception():
+    llm = SingleFlightLLM(SlowLLM(fail=True))
+
+    def call(_):
+        with pytest.raises(RuntimeError):
+            llm.generate_json("same brief")
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(call, range(4)))
+
+    assert llm.llm.calls == 1
+
+
+def test_asyncio_tasks_share_one_call():
+    inner = SlowLLM()
+    llm = SingleFlightLLM(inner)
+
+    async def main():
+        return await asyncio.gather(*(llm.agenerate_json("same brief") for _ in range(10)), llm.agenerate_json("other"))
+
+    results = asyncio.run(main())
+
+    assert inner.calls == 2
+    assert results[-1] == {"prompt": "other"}
+
+
+def test_cancelled_leader_hands_the_call_to_a_waiter():
+    inner = SlowLLM()
+    llm = SingleFlightLLM(inner)
+
+    async def main():
+        leader = asyncio.ensure_future(llm.agenerate_json("same brief"))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.ensure_future(llm.agenerate_json("same brief"))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return leader, await waiter
+
+    leader, result = asyncio.run(main())
+
+    assert leader.cancelled()
+    assert result == {"prompt": "same brief"}
+    assert inner.calls == 2 and llm.stats()["in_flight"] == 0
+
+
+def test_each_caller_keeps_its_own_deadline():
+    # tight leader: its deadline failure is its own, the loose waiter takes the call over
+    inner = DeadlineAwareLLM()
+    llm = SingleFlightLLM(inner)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        tight = pool.submit(call_within, llm, 0.03)
+        loose = pool.submit(call_within, llm, 5.0, delay=0.01)
+        (tight_out, _), (loose_out, _) = tight.result(), loose.result()
+
+    assert isinstance(tight_out, DeadlineExceeded)
+    assert loose_out == {"prompt": "same brief"}
+    assert inner.calls == 2
+
+    # tight waiter: it stops waiting at its own deadline, the leader's call goes on
+    inner = DeadlineAwareLLM()
+    llm = SingleFlightLLM(inner)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        loose = pool.submit(call_within, llm, 5.0)
+        tight = pool.submit(call_within, llm, 0.02, delay=0.01)
+        (tight_out, tight_s), (loose_out, _) = tight.result(), loose.result()
+
+    assert isinstance(tight_out, DeadlineExceeded) and tight_s < 0.06
+    assert loose_out == {"prompt": "same brief"}
+    assert inner.calls == 1 and llm.stats()["in_flight"] == 0
+
+
+if __name__ == "__main__":
+    test_threads_share_one_call()
+    test_threads_share_the_exception()
+    test_asyncio_tasks_share_one_call()
+    test_cancelled_leader_hands_the_call_to_a_waiter()
+    test_each_caller_keeps_its_own_deadline()
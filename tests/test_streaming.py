@@ -0,0 +1,195 @@
+# streaming: fields come out of the incremental parser as soon as they close, and reach hooks / callers
+
+import asyncio
+import json
+from typing import Any, Dict, Iterator, Tuple
+
+import pytest
+
+from engine.agent_base import Agentinput, Agentoutput, BaseAgent
+from engine.hooks import BaseHook, HookManager
+from engine.llm_agent import LLMAgent
+from engine.orchestrator import AsyncOrchestrator, Orchestrator, WorkflowStep
+from engine.streaming import on_partial
+from extensions.llm.base import BaseLLM, LLMServerError
+from extensions.llm.cache_wrapper import CachingLLM
+from extensions.llm.json_stream import IncrementalJSONParser
+from extensions.llm.retry_policy import BackoffPolicy
+from extensions.llm.retry_wrapper import RetryLLM
+
+
+DOC = {
+    "headline": 'Grow "faster" {now}',
+    "introduction": "Hello\nworld",
+    "sections": [{"title": "a", "points": ["x", "]"]}],
+    "score": 4.5,
+    "draft": False,
+    "notes": None,
+}
+
+
+class ChunkedLLM(BaseLLM):
+    """streams DOC as small text chunks through the incremental parser, like a provider would"""
+
+    def __init__(self, chunk_size: int = 7, fail_after_chunks: int = -1):
+        self.chunk_size = chunk_size
+        self.fail_after_chunks = fail_after_chunks
+        self.calls = 0
+        self.chunks_sent = 0
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        self.calls += 1
+        return dict(DOC)
+
+    def stream_json(self, prompt: str) -> Iterator[Tuple[str, Any]]:
+        self.calls += 1
+        text = json.dumps(DOC)
+        parser = IncrementalJSONParser()
+        for n, start in enumerate(range(0, len(text), self.chunk_size)):
+            if n == self.fail_after_chunks:
+                raise LLMServerError("stream dropped")
+            self.chunks_sent += 1
+            yield from parser.feed(text[start:start + self.chunk_size])
+        parser.result()
+
+
+class OutlineAgent(LLMAgent):
+
+    def build_prompt(self, validated_input: Agentinput, context: Dict[str, Any]) -> str:
+        return "outline please"
+
+    def parse_response(self, llm_response: Dict[str, Any], validated_input: Agentinput) -> Agentoutput:
+        return Agentoutput(output=llm_response)
+
+
+class PartialHook(BaseHook):
+
+    def __init__(self):
+        self.fields = []
+
+    def on_agent_partial(self, agent: Any, field: str, value: Any, partial: dict) -> None:
+        self.fields.append((agent.name, field, len(partial)))
+
+
+def test_parser_emits_each_field_when_it_closes():
+    text = "```json\n" + json.dumps(DOC, indent=2) + "\n```"
+    parser = IncrementalJSONParser()
+
+    seen = []
+    for ch in text:
+        for field, value in parser.feed(ch):
+            seen.append(field)
+            assert value == DOC[field]
+
+    assert seen == list(DOC)
+    assert parser.result() == DOC
+
+
+def test_parser_first_field_before_the_rest_arrives():
+    parser = IncrementalJSONParser()
+
+    assert parser.feed('{"headline": "Hi", "intro') == [("headline", "Hi")]
+    assert parser.feed('duction": "there"') == [("introduction", "there")]
+    assert parser.feed(', "n": 12') == []   # a number only ends at the next , or }
+    assert parser.feed("}") == [("n", 12)]
+
+
+def test_parser_incomplete_object_raises():
+    parser = IncrementalJSONParser()
+    parser.feed('{"headline": "Hi", "intro": "unterminated')
+
+    with pytest.raises(ValueError):
+        parser.result()
+
+
+def test_agent_streams_partials_to_caller():
+    agent = OutlineAgent(name="outline", llm=ChunkedLLM(), stream=True)
+    seen = []
+
+    with on_partial(lambda agent, field, value, partial: seen.append(field)):
+        output, record = agent.run({"payload": {}, "metadata": {}})
+
+    assert record.status == "success"
+    assert seen == list(DOC)
+    assert output.output == DOC
+
+
+def test_orchestrator_fires_partial_hooks():
+    hook = PartialHook()
+    agent = OutlineAgent(name="outline", llm=ChunkedLLM(), stream=True)
+
+    result = Orchestrator(steps=[WorkflowStep(agent=agent)], hook_manager=HookManager([hook])).run({"payload": {}, "metadata": {}})
+
+    assert result["status"] == "success"
+    assert [field for _, field, _ in hook.fields] == list(DOC)
+    assert [size for _, _, size in hook.fields] == list(range(1, len(DOC) + 1))
+
+
+def test_async_orchestrator_fires_partial_hooks():
+    hook = PartialHook()
+    agent = OutlineAgent(name="outline", llm=ChunkedLLM(), stream=True)
+
+    result = asyncio.run(
+        AsyncOrchestrator(steps=[WorkflowStep(agent=agent)], hook_manager=HookManager([hook])).arun({"payload": {}, "metadata": {}})
+    )
+
+    assert result["status"] == "success"
+    assert [field for _, field, _ in hook.fields] == list(DOC)
+
+
+def test_async_listeners_hear_sync_agent_code():
+    threaded = OutlineAgent(name="threaded", llm=ChunkedLLM(), stream=True)
+    threaded.aexecute = lambda validated_input, context: BaseAgent.aexecute(threaded, validated_input, context)  # execute in a worker thread
+    inline = OutlineAgent(name="inline", llm=ChunkedLLM(), stream=True)
+    seen = []
+
+    async def listener(agent, field, value, partial):
+        seen.append((agent.name, field))
+
+    async def main():
+        with on_partial(listener):
+            await threaded.arun({"payload": {}, "metadata": {}})
+            inline.run({"payload": {}, "metadata": {}})   # sync run on the loop thread
+        await asyncio.sleep(0)   # its calls were scheduled as tasks
+
+    asyncio.run(main())
+
+    assert seen == [("threaded", field) for field in DOC] + [("inline", field) for field in DOC]
+
+    with pytest.raises(TypeError, match="running event loop"):
+        with on_partial(listener):
+            pass
+
+
+def test_non_streaming_llm_falls_back_to_one_burst():
+    class PlainLLM(BaseLLM):
+        def generate_json(self, prompt: str) -> Dict[str, Any]:
+            return {"a": 1, "b": 2}
+
+    assert list(PlainLLM().stream_json("x")) == [("a", 1), ("b", 2)]
+
+
+def test_retry_restarts_stream_only_before_first_field():
+    early = ChunkedLLM(chunk_size=1, fail_after_chunks=1)   # fails before any field closed
+    retry = RetryLLM(early, max_attempts=2, policy=BackoffPolicy.fixed(0))
+
+    with pytest.raises(LLMServerError):
+        list(retry.stream_json("x"))   # both attempts fail the same way
+    assert early.calls == 2
+
+    late = ChunkedLLM(chunk_size=1, fail_after_chunks=40)   # headline already out
+    retry = RetryLLM(late, max_attempts=3, policy=BackoffPolicy.fixed(0))
+
+    with pytest.raises(LLMServerError):
+        list(retry.stream_json("x"))
+    assert late.calls == 1
+
+
+def test_cache_stores_finished_stream_and_replays_it():
+    inner = ChunkedLLM()
+    llm = CachingLLM(inner)
+
+    assert dict(llm.stream_json("x")) == DOC
+    assert dict(llm.stream_json("x")) == DOC
+    assert inner.calls == 1
+    assert llm.stats()["memory_hits"] == 1
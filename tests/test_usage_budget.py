@@ -0,0 +1,110 @@
+# token / cost accounting: usage lands in the agent record, the workflow keeps totals and stops at the budget
+
+import asyncio
+from typing import Dict, Any
+
+from engine.agent_base import Agentinput, Agentoutput
+from engine.llm_agent import LLMAgent
+from engine.orchestrator import AsyncOrchestrator, Orchestrator, WorkflowStep
+from extensions.llm.base import BaseLLM, LLMUsage, record_usage
+
+
+class MeteredLLM(BaseLLM):
+    """reports a fixed usage per call, like a provider would"""
+
+    def __init__(self, input_tokens: int = 100, output_tokens: int = 50, cost_usd: float = 0.01):
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.cost_usd = cost_usd
+        self.calls = 0
+
+    def generate_json(self, prompt: str) -> Dict[str, Any]:
+        self.calls += 1
+        record_usage(LLMUsage(
+            model="fake",
+            input_tokens=self.input_tokens,
+            output_tokens=self.output_tokens,
+            total_tokens=self.input_tokens + self.output_tokens,
+            cost_usd=self.cost_usd,
+        ))
+        return {"echo": prompt}
+
+
+class EchoAgent(LLMAgent):
+    """calls the llm `calls` times per run"""
+
+    def __init__(self, name: str, llm: BaseLLM, calls: int = 1):
+        super().__init__(name=name, llm=llm)
+        self.calls = calls
+
+    def build_prompt(self, validated_input: Agentinput, context: Dict[str, Any]) -> str:
+        return self.name
+
+    def execute(self, validated_input: Agentinput, context: Dict[str, Any]) -> Agentoutput:
+        for _ in range(self.calls - 1):
+            self.llm.generate_json("extra call")
+        return super().execute(validated_input, context)
+
+    def parse_response(self, llm_response: Dict[str, Any], validated_input: Agentinput) -> Agentoutput:
+        return Agentoutput(output=llm_response)
+
+
+def test_record_sums_usage_over_all_calls():
+    agent = EchoAgent("a", MeteredLLM(), calls=3)
+
+    _, record = agent.run({"payload": {}, "metadata": {}})
+
+    assert record.status == "success"
+    assert record.tokens_used == 450
+    assert record.extra["usage"]["llm_calls"] == 3
+    assert len(record.extra["usage"]["calls"]) == 3
+
+
+def test_workflow_reports_totals():
+    llm = MeteredLLM()
+    steps = [WorkflowStep(agent=EchoAgent(name, llm)) for name in ("a", "b")]
+
+    result = Orchestrator(steps=steps).run({"payload": {}, "metadata": {}})
+
+    assert result["status"] == "success"
+    assert result["usage"]["total_tokens"] == 300
+    assert result["usage"]["llm_calls"] == 2
+    assert abs(result["usage"]["cost_usd"] - 0.02) < 1e-9
+
+
+def test_token_budget_stops_before_next_step():
+    llm = MeteredLLM()
+    steps = [WorkflowStep(agent=EchoAgent(name, llm)) for name in ("a", "b", "c")]
+
+    result = Orchestrator(steps=steps, token_budget=300).run({"payload": {}, "metadata": {}})
+
+    assert result["status"] == "error"
+    assert "token budget" in result["error"]
+    assert llm.calls == 2  # third step never called the llm
+    assert [rec.agent_name for rec in result["rec_history"]] == ["a", "b"]
+
+
+def test_cost_budget_applies_to_dag_steps():
+    llm = MeteredLLM(cost_usd=0.5)
+    steps = [
+        WorkflowStep(agent=EchoAgent("root", llm), depends_on=[]),
+        WorkflowStep(agent=EchoAgent("a", llm), depends_on=["root"]),
+        WorkflowStep(agent=EchoAgent("b", llm), depends_on=["root"]),
+    ]
+
+    result = Orchestrator(steps=steps, cost_budget=0.5).run({"payload": {}, "metadata": {}})
+
+    assert result["status"] == "error"
+    assert "cost budget" in result["error"]
+    assert llm.calls == 1
+
+
+def test_budget_in_async_orchestrator():
+    llm = MeteredLLM()
+    steps = [WorkflowStep(agent=EchoAgent(name, llm)) for name in ("a", "b")]
+
+    result = asyncio.run(AsyncOrchestrator(steps=steps, token_budget=150).arun({"payload": {}, "metadata": {}}))
+
+    assert result["status"] == "error"
+    assert result["usage"]["total_tokens"] == 150
+    assert llm.calls == 1